@@ -4,8 +4,19 @@ Example usage of the Boliviamart scraper
 This script demonstrates different ways to use the scraper programmatically.
 """
 
-from scraper_boliviamart import BoliviamartScraper
 import logging
+import os
+import sys
+
+from scraper_boliviamart import BoliviamartScraper
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.prices import centavos, to_centavos
+
+try:
+    import pandas as pd
+except ImportError:  # Optional: without it prices are parsed one at a time
+    pd = None
 
 # Configure logging to see detailed output
 logging.basicConfig(
@@ -92,15 +103,14 @@ def example_filter_products():
     # Filter featured products
     featured_products = [p for p in all_products if p['featured'] == 'Yes']
     
-    # Filter products under Bs.500
-    affordable_products = []
-    for p in all_products:
-        try:
-            price = float(p['sale_price'].replace(',', ''))
-            if price < 500:
-                affordable_products.append(p)
-        except (ValueError, AttributeError):
-            pass
+    # Filter products under Bs.500 (the price column is parsed once, in centavos)
+    if pd is not None:
+        sale_centavos = centavos(p['sale_price'] for p in all_products)
+        affordable_products = [p for p, cheap in zip(all_products, (sale_centavos < 50000).fillna(False)) if cheap]
+    else:
+        sale_centavos = [to_centavos(p['sale_price']) for p in all_products]
+        affordable_products = [p for p, price in zip(all_products, sale_centavos)
+                               if price is not None and price < 50000]
     
     print(f"\nTotal products: {len(all_products)}")
     print(f"Products on sale: {len(on_sale_products)}")
@@ -134,34 +144,30 @@ def example_price_analysis():
     # Scrape all products
     products = scraper.scrape_all("https://www.boliviamart.com/tienda/")
     
-    # Analyze prices
-    prices = []
-    for p in products:
-        try:
-            price = float(p['sale_price'].replace(',', ''))
-            prices.append(price)
-        except (ValueError, AttributeError):
-            pass
-    
-    if prices:
-        avg_price = sum(prices) / len(prices)
-        min_price = min(prices)
-        max_price = max(prices)
-        
+    # Analyze prices: one vectorized parse, then column statistics (in centavos)
+    if pd is not None:
+        prices = centavos(p['sale_price'] for p in products).dropna()
+        found = not prices.empty
+        if found:
+            avg_price, min_price, max_price = prices.mean() / 100, prices.min() / 100, prices.max() / 100
+            most_expensive, cheapest = products[prices.idxmax()], products[prices.idxmin()]
+    else:
+        prices = {idx: price for idx, price in enumerate(to_centavos(p['sale_price']) for p in products)
+                  if price is not None}
+        found = bool(prices)
+        if found:
+            avg_price = sum(prices.values()) / len(prices) / 100
+            min_price, max_price = min(prices.values()) / 100, max(prices.values()) / 100
+            most_expensive = products[max(prices, key=prices.get)]
+            cheapest = products[min(prices, key=prices.get)]
+    
+    if found:
         print(f"\nPrice Statistics:")
         print(f"Average price: Bs.{avg_price:.2f}")
         print(f"Minimum price: Bs.{min_price:.2f}")
         print(f"Maximum price: Bs.{max_price:.2f}")
         print(f"Price range: Bs.{max_price - min_price:.2f}")
         
-        # Find most expensive product
-        most_expensive = max(products, key=lambda x: float(x['sale_price'].replace(',', '')) 
-                           if x['sale_price'] != 'N/A' else 0)
-        
-        # Find cheapest product
-        cheapest = min(products, key=lambda x: float(x['sale_price'].replace(',', '')) 
-                     if x['sale_price'] != 'N/A' else float('inf'))
-        
         print(f"\nMost expensive: {most_expensive['title']} - Bs.{most_expensive['sale_price']}")
         print(f"Cheapest: {cheapest['title']} - Bs.{cheapest['sale_price']}")
 
@@ -7,14 +7,32 @@ Usage:
 """
 
 import requests
-from bs4 import BeautifulSoup
-import csv
-import time
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from urllib.parse import urljoin, urlparse, parse_qs
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.checkpoint import Journal, add_journal_arguments, format_journal_stats, open_journal
+from common.columnar import Column, ParquetSink
+from common.extraction import ExtractionPlan, Field
+from common.http_cache import format_cache_stats, install_cache
+from common.html_parser import PARSERS, parse_html, resolve_parser
+from common.http_client import add_client_arguments, client_options, create_session
+from common.prices import find_amounts, format_amount
+from common.product_index import ProductIndex, format_index_stats
+from common.sinks import CSVSink, ProductSink, TeeSink
+from common.snapshot_store import SnapshotSink, SnapshotStore
+from common.rate_limiter import (HostRateLimiter, add_rate_limit_arguments, format_rate_limit,
+                                  rate_limiter_from_args)
 
 # Configure logging
 logging.basicConfig(
@@ -24,41 +42,171 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def is_listing_class(value: Optional[str]) -> bool:
+    """Class filter of LISTING_PARTS: product cards, the pagination list, or no class (scripts)"""
+    if value is None:
+        return True
+    # While parsing, the filter sees the raw attribute ("product-col product type-product ...")
+    classes = value.split()
+    return 'product-col' in classes or 'page-numbers' in classes
+
+
+def is_template_type(value: Optional[str]) -> bool:
+    """Type filter of LISTING_PARTS: script templates, or no type (li and ul)"""
+    return value is None or value == 'text/template'
+
+
+# Listing pages are parsed into these subtrees only (products, pagination, templates).
+# Built from the public SoupStrainer API; bs4 calls attribute filters with None
+# for a missing attribute, which lets one strainer cover tags of different kinds.
+LISTING_PARTS = SoupStrainer(['li', 'ul', 'script'],
+                             attrs={'class': is_listing_class, 'type': is_template_type})
+
+
+class ListingPage:
+    """What one fetch of a listing page yields: its products and its pagination"""
+    
+    def __init__(self, url: str, products: List[Dict], total_pages: int):
+        """
+        Initialize the page
+        
+        Args:
+            url: URL the page was fetched from
+            products: Product dictionaries extracted from the page
+            total_pages: Number of pages of the listing, from its pagination
+        """
+        self.url = url
+        self.products = products
+        self.total_pages = total_pages
+    
+    def __repr__(self):
+        return f"<ListingPage {self.url}: {len(self.products)} products, {self.total_pages} pages>"
+
+
 class BoliviamartScraper:
     """Web scraper for Boliviamart.com product pages"""
     
-    def __init__(self, base_url: str, page_size: int = 36, delay: float = 1.0):
+    # Columns of the products CSV
+    CSV_FIELDS = [
+        'scrape_category',
+        'scrape_categories',
+        'product_id',
+        'sku',
+        'title',
+        'categories',
+        'regular_price',
+        'sale_price',
+        'on_sale',
+        'discount',
+        'stock_status',
+        'rating',
+        'featured',
+        'url',
+        'image_url'
+    ]
+    
+    # Typed columns of the Parquet snapshot (the CSV records, converted)
+    PARQUET_COLUMNS = [
+        Column('scrape_category', 'category'),
+        Column('scrape_categories', 'categories'),
+        Column('product_id'),
+        Column('sku'),
+        Column('title'),
+        Column('categories', 'category'),
+        Column('regular_centavos', 'price', field='regular_price'),
+        Column('sale_centavos', 'price', field='sale_price'),
+        Column('on_sale', 'flag'),
+        Column('discount_pct', 'percent', field='discount'),
+        Column('stock_status', 'category'),
+        Column('rating', 'number'),
+        Column('featured', 'flag'),
+        Column('url'),
+        Column('image_url'),
+    ]
+    
+    # Fields of a product card (<li class="product-col">), read in one walk of the card
+    PRODUCT_FIELDS = [
+        Field('title', 'h3.woocommerce-loop-product__title', default='N/A'),
+        Field('url', ['a.product-loop-title[href]', 'a[href]'], attr='href', default='N/A'),
+        # Anchors of the first category list only; an empty list reads ''
+        Field('categories', 'span.category-list', default='N/A',
+              get=lambda span: ', '.join(a.get_text(strip=True) for a in span.find_all('a'))),
+        Field('price', 'span.price'),
+        Field('sale_badge', 'div.onsale'),
+        Field('stock_status', 'div.stock', attr='class', default='In Stock',
+              post=lambda classes: 'Out of Stock' if 'out-of-stock' in classes else 'In Stock'),
+        Field('sku', 'a[data-product_sku]', attr='data-product_sku', default='N/A'),
+        Field('product_id', 'a[data-product_id]', attr='data-product_id', default='N/A'),
+        Field('rating', 'div.star-rating strong.rating', default='0'),
+        Field('featured', 'div.onhot', post=lambda _: 'Yes', default='No'),
+        Field('image_url', 'img.attachment-woocommerce_thumbnail[src]', attr='src', default='N/A'),
+    ]
+    
+    def __init__(self, base_url: str, page_size: int = 36, delay: float = 1.0,
+                 concurrency: int = 1, rate_limiter: Optional[HostRateLimiter] = None,
+                 cache_dir: Optional[str] = None, cache_ttl: float = 0,
+                 session_options: Optional[Dict] = None,
+                 parser: Optional[str] = None, journal: Optional[Journal] = None):
         """
         Initialize the scraper
         
         Args:
             base_url: The base URL of the store
             page_size: Number of products per page (max 36)
-            delay: Delay between requests in seconds
+            delay: Minimum average interval between requests in seconds
+            concurrency: Maximum number of requests in flight at once
+                (1 keeps the original serial behaviour)
+            rate_limiter: Shared per-host rate limiter (defaults to one
+                allowing a request every `delay` seconds per concurrent
+                request, see HostRateLimiter.for_workers)
+            cache_dir: Directory for the on-disk HTTP cache (None disables it)
+            cache_ttl: Seconds a cached page is reused without revalidation
+            session_options: Keyword arguments for create_session() (pool
+                size, keep-alive, compression, timeouts, HTTP/2)
+            parser: HTML parser backend (html.parser, lxml or selectolax)
+            journal: Checkpoint journal every fetched listing page is recorded
+                in; pages it already holds are replayed instead of fetched
         """
         self.base_url = base_url
         self.page_size = min(page_size, 36)  # Max is 32
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
-        
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter or HostRateLimiter.for_workers(delay, self.concurrency)
+        # Caps in-flight requests across all pages and categories
+        self._fetch_slots = threading.BoundedSemaphore(self.concurrency)
+        # Network fetches per URL (each listing page should be fetched exactly once)
+        self.fetch_counts: Counter = Counter()
+        self._fetch_lock = threading.Lock()
+        self.parser = resolve_parser(parser)
+        self.session = create_session(user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                                      workers=self.concurrency, **(session_options or {}))
+        self.http_cache = install_cache(self.session, cache_dir, default_ttl=cache_ttl) if cache_dir else None
+        self.product_plan = ExtractionPlan(self.PRODUCT_FIELDS, finalize=self.finalize_product)
+        self.journal = journal
+        # Unique products of scrape_categories()
+        self.product_index = ProductIndex('boliviamart', category_field='scrape_category',
+                                          memberships_field='scrape_categories')
+        
+    def get_page(self, url: str, parse_only: Optional[SoupStrainer] = None) -> Optional[BeautifulSoup]:
         """
         Fetch and parse a page
         
         Args:
             url: URL to fetch
+            parse_only: Only build the subtrees this strainer matches
             
         Returns:
             BeautifulSoup object or None if error
         """
         try:
+            self.rate_limiter.wait(url)
             logger.info(f"Fetching: {url}")
-            response = self.session.get(url, timeout=30)
+            with self._fetch_lock:
+                self.fetch_counts[url] += 1
+            with self._fetch_slots:
+                response = self.session.get(url)
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            return parse_html(response.content, self.parser, parse_only)
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
@@ -71,28 +219,20 @@ class BoliviamartScraper:
             price_text: Text containing price
             
         Returns:
-            Dictionary with regular_price and sale_price
+            Dictionary with regular_price and sale_price ("1234.50" format)
         """
         prices = {
             'regular_price': None,
             'sale_price': None
         }
         
-        # Remove currency symbol and clean text
-        clean_text = re.sub(r'[^\d.,\-–]', ' ', price_text)
+        # Amounts in either format (1,234.50 or 1.234,50), as centavos
+        amounts = find_amounts(price_text)
         
-        # Find all numbers (price format: 123.00 or 1,234.00)
-        price_matches = re.findall(r'\d{1,3}(?:[.,]\d{3})*(?:[.,]\d{2})?', clean_text)
-        
-        if price_matches:
-            if len(price_matches) >= 2:
-                # First is regular, second is sale
-                prices['regular_price'] = price_matches[0].replace(',', '')
-                prices['sale_price'] = price_matches[1].replace(',', '')
-            else:
-                # Only one price
-                prices['regular_price'] = price_matches[0].replace(',', '')
-                prices['sale_price'] = price_matches[0].replace(',', '')
+        if amounts:
+            # First is regular, second is sale; a single price is both
+            prices['regular_price'] = format_amount(amounts[0])
+            prices['sale_price'] = format_amount(amounts[1] if len(amounts) >= 2 else amounts[0])
         
         return prices
     
@@ -108,102 +248,53 @@ class BoliviamartScraper:
             Dictionary with product information
         """
         try:
-            product_data = {}
-            
             # Category from scraping path
-            product_data['scrape_category'] = category_name
-            
-            # Product title
-            title_elem = product_element.find('h3', class_='woocommerce-loop-product__title')
-            product_data['title'] = title_elem.get_text(strip=True) if title_elem else 'N/A'
+            product_data = {'scrape_category': category_name}
+            product_data.update(self.product_plan.extract(product_element))
+            return product_data
             
-            # Product URL
-            link_elem = product_element.find('a', class_='product-loop-title')
-            if not link_elem:
-                link_elem = product_element.find('a', href=True)
-            product_data['url'] = link_elem['href'] if link_elem and 'href' in link_elem.attrs else 'N/A'
+        except Exception as e:
+            logger.error(f"Error extracting product info: {e}")
+            return None
+    
+    def finalize_product(self, fields: Dict) -> Dict:
+        """
+        Derive the price and sale columns from the fields read off a card
+        
+        Args:
+            fields: Record extracted with PRODUCT_FIELDS
             
-            # Categories
-            category_elem = product_element.find('span', class_='category-list')
-            if category_elem:
-                categories = [cat.get_text(strip=True) for cat in category_elem.find_all('a')]
-                product_data['categories'] = ', '.join(categories)
-            else:
-                product_data['categories'] = 'N/A'
+        Returns:
+            Product dictionary
+        """
+        product_data = {
+            'title': fields['title'],
+            'url': fields['url'],
+            'categories': fields['categories'],
+        }
+        
+        # Price
+        if fields['price'] is not None:
+            prices = self.extract_price(fields['price'])
+            product_data['regular_price'] = prices['regular_price'] or 'N/A'
+            product_data['sale_price'] = prices['sale_price'] or 'N/A'
             
-            # Price
-            price_elem = product_element.find('span', class_='price')
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
-                prices = self.extract_price(price_text)
-                product_data['regular_price'] = prices['regular_price'] or 'N/A'
-                product_data['sale_price'] = prices['sale_price'] or 'N/A'
-                
-                # Check if on sale
-                if product_element.find('div', class_='onsale'):
-                    product_data['on_sale'] = 'Yes'
-                    # Extract discount percentage if available
-                    sale_badge = product_element.find('div', class_='onsale')
-                    if sale_badge:
-                        product_data['discount'] = sale_badge.get_text(strip=True)
-                    else:
-                        product_data['discount'] = 'N/A'
-                else:
-                    product_data['on_sale'] = 'No'
-                    product_data['discount'] = 'N/A'
+            # On sale when the card has a sale badge (its text is the discount)
+            if fields['sale_badge'] is not None:
+                product_data['on_sale'] = 'Yes'
+                product_data['discount'] = fields['sale_badge']
             else:
-                product_data['regular_price'] = 'N/A'
-                product_data['sale_price'] = 'N/A'
                 product_data['on_sale'] = 'No'
                 product_data['discount'] = 'N/A'
-            
-            # Stock status
-            stock_elem = product_element.find('div', class_='stock')
-            if stock_elem and 'out-of-stock' in stock_elem.get('class', []):
-                product_data['stock_status'] = 'Out of Stock'
-            else:
-                product_data['stock_status'] = 'In Stock'
-            
-            # Product SKU (if available in data attributes)
-            sku = 'N/A'
-            add_to_cart_btn = product_element.find('a', {'data-product_sku': True})
-            if add_to_cart_btn:
-                sku = add_to_cart_btn.get('data-product_sku', 'N/A')
-            product_data['sku'] = sku
-            
-            # Product ID
-            product_id = 'N/A'
-            add_to_cart_btn = product_element.find('a', {'data-product_id': True})
-            if add_to_cart_btn:
-                product_id = add_to_cart_btn.get('data-product_id', 'N/A')
-            product_data['product_id'] = product_id
-            
-            # Rating
-            rating_elem = product_element.find('div', class_='star-rating')
-            if rating_elem:
-                rating_strong = rating_elem.find('strong', class_='rating')
-                product_data['rating'] = rating_strong.get_text(strip=True) if rating_strong else '0'
-            else:
-                product_data['rating'] = '0'
-            
-            # Featured/Hot
-            if product_element.find('div', class_='onhot'):
-                product_data['featured'] = 'Yes'
-            else:
-                product_data['featured'] = 'No'
-            
-            # Image URL
-            img_elem = product_element.find('img', class_='attachment-woocommerce_thumbnail')
-            if img_elem and 'src' in img_elem.attrs:
-                product_data['image_url'] = img_elem['src']
-            else:
-                product_data['image_url'] = 'N/A'
-            
-            return product_data
-            
-        except Exception as e:
-            logger.error(f"Error extracting product info: {e}")
-            return None
+        else:
+            product_data['regular_price'] = 'N/A'
+            product_data['sale_price'] = 'N/A'
+            product_data['on_sale'] = 'No'
+            product_data['discount'] = 'N/A'
+        
+        for key in ('stock_status', 'sku', 'product_id', 'rating', 'featured', 'image_url'):
+            product_data[key] = fields[key]
+        return product_data
     
     def get_total_pages(self, soup: BeautifulSoup) -> int:
         """
@@ -238,22 +329,70 @@ class BoliviamartScraper:
             logger.error(f"Error getting total pages: {e}")
             return 1
     
-    def scrape_page(self, url: str, category_name: str = 'N/A') -> List[Dict]:
+    def scrape_page(self, url: str, category_name: str = 'N/A',
+                    soup: Optional[BeautifulSoup] = None) -> List[Dict]:
         """
         Scrape all products from a single page
         
         Args:
             url: URL of the page to scrape
             category_name: Name of the category being scraped
+            soup: The page if it was already fetched and parsed (fetched
+                with LISTING_PARTS if omitted)
             
         Returns:
             List of product dictionaries
         """
-        products = []
-        soup = self.get_page(url)
+        if soup is None:
+            soup = self.get_page(url, LISTING_PARTS)
         
         if not soup:
-            return products
+            return []
+        
+        return self.extract_products(soup, url, category_name)
+    
+    def fetch_listing_page(self, url: str, category_name: str = 'N/A') -> Optional[ListingPage]:
+        """
+        Fetch a listing page once and read both its products and its pagination
+        
+        With a journal, a page it holds is replayed without a fetch, and a
+        fetched page is recorded before its products reach the index.
+        
+        Args:
+            url: URL of the listing page
+            category_name: Name of the category being scraped
+            
+        Returns:
+            ListingPage, or None if the page could not be fetched
+        """
+        if self.journal is not None:
+            journaled = self.journal.get(url)
+            if journaled is not None:
+                return ListingPage(url, journaled['products'], journaled['total_pages'])
+        
+        soup = self.get_page(url, LISTING_PARTS)
+        
+        if not soup:
+            return None
+        
+        page = ListingPage(url, self.scrape_page(url, category_name, soup), self.get_total_pages(soup))
+        if self.journal is not None:
+            self.journal.record(url, {'products': page.products, 'total_pages': page.total_pages})
+        return page
+    
+    def extract_products(self, soup: BeautifulSoup, url: str, category_name: str = 'N/A') -> List[Dict]:
+        """
+        Extract all products from a parsed listing page
+        
+        Args:
+            soup: Page parsed with LISTING_PARTS (or in full)
+            url: URL of the page (for logging)
+            category_name: Name of the category being scraped
+            
+        Returns:
+            List of product dictionaries
+        """
+        products = []
         
         # Find all product elements
         product_elements = soup.find_all('li', class_='product-col')
@@ -280,7 +419,7 @@ class BoliviamartScraper:
                     try:
                         # The content is a JSON string containing escaped HTML
                         unescaped_html = json.loads(script_content)
-                        template_soup = BeautifulSoup(unescaped_html, 'html.parser')
+                        template_soup = parse_html(unescaped_html, self.parser, LISTING_PARTS)
                         product_elements = template_soup.find_all('li', class_='product-col')
                         logger.info(f"Found {len(product_elements)} products in script template")
                         break
@@ -301,51 +440,160 @@ class BoliviamartScraper:
         
         return products
     
-    def scrape_all(self, start_url: str, category_name: str = 'N/A') -> List[Dict]:
+    def scrape_all(self, start_url: str, category_name: str = 'N/A',
+                   sink: Optional[ProductSink] = None) -> List[Dict]:
         """
         Scrape all products from all pages
         
         Args:
             start_url: Starting URL
             category_name: Name of the category being scraped
+            sink: Sink each page's products are written to, in page order,
+                as soon as the page is extracted (None collects them)
             
         Returns:
-            List of all products
+            List of all products (empty when they were written to the sink)
         """
         all_products = []
+        product_count = 0
+        
+        def collect(products: List[Dict]):
+            nonlocal product_count
+            product_count += len(products)
+            if sink is not None:
+                sink.write(products)
+            else:
+                all_products.extend(products)
         
         # First, determine URL structure with page size
         parsed_url = urlparse(start_url)
         base_path = parsed_url.path.rstrip('/')
         
-        # Fetch first page to determine total pages
+        # Fetch first page once: it gives both the total pages and the first products
         first_page_url = f"{parsed_url.scheme}://{parsed_url.netloc}{base_path}/?count={self.page_size}"
-        soup = self.get_page(first_page_url)
+        first_page = self.fetch_listing_page(first_page_url, category_name)
         
-        if not soup:
+        if not first_page:
             logger.error("Failed to fetch first page")
             return all_products
         
-        total_pages = self.get_total_pages(soup)
+        total_pages = first_page.total_pages
         logger.info(f"Total pages to scrape: {total_pages}")
         
         # Scrape first page
         logger.info(f"Scraping page 1/{total_pages}")
-        products = self.scrape_page(first_page_url, category_name)
-        all_products.extend(products)
+        collect(first_page.products)
         
         # Scrape remaining pages
-        for page_num in range(2, total_pages + 1):
-            time.sleep(self.delay)  # Respectful delay
+        page_urls = [
+            f"{parsed_url.scheme}://{parsed_url.netloc}{base_path}/page/{page_num}/?count={self.page_size}"
+            for page_num in range(2, total_pages + 1)
+        ]
+        
+        if self.concurrency > 1 and page_urls:
+            # executor.map yields in submission order, so the output matches the serial path
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                page_results = executor.map(
+                    lambda item: self._scrape_numbered_page(item[1], item[0], total_pages, category_name),
+                    enumerate(page_urls, 2)
+                )
+                for products in page_results:
+                    collect(products)
+        else:
+            for page_num, page_url in enumerate(page_urls, 2):
+                collect(self._scrape_numbered_page(page_url, page_num, total_pages, category_name))
+        
+        logger.info(f"Total products scraped: {product_count}")
+        return all_products
+    
+    def _scrape_numbered_page(self, page_url: str, page_num: int, total_pages: int,
+                              category_name: str) -> List[Dict]:
+        """
+        Scrape one of the follow-up pages of a category
+        
+        Args:
+            page_url: URL of the page to scrape
+            page_num: Page number (for progress logging)
+            total_pages: Total number of pages in the category
+            category_name: Name of the category being scraped
+            
+        Returns:
+            List of product dictionaries
+        """
+        logger.info(f"Scraping page {page_num}/{total_pages}")
+        page = self.fetch_listing_page(page_url, category_name)
+        return page.products if page else []
+    
+    def scrape_categories(self, categories: List[Tuple[str, str]],
+                          sink: Optional[ProductSink] = None) -> List[Dict]:
+        """
+        Scrape several categories, concurrently when concurrency > 1
+        
+        The store-wide listing repeats the products of every category, so the
+        products are merged by product ID in self.product_index: every
+        product is kept once, with all the categories it was listed in under
+        `scrape_categories`.
+        
+        With a sink (built on self.product_index), products are written as
+        they are scraped: page by page when categories are scraped one at a
+        time, category by category (in the given order) when concurrently.
+        
+        Args:
+            categories: List of (url, category_name) tuples
+            sink: Sink the products are written to (None keeps them in
+                self.product_index)
             
-            page_url = f"{parsed_url.scheme}://{parsed_url.netloc}{base_path}/page/{page_num}/?count={self.page_size}"
-            logger.info(f"Scraping page {page_num}/{total_pages}")
+        Returns:
+            List of unique products not written to the sink, in the order
+            they were first listed
+        """
+        def store(products: List[Dict]):
+            if sink is not None:
+                sink.write(products)
+            else:
+                self.product_index.extend(products)
+        
+        def scrape_category(idx: int, url: str, category_name: str,
+                            category_sink: Optional[ProductSink] = None) -> List[Dict]:
+            logger.info("")
+            logger.info("="*60)
+            logger.info(f"Category {idx}/{len(categories)}: {category_name}")
+            logger.info(f"URL: {url}")
+            logger.info("="*60)
             
-            products = self.scrape_page(page_url, category_name)
-            all_products.extend(products)
+            try:
+                products = self.scrape_all(url, category_name, category_sink)
+                logger.info(f"✓ {category_name}: scraped")
+                return products
+            except Exception as e:
+                logger.error(f"✗ {category_name}: Error - {e}")
+                return []
+        
+        if self.concurrency > 1:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                futures = [
+                    executor.submit(scrape_category, idx, url, category_name)
+                    for idx, (url, category_name) in enumerate(categories, 1)
+                ]
+                for future in futures:
+                    store(future.result())
+        else:
+            for idx, (url, category_name) in enumerate(categories, 1):
+                store(scrape_category(idx, url, category_name, sink))
         
-        logger.info(f"Total products scraped: {len(all_products)}")
-        return all_products
+        logger.info(format_index_stats(self.product_index))
+        return self.product_index.records
+    
+    def fetch_summary(self) -> str:
+        """
+        Summarize the network fetches of the run in one line
+        
+        Returns:
+            Most fetches of a single URL, total fetches and unique URLs
+        """
+        most = max(self.fetch_counts.values()) if self.fetch_counts else 0
+        return (f"Fetches per URL: max {most} "
+                f"({sum(self.fetch_counts.values())} fetches, {len(self.fetch_counts)} unique URLs)")
     
     def save_to_csv(self, products: List[Dict], filename: str = 'boliviamart_products.csv'):
         """
@@ -359,42 +607,70 @@ class BoliviamartScraper:
             logger.warning("No products to save")
             return
         
-        # Define CSV columns
-        fieldnames = [
-            'scrape_category',
-            'product_id',
-            'sku',
-            'title',
-            'categories',
-            'regular_price',
-            'sale_price',
-            'on_sale',
-            'discount',
-            'stock_status',
-            'rating',
-            'featured',
-            'url',
-            'image_url'
-        ]
-        
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(products)
+            with CSVSink(filename, self.CSV_FIELDS) as sink:
+                sink.write(products)
             
             logger.info(f"Successfully saved {len(products)} products to {filename}")
             
         except Exception as e:
             logger.error(f"Error saving to CSV: {e}")
+    
+    def save_to_parquet(self, products: List[Dict], root: str = 'snapshots'):
+        """
+        Save products as a typed Parquet snapshot (needs pyarrow)
+        
+        Args:
+            products: List of product dictionaries
+            root: Snapshot directory, partitioned by marketplace and date
+        """
+        if not products:
+            logger.warning("No products to save")
+            return
+        
+        try:
+            with ParquetSink(root, 'boliviamart', self.PARQUET_COLUMNS) as sink:
+                sink.write(products)
+            
+            logger.info(f"Successfully saved {len(products)} products to {sink.path}")
+            
+        except Exception as e:
+            logger.error(f"Error saving to Parquet: {e}")
 
 
 def main():
     """Main function"""
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scrape Boliviamart products to CSV")
+    parser.add_argument('url', nargs='?', help="Scrape a single category/store URL")
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help="Maximum number of concurrent requests (default: 1, serial); "
+                             "the default rate limit grows with it, see --rate")
+    parser.add_argument('--cache-dir', help="Directory for the on-disk HTTP cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="Seconds a cached page is reused without revalidation (default: 0)")
+    parser.add_argument('--base-url', default="https://www.boliviamart.com",
+                        help="Site to crawl (default: https://www.boliviamart.com)")
+    parser.add_argument('--parser', choices=PARSERS, default=None,
+                        help="HTML parser backend (default: html.parser)")
+    parser.add_argument('--db', help="SQLite snapshot store the products and category counts are also written to")
+    parser.add_argument('--parquet', metavar='DIR',
+                        help="Also write a typed Parquet snapshot under DIR (needs pyarrow)")
+    add_client_arguments(parser)
+    add_rate_limit_arguments(parser, delay=1.0, workers_option='--concurrency')
+    add_journal_arguments(parser, 'boliviamart_products.journal')
+    args = parser.parse_args()
+    rate_limiter = rate_limiter_from_args(args, delay=1.0, workers=args.concurrency)
+    logger.info(format_rate_limit(rate_limiter))
+    
+    # Every fetched listing page is journaled; --resume replays the journaled pages
+    journal = open_journal(args, 'boliviamart')
+    if args.resume:
+        logger.info(f"Resuming from {args.journal}: {len(journal)} pages journaled")
     
     # Define all categories to scrape
-    base_domain = "https://www.boliviamart.com"
+    base_domain = args.base_url.rstrip('/')
     categories = [
         ("/tienda", "Tienda General"),
         ("/categoria/audio", "Audio"),
@@ -412,9 +688,43 @@ def main():
         ("/categoria/videojuegos-y-consolas", "Videojuegos y Consolas"),
     ]
     
+    output_filename = 'boliviamart_products.csv'
+    
+    def scrape_to_outputs(scraper: BoliviamartScraper, categories: List[Tuple[str, str]]):
+        """Scrape categories, writing products to every output (CSV, --db, --parquet) as they come"""
+        index = scraper.product_index
+        with ExitStack() as outputs:
+            sinks = [CSVSink(output_filename, BoliviamartScraper.CSV_FIELDS, index=index)]
+            if args.db:
+                store = outputs.enter_context(SnapshotStore(args.db))
+                run_id = outputs.enter_context(store.run('boliviamart'))
+                sinks.append(SnapshotSink(store, run_id, index=index))
+            if args.parquet:
+                sinks.append(ParquetSink(args.parquet, 'boliviamart', BoliviamartScraper.PARQUET_COLUMNS,
+                                         index=index))
+            with TeeSink(sinks, index=index) as sink:
+                scraper.scrape_categories(categories, sink)
+                if not len(index):
+                    sink.discard()
+            if args.db:
+                # Unique products listed in each category
+                counts = Counter(category for memberships in index.memberships() for category in memberships)
+                store.add_category_counts(run_id, [
+                    {'url': url, 'category_name': category_name, 'product_count': counts[category_name]}
+                    for url, category_name in categories
+                ])
+                logger.info(f"Run {run_id} recorded in {args.db}")
+            if args.parquet and len(index):
+                logger.info(f"Parquet snapshot saved to {sinks[-1].path}")
+        if len(index):
+            # The outputs are complete: the next run starts over
+            journal.complete()
+        else:
+            journal.close()
+    
     # Allow single URL scraping if provided as argument
-    if len(sys.argv) > 1:
-        single_url = sys.argv[1]
+    if args.url:
+        single_url = args.url
         logger.info(f"Single URL mode: {single_url}")
         
         # Determine category name from URL
@@ -424,18 +734,27 @@ def main():
         scraper = BoliviamartScraper(
             base_url=single_url,
             page_size=36,
-            delay=1.0
+            delay=1.0,
+            concurrency=args.concurrency,
+            rate_limiter=rate_limiter,
+            cache_dir=args.cache_dir,
+            cache_ttl=args.cache_ttl,
+            session_options=client_options(args),
+            parser=args.parser,
+            journal=journal
         )
         
-        products = scraper.scrape_all(single_url, category_name)
+        scrape_to_outputs(scraper, [(single_url, category_name)])
         
-        if products:
-            output_filename = 'boliviamart_products.csv'
-            scraper.save_to_csv(products, output_filename)
+        if len(scraper.product_index):
             logger.info(f"Scraping complete! Data saved to {output_filename}")
-            logger.info(f"Total products: {len(products)}")
+            logger.info(f"Total products: {len(scraper.product_index)}")
         else:
             logger.error("No products were scraped")
+        logger.info(scraper.fetch_summary())
+        logger.info(format_journal_stats(journal))
+        if scraper.http_cache:
+            logger.info(format_cache_stats(scraper.http_cache.stats))
         return
     
     # Multi-category scraping mode
@@ -444,63 +763,51 @@ def main():
     logger.info(f"Will scrape {len(categories)} categories")
     logger.info("="*60)
     
-    all_products = []
     page_size = 36
     
     # Initialize scraper
     scraper = BoliviamartScraper(
         base_url=base_domain,
         page_size=page_size,
-        delay=1.0
+        delay=1.0,
+        concurrency=args.concurrency,
+        rate_limiter=rate_limiter,
+        cache_dir=args.cache_dir,
+        cache_ttl=args.cache_ttl,
+        session_options=client_options(args),
+        parser=args.parser,
+        journal=journal
     )
     
-    # Scrape each category
-    for idx, (path, category_name) in enumerate(categories, 1):
-        url = base_domain + path
-        
-        logger.info("")
-        logger.info("="*60)
-        logger.info(f"Category {idx}/{len(categories)}: {category_name}")
-        logger.info(f"URL: {url}")
-        logger.info("="*60)
-        
-        try:
-            products = scraper.scrape_all(url, category_name)
-            all_products.extend(products)
-            logger.info(f"✓ {category_name}: {len(products)} products scraped")
-        except Exception as e:
-            logger.error(f"✗ {category_name}: Error - {e}")
-            continue
-        
-        # Add delay between categories
-        if idx < len(categories):
-            time.sleep(2.0)
+    # Scrape each category, writing products to the CSV as they are scraped
+    scrape_to_outputs(scraper, [(base_domain + path, category_name) for path, category_name in categories])
     
-    # Save all products to CSV
-    if all_products:
-        output_filename = 'boliviamart_products.csv'
-        scraper.save_to_csv(all_products, output_filename)
-        
+    if len(scraper.product_index):
         logger.info("")
         logger.info("="*60)
         logger.info("SCRAPING COMPLETE!")
         logger.info("="*60)
-        logger.info(f"Total products scraped: {len(all_products)}")
+        logger.info(f"Unique products scraped: {len(scraper.product_index)}")
         logger.info(f"Data saved to: {output_filename}")
         logger.info(f"Categories scraped: {len(categories)}")
         
-        # Show breakdown by category
+        # Show breakdown by category (a product counts in every category listing it)
         logger.info("")
         logger.info("Breakdown by category:")
         category_counts = {}
-        for product in all_products:
-            cat = product.get('scrape_category', 'Unknown')
-            category_counts[cat] = category_counts.get(cat, 0) + 1
+        for memberships in scraper.product_index.memberships():
+            for cat in memberships or ['Unknown']:
+                category_counts[cat] = category_counts.get(cat, 0) + 1
         
         for cat, count in sorted(category_counts.items()):
             logger.info(f"  {cat}: {count} products")
     else:
         logger.error("No products were scraped from any category")
+    
+    logger.info(scraper.fetch_summary())
+    logger.info(format_journal_stats(journal))
+    if scraper.http_cache:
+        logger.info(format_cache_stats(scraper.http_cache.stats))
 
 
 if __name__ == "__main__":
@@ -4,8 +4,13 @@ Test script to validate the Boliviamart scraper
 This script performs basic validation without doing a full scrape.
 """
 
+import os
 import sys
-from scraper_boliviamart import BoliviamartScraper
+import tempfile
+from scraper_boliviamart import BoliviamartScraper, LISTING_PARTS
+from common.checkpoint import Journal
+from common.html_parser import available_parsers, parse_html
+from common.marketplace_server import MarketplaceServer
 import logging
 
 logging.basicConfig(
@@ -142,6 +147,137 @@ def test_csv_export():
         return False
 
 
+def test_parser_backends():
+    """Test that every parser backend, full or restricted, extracts the same data from the capture"""
+    print("\n" + "="*60)
+    print("TEST 5: Parser Backends")
+    print("="*60)
+    
+    capture = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Boliviamart - Tienda.html')
+    with open(capture, 'rb') as f:
+        html = f.read()
+    
+    extracted = {}
+    top_level = set()
+    for backend in available_parsers():
+        scraper = BoliviamartScraper(base_url="https://www.boliviamart.com", parser=backend)
+        for mode, parse_only in (('full', None), ('restricted', LISTING_PARTS)):
+            soup = parse_html(html, backend, parse_only)
+            products = scraper.extract_products(soup, capture, 'Tienda')
+            extracted[backend, mode] = (scraper.get_total_pages(soup), products)
+            print(f"  {backend:<12} {mode:<10} {len(products)} products, {extracted[backend, mode][0]} pages")
+            if parse_only is not None and backend != 'selectolax':
+                # The strainer must really leave the page chrome out of the tree
+                top_level.update(tag.name for tag in soup.find_all(True, recursive=False))
+    
+    print(f"  Restricted top-level tags: {', '.join(sorted(top_level))}")
+    if not top_level <= {'li', 'ul', 'script'}:
+        print("✗ Restricted parse built tags outside the listing parts")
+        return False
+    reference = extracted['html.parser', 'full']
+    if reference[1] and all(result == reference for result in extracted.values()):
+        print(f"✓ {len(extracted)} parses extracted identical records")
+        return True
+    print("✗ Parses disagree")
+    return False
+
+
+def test_category_list():
+    """Test the categories column of cards without, with empty and with several category lists"""
+    print("\n" + "="*60)
+    print("TEST 8: Category List (offline)")
+    print("="*60)
+    
+    cards = {
+        'no list': (b"<h3 class='woocommerce-loop-product__title'>Sin lista</h3>", 'N/A'),
+        'empty list': (b"<span class='category-list'></span>"
+                       b"<h3 class='woocommerce-loop-product__title'>Sin categorias</h3>", ''),
+        'two lists': (b"<span class='category-list'><a>Audio</a>, <a>Parlantes</a></span>"
+                      b"<span class='category-list'><a>Ofertas</a></span>"
+                      b"<h3 class='woocommerce-loop-product__title'>Parlante</h3>", 'Audio, Parlantes'),
+    }
+    ok = True
+    for backend in available_parsers():
+        scraper = BoliviamartScraper(base_url="https://www.boliviamart.com", parser=backend)
+        for case, (markup, expected) in cards.items():
+            card = parse_html(b"<ul><li class='product-col'>" + markup + b"</li></ul>", backend)
+            categories = scraper.extract_product_info(card.find('li', class_='product-col'))['categories']
+            same = categories == expected
+            ok = ok and same
+            print(f"  {'✓' if same else '✗'} {backend:<12} {case:<11} {categories!r}")
+    return ok
+
+
+def test_single_fetch_per_page():
+    """Test that every listing page is fetched once and the page object carries products and pagination"""
+    print("\n" + "="*60)
+    print("TEST 6: One Fetch per Listing Page (local stand-in server)")
+    print("="*60)
+    
+    server = MarketplaceServer().start()
+    try:
+        base = f"{server.base_url}/boliviamart"
+        scraper = BoliviamartScraper(base_url=base, delay=0, concurrency=4)
+        page = scraper.fetch_listing_page(f"{base}/categoria/audio/?count=36", 'Audio')
+        page_ok = page is not None and len(page.products) > 0 and page.total_pages > 1
+        print(f"  {'✓' if page_ok else '✗'} {page}")
+        
+        scraper = BoliviamartScraper(base_url=base, delay=0, concurrency=4)
+        categories = [(f"{base}/tienda", 'Tienda General'), (f"{base}/categoria/audio", 'Audio'),
+                      (f"{base}/categoria/seguridad", 'Seguridad')]
+        scraper.scrape_categories(categories)
+    finally:
+        server.stop()
+    
+    print(f"  {scraper.fetch_summary()}")
+    # Every URL fetched once, and one URL per listing page
+    expected = page.total_pages if page_ok else 0
+    audio_pages = sum(1 for url in scraper.fetch_counts if '/categoria/audio/' in url)
+    if page_ok and max(scraper.fetch_counts.values()) == 1 and audio_pages == expected:
+        print(f"✓ {len(scraper.fetch_counts)} listing pages, each fetched once")
+        return True
+    print(f"✗ Audio: {audio_pages} URLs fetched for {expected} pages")
+    return False
+
+
+def test_resume_from_journal():
+    """Test that a run resumed from its journal only fetches the missing pages and gets the same products"""
+    print("\n" + "="*60)
+    print("TEST 7: Resume from the Checkpoint Journal (local stand-in server)")
+    print("="*60)
+    
+    server = MarketplaceServer().start()
+    base = f"{server.base_url}/boliviamart"
+    categories = [(f"{base}/tienda", 'Tienda General'), (f"{base}/categoria/audio", 'Audio'),
+                  (f"{base}/categoria/seguridad", 'Seguridad')]
+    try:
+        complete = BoliviamartScraper(base_url=base, delay=0, concurrency=4)
+        complete.scrape_categories(categories)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'boliviamart.journal')
+            # The first run dies after two categories
+            with Journal(path, 'boliviamart') as journal:
+                BoliviamartScraper(base_url=base, delay=0, concurrency=4, journal=journal
+                                   ).scrape_categories(categories[:2])
+            with Journal(path, 'boliviamart', resume=True) as journal:
+                resumed = BoliviamartScraper(base_url=base, delay=0, concurrency=4, journal=journal)
+                resumed.scrape_categories(categories)
+                journaled = journal.stats['loaded']
+    finally:
+        server.stop()
+    
+    total_fetches = sum(complete.fetch_counts.values())
+    resumed_fetches = sum(resumed.fetch_counts.values())
+    same = resumed.product_index.records == complete.product_index.records
+    print(f"  {resumed.fetch_summary()}")
+    if same and journaled and resumed_fetches == total_fetches - journaled:
+        print(f"✓ {journaled} pages replayed, {resumed_fetches} of {total_fetches} fetched again; same products")
+        return True
+    print(f"✗ same products: {same}, journaled: {journaled}, fetches: {resumed_fetches} of {total_fetches}")
+    return False
+
+
 def run_all_tests():
     """Run all validation tests"""
     print("\n" + "="*60)
@@ -162,6 +298,18 @@ def run_all_tests():
     # Test 4: CSV Export
     results.append(("CSV Export", test_csv_export()))
     
+    # Test 5: Parser backends (offline)
+    results.append(("Parser Backends", test_parser_backends()))
+    
+    # Test 6: One fetch per listing page (offline)
+    results.append(("One Fetch per Page", test_single_fetch_per_page()))
+    
+    # Test 7: Resume from the checkpoint journal (offline)
+    results.append(("Resume from Journal", test_resume_from_journal()))
+    
+    # Test 8: Category list of a card (offline)
+    results.append(("Category List", test_category_list()))
+    
     # Summary
     print("\n" + "="*60)
     print("TEST SUMMARY")
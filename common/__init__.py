@@ -0,0 +1,7 @@
+"""
+Shared building blocks for the marketplace scrapers
+
+Each marketplace folder is still a standalone script; this package holds the
+pieces they all use (rate limiting, HTTP plumbing, ...). Scrapers add the
+repository root to sys.path before importing from here.
+"""
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+HTTP Client Benchmark
+
+Fetches the same set of category pages from the local stand-in server with
+each client setting and reports how it changes wall-clock time, the number
+of TCP connections the server saw and the bytes that crossed the wire.
+
+Variants:
+    requests default   bare requests.Session() (pool of 10 connections)
+    tuned              create_session() with pool_size = workers
+    no keep-alive      tuned, but a new connection for every request
+    no compression     tuned, but uncompressed bodies
+    http2              tuned, httpx transport (skipped if httpx is missing)
+
+The stand-in server only speaks HTTP/1.1 over plain TCP, so the http2
+variant measures the httpx transport's overhead here; multiplexing only
+happens against servers that negotiate HTTP/2 (the live sites, over TLS).
+
+Over loopback, compression costs more CPU than it saves in transfer time;
+pass --bandwidth to throttle responses like a real link.
+
+Usage:
+    python common/benchmark_client.py --workers 16 --requests 200 --latency 0.05
+    python common/benchmark_client.py --bandwidth 2e6
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.http_client import create_session, httpx
+from common.marketplace_server import MarketplaceServer
+
+
+def benchmark_urls(base_url: str, count: int) -> List[str]:
+    """
+    Build a mixed workload of Dismac, Venbo and Boliviamart category pages
+
+    Args:
+        base_url: Stand-in server URL
+        count: Number of URLs
+
+    Returns:
+        List of distinct page URLs
+    """
+    makers = [
+        lambda i: f"{base_url}/dismac/categoria-{i}.html",
+        lambda i: f"{base_url}/venbo/cat-producto/bench/listado-{i}/",
+        lambda i: f"{base_url}/boliviamart/product-category/bench-{i}/",
+    ]
+    return [makers[i % len(makers)](i) for i in range(count)]
+
+
+def run_variant(session: requests.Session, urls: List[str], workers: int,
+                server: MarketplaceServer) -> Dict:
+    """
+    Fetch every URL with a thread pool and measure the run
+
+    Args:
+        session: Session to benchmark
+        urls: Pages to fetch
+        workers: Concurrent fetches
+        server: Stand-in server (its stats give connections and wire bytes)
+
+    Returns:
+        Dictionary with seconds, connections, wire_bytes and failures
+    """
+    def fetch(url: str) -> bool:
+        try:
+            response = session.get(url)
+            return response.status_code == 200 and len(response.content) > 0
+        except requests.RequestException:
+            return False
+
+    before = dict(server.stats)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ok = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    session.close()
+
+    return {
+        'seconds': elapsed,
+        'connections': server.stats['connections'] - before['connections'],
+        'wire_bytes': server.stats['bytes'] - before['bytes'],
+        'failures': ok.count(False),
+    }
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Compare HTTP client settings against the stand-in server")
+    parser.add_argument('--workers', type=int, default=16, help="Concurrent fetches (default: 16)")
+    parser.add_argument('--requests', type=int, default=200, help="Pages fetched per variant (default: 200)")
+    parser.add_argument('--latency', type=float, default=0.05, help="Server latency in seconds (default: 0.05)")
+    parser.add_argument('--bandwidth', type=float, default=0,
+                        help="Server bytes per second per response, 0 = unlimited (default: 0)")
+    args = parser.parse_args()
+
+    variants: List[tuple] = [
+        ('requests default', requests.Session),
+        ('tuned', lambda: create_session(pool_size=args.workers)),
+        ('no keep-alive', lambda: create_session(pool_size=args.workers, keep_alive=False)),
+        ('no compression', lambda: create_session(pool_size=args.workers, compression=False)),
+    ]
+    if httpx is not None:
+        variants.append(('http2', lambda: create_session(pool_size=args.workers, http2=True)))
+
+    server = MarketplaceServer(latency=args.latency, pages=6, bandwidth=args.bandwidth).start()
+    urls = benchmark_urls(server.base_url, args.requests)
+
+    # Warm the server's page and gzip caches so every variant sees the same work
+    run_variant(create_session(pool_size=args.workers), urls, args.workers, server)
+
+    link = f"{args.bandwidth / 1e6:g} MB/s per response" if args.bandwidth else "unlimited bandwidth"
+    print(f"{args.requests} pages, {args.workers} workers, {args.latency * 1000:.0f} ms server latency, {link}")
+    print("-" * 72)
+    print(f"{'variant':<18} {'seconds':>8} {'vs tuned':>9} {'connections':>12} {'wire MB':>9} {'failed':>7}")
+    print("-" * 72)
+
+    results = {}
+    for name, factory in variants:
+        results[name] = run_variant(factory(), urls, args.workers, server)
+
+    tuned = results['tuned']['seconds']
+    for name, result in results.items():
+        print(f"{name:<18} {result['seconds']:>8.2f} {result['seconds'] / tuned:>8.2f}x "
+              f"{result['connections']:>12} {result['wire_bytes'] / 1e6:>9.1f} {result['failures']:>7}")
+    if httpx is None:
+        print("http2              skipped (pip install 'httpx[http2]')")
+    print("-" * 72)
+
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Checkpoint journal: resume a crawl after a crash instead of starting over
+
+Every scraper appends each completed unit of work (a category page, a
+listing page) with its result to a journal file while it runs. After a
+network drop, a crash or an OOM kill, `--resume` rebuilds the run from the
+journal and only fetches what is missing:
+
+    with Journal('venbo_products.journal', 'venbo', resume=args.resume) as journal:
+        for url in urls:
+            result = journal.get(url)
+            if result is None:
+                result = scrape(url)
+                journal.record(url, result)
+            use(result)
+        write_outputs()
+        journal.complete()
+
+The journal is JSON lines: a header naming the marketplace, then one
+`{"unit": ..., "result": ...}` line per unit, written with a single write()
+and fsynced, so a crash loses at most the unit in flight. A torn last line
+is dropped when the journal is resumed. Results are journaled as extracted,
+before the product index merges them, so replaying the journal in crawl
+order rebuilds the index and every output exactly as the interrupted run
+would have written them. complete() deletes the journal once the outputs
+are in place; a run that fails leaves it for the next `--resume`.
+
+Only the results loaded for replay are held in memory. A unit recorded
+during the run keeps just its key: its result is on disk, and holding every
+page's products would undo the streaming sinks' flat memory use.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+JOURNAL_VERSION = 1
+
+
+class Journal:
+    """Append-only record of the units of work a run has completed"""
+
+    def __init__(self, path: str, marketplace: str, resume: bool = False, sync: bool = True):
+        """
+        Open the journal
+
+        Args:
+            path: Journal file
+            marketplace: Marketplace name, checked when resuming
+            resume: Load the units of an existing journal and append to it
+                (a missing journal starts an empty one); otherwise any
+                existing journal is replaced
+            sync: fsync after every unit (a unit survives an OS crash, not
+                just a crash of the scraper)
+
+        Raises:
+            ValueError: If the journal to resume belongs to another marketplace
+        """
+        self.path = path
+        self.marketplace = marketplace
+        self.sync = sync
+        # Results loaded for replay; units recorded by this run keep only their key
+        self.completed: Dict[str, Any] = {}
+        self.recorded: Set[str] = set()
+        self.stats = {'loaded': 0, 'replayed': 0, 'recorded': 0, 'torn': 0}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+            self._append({'journal': JOURNAL_VERSION, 'marketplace': marketplace,
+                          'started': datetime.now().isoformat()})
+
+    def __repr__(self):
+        return f"Journal({self.path!r}, {len(self.completed)} units)"
+
+    def __len__(self) -> int:
+        return len(self.completed) + len(self.recorded - self.completed.keys())
+
+    def __contains__(self, unit: str) -> bool:
+        return unit in self.completed or unit in self.recorded
+
+    def get(self, unit: str) -> Optional[Any]:
+        """
+        Get the journaled result of a unit
+
+        Args:
+            unit: Unit key (e.g. a page URL)
+
+        Returns:
+            The result loaded from the journal, or None if the unit was not
+            completed before this run (results recorded by this run are not
+            kept in memory)
+        """
+        with self._lock:
+            result = self.completed.get(unit)
+            if result is not None:
+                self.stats['replayed'] += 1
+            return result
+
+    def record(self, unit: str, result: Any):
+        """
+        Append a completed unit (safe to call from worker threads)
+
+        Args:
+            unit: Unit key (e.g. a page URL)
+            result: JSON-serializable result of the unit
+        """
+        line = {'unit': unit, 'result': result}
+        with self._lock:
+            self._append(line)
+            self.recorded.add(unit)
+            self.stats['recorded'] += 1
+
+    def close(self):
+        """Close the file, keeping the journal for a later resume"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def complete(self):
+        """Close and delete the journal: the run's outputs are written"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _append(self, line: Dict):
+        self._file.write(json.dumps(line, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def _load(self):
+        """Read the units of an existing journal, cutting off a torn last line"""
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for number, raw in enumerate(f):
+                try:
+                    if not raw.endswith(b'\n'):
+                        raise ValueError("unterminated line")
+                    line = json.loads(raw)
+                except ValueError:
+                    # Only the line being written when the run died can be torn
+                    self.stats['torn'] += 1
+                    break
+                if number == 0:
+                    if line.get('marketplace') != self.marketplace:
+                        raise ValueError(f"{self.path} is a journal of {line.get('marketplace')!r}, "
+                                         f"not {self.marketplace!r}")
+                else:
+                    self.completed[line['unit']] = line['result']
+                valid_bytes += len(raw)
+        if self.stats['torn']:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        if valid_bytes == 0:
+            # Not even a header survived: start the journal over
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'journal': JOURNAL_VERSION, 'marketplace': self.marketplace,
+                                    'started': datetime.now().isoformat()}) + '\n')
+        self.stats['loaded'] = len(self.completed)
+
+    def __enter__(self) -> 'Journal':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def add_journal_arguments(parser, default_path: str):
+    """
+    Add the checkpoint options to a scraper's argparse parser
+
+    Args:
+        parser: argparse.ArgumentParser of the scraper's main()
+        default_path: Journal file used when --journal is not given
+    """
+    group = parser.add_argument_group('Checkpoints')
+    group.add_argument('--resume', action='store_true',
+                       help="Continue an interrupted run from its journal instead of starting over")
+    group.add_argument('--journal', default=default_path,
+                       help=f"Journal of completed pages (default: {default_path})")
+
+
+def open_journal(args, marketplace: str) -> Journal:
+    """
+    Open the journal named by parsed checkpoint arguments
+
+    Args:
+        args: Namespace returned by parse_args()
+        marketplace: Marketplace name
+
+    Returns:
+        Journal, holding the completed units when resuming
+    """
+    return Journal(args.journal, marketplace, resume=args.resume)
+
+
+def format_journal_stats(journal: Journal) -> str:
+    """
+    Summarize a journal in one line
+
+    Args:
+        journal: Journal after the crawl
+
+    Returns:
+        Human readable summary
+    """
+    stats = journal.stats
+    torn = " (torn last line dropped)" if stats['torn'] else ""
+    return (f"journal: {stats['replayed']} units replayed from {stats['loaded']} journaled{torn}, "
+            f"{stats['recorded']} recorded")
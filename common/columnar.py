@@ -0,0 +1,335 @@
+"""
+Columnar snapshots: typed Parquet files next to the CSV exports
+
+The CSV exports are text: prices are strings such as "1234.50", flags are
+"Yes"/"No" and every missing value is "N/A", so every analysis parses them
+again. ParquetSink writes the same records as typed Arrow columns
+(`pip install pyarrow`):
+
+    COLUMNS = [Column('product_id'), Column('regular_centavos', 'price', field='regular_price'),
+               Column('stock_status', 'category'), Column('category_urls', 'categories')]
+    with ParquetSink('snapshots', 'venbo', COLUMNS, index=index) as sink:
+        for page in pages:
+            sink.write(extract_products(page))
+
+    load_snapshots('snapshots', marketplaces=['venbo'], start=date(2026, 10, 1))
+
+Column kinds:
+
+- text: string
+- category: dictionary-encoded string (few distinct values: categories,
+  stock status, parent category)
+- categories: list of dictionary-encoded strings (a Memberships list, or
+  "first|second")
+- price: int64 centavos (see prices.to_centavos())
+- flag: bool ("Yes"/"No")
+- integer, percent: int64 ("-19%" -> 19)
+- number: float64
+- timestamp: microsecond timestamp from an ISO string
+
+'N/A', '' and None become nulls in every kind.
+
+Files are partitioned by marketplace and date, one file per run:
+`<root>/<kind>/marketplace=<name>/date=<YYYY-MM-DD>/<HHMMSS>.parquet`,
+written as a hidden `.<HHMMSS>.parquet.part` until the run completes.
+load_snapshots() reads them as one table in which marketplace is a
+dictionary column and date a date column, reading only the partitions and
+columns asked for.
+"""
+
+import os
+import re
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed to write or read snapshots
+    pa = None
+
+from common.prices import to_centavos
+from common.product_index import MISSING, Memberships, ProductIndex
+from common.sinks import PART_SUFFIX, ProductSink
+
+DIGITS = re.compile(r'\d+')
+FLAGS = {'Yes': True, 'No': False, True: True, False: False}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; run: pip install pyarrow")
+
+
+def _text(value) -> Optional[str]:
+    return None if value in MISSING else str(value)
+
+
+def _categories(value) -> Optional[List[str]]:
+    if value in MISSING:
+        return None
+    if isinstance(value, str):
+        return value.split(Memberships.SEPARATOR)
+    return list(value)
+
+
+def _price(value) -> Optional[int]:
+    return None if value in MISSING else to_centavos(str(value))
+
+
+def _integer(value) -> Optional[int]:
+    return None if value in MISSING else int(value)
+
+
+def _percent(value) -> Optional[int]:
+    match = DIGITS.search(str(value)) if value not in MISSING else None
+    return int(match.group()) if match else None
+
+
+def _number(value) -> Optional[float]:
+    return None if value in MISSING else float(value)
+
+
+def _timestamp(value) -> Optional[datetime]:
+    if value in MISSING:
+        return None
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+# Column kind -> (converter, Arrow type factory)
+KINDS: Dict[str, tuple] = {
+    'text': (_text, lambda: pa.string()),
+    'category': (_text, lambda: pa.dictionary(pa.int32(), pa.string())),
+    'categories': (_categories, lambda: pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+    'price': (_price, lambda: pa.int64()),
+    'flag': (lambda value: FLAGS.get(value), lambda: pa.bool_()),
+    'integer': (_integer, lambda: pa.int64()),
+    'percent': (_percent, lambda: pa.int64()),
+    'number': (_number, lambda: pa.float64()),
+    'timestamp': (_timestamp, lambda: pa.timestamp('us')),
+}
+
+
+class Column:
+    """An output column: one record field converted to a typed value"""
+
+    __slots__ = ('name', 'kind', 'field', 'convert')
+
+    def __init__(self, name: str, kind: str = 'text', field: Optional[str] = None):
+        """
+        Args:
+            name: Column name in the Parquet file
+            kind: Column kind (see KINDS)
+            field: Record field the values come from (default: name)
+
+        Raises:
+            ValueError: If the kind is unknown
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown column kind {kind!r}; expected one of {', '.join(KINDS)}")
+        self.name = name
+        self.kind = kind
+        self.field = field or name
+        self.convert: Callable = KINDS[kind][0]
+
+    def arrow_type(self) -> 'pa.DataType':
+        return KINDS[self.kind][1]()
+
+    def __repr__(self):
+        return f"Column({self.name!r}, {self.kind!r}, field={self.field!r})"
+
+
+def arrow_schema(columns: List[Column]) -> 'pa.Schema':
+    """
+    Build the Arrow schema of a list of columns
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    _require_pyarrow()
+    return pa.schema([(column.name, column.arrow_type()) for column in columns])
+
+
+def record_batch(records: List[Dict], columns: List[Column], schema: 'pa.Schema') -> 'pa.RecordBatch':
+    """
+    Convert records into a typed Arrow record batch
+
+    Args:
+        records: Records as written to the CSV
+        columns: Output columns
+        schema: arrow_schema(columns)
+
+    Returns:
+        One row per record
+    """
+    arrays = [pa.array([column.convert(record.get(column.field)) for record in records], type=field.type)
+              for column, field in zip(columns, schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def snapshot_path(root: str, kind: str, marketplace: str, started: datetime) -> str:
+    """
+    Get the file of one run's snapshot
+
+    Args:
+        root: Snapshot directory
+        kind: 'products' or 'categories'
+        marketplace: Marketplace name
+        started: Start of the run
+
+    Returns:
+        <root>/<kind>/marketplace=<name>/date=<YYYY-MM-DD>/<HHMMSS>.parquet
+    """
+    return os.path.join(root, kind, f"marketplace={marketplace}", f"date={started:%Y-%m-%d}",
+                        f"{started:%H%M%S}.parquet")
+
+
+class ParquetSink(ProductSink):
+    """Writes records to a typed, partitioned Parquet file, moved into place when the run completes"""
+
+    def __init__(self, root: str, marketplace: str, columns: List[Column], index: Optional[ProductIndex] = None,
+                 kind: str = 'products', batch_size: int = 500, row_group_size: int = 50_000,
+                 started: Optional[datetime] = None):
+        """
+        Open the temporary output file
+
+        Args:
+            root: Snapshot directory
+            marketplace: Marketplace name (partition key)
+            columns: Output columns
+            index: ProductIndex used to write each product once (None
+                writes every record); its memberships field must be a column
+            kind: Snapshot kind, the top directory ('products' or 'categories')
+            batch_size: Records buffered before they are converted to Arrow
+            row_group_size: Rows per Parquet row group (converted batches
+                are kept, compactly, until a row group is full)
+            started: Start of the run, for the file name (default: now)
+
+        Raises:
+            RuntimeError: If pyarrow is not installed
+            ValueError: If the index's memberships field is not a column
+        """
+        _require_pyarrow()
+        if index is not None and not any(column.field == index.memberships_field for column in columns):
+            raise ValueError(f"Column for {index.memberships_field!r} is missing from the Parquet columns")
+        super().__init__(index, batch_size)
+        self.columns = columns
+        self.schema = arrow_schema(columns)
+        self.row_group_size = max(1, row_group_size)
+        self.path = snapshot_path(root, kind, marketplace, started or datetime.now())
+        # Hidden, so load_snapshots() never reads an unfinished run
+        directory, filename = os.path.split(self.path)
+        self.part_path = os.path.join(directory, '.' + filename + PART_SUFFIX)
+        self._batches: List['pa.RecordBatch'] = []
+        self._buffered_rows = 0
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._writer = pq.ParquetWriter(self.part_path, self.schema)
+
+    def __repr__(self):
+        return f"ParquetSink({self.path!r})"
+
+    def discard(self):
+        """Drop the output, leaving the partition without a file for this run"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        super().discard()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def _write_rows(self, rows: List[Dict]):
+        self._batches.append(record_batch(rows, self.columns, self.schema))
+        self._buffered_rows += len(rows)
+        if self._buffered_rows >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if self._batches:
+            self._writer.write_table(pa.Table.from_batches(self._batches, self.schema),
+                                     row_group_size=self.row_group_size)
+            self._batches = []
+            self._buffered_rows = 0
+
+    def _finish(self, changed: Dict[int, Memberships]):
+        """Write the last row group, update changed categories and move the file into place"""
+        self._write_row_group()
+        self._writer.close()
+        self._writer = None
+        if changed:
+            self._rewrite_memberships(changed)
+        os.replace(self.part_path, self.path)
+
+    def _stop(self):
+        """Keep the rows written so far in a readable .part file"""
+        self._write_row_group()
+        self._writer.close()
+        self._writer = None
+
+    def _rewrite_memberships(self, changed: Dict[int, Memberships]):
+        """Rewrite the .part file with the category lists that grew"""
+        position, column = next((position, column) for position, column in enumerate(self.columns)
+                                if column.field == self.index.memberships_field)
+        table = pq.read_table(self.part_path)
+        values = table.column(position).to_pylist()
+        for row_number, memberships in changed.items():
+            values[row_number] = column.convert(memberships)
+        table = table.set_column(position, self.schema.field(position),
+                                 pa.array(values, type=self.schema.field(position).type))
+        pq.write_table(table, self.part_path, row_group_size=self.row_group_size)
+
+
+def partitioning() -> 'ds.Partitioning':
+    """Hive partitioning of the snapshot directories (marketplace as a dictionary, date as a date)"""
+    _require_pyarrow()
+    return ds.partitioning(
+        pa.schema([('marketplace', pa.dictionary(pa.int32(), pa.string())), ('date', pa.date32())]),
+        flavor='hive', dictionaries='infer'
+    )
+
+
+def load_snapshots(root: str, kind: str = 'products', marketplaces: Optional[Iterable[str]] = None,
+                   start: Optional[date] = None, end: Optional[date] = None,
+                   columns: Optional[List[str]] = None) -> 'pa.Table':
+    """
+    Read the snapshots of several runs as one table
+
+    Only the matching partitions are opened and only the requested columns
+    are read. Marketplaces with different columns are combined: a column
+    is null in the rows of marketplaces that do not have it.
+
+    Args:
+        root: Snapshot directory
+        kind: 'products' or 'categories'
+        marketplaces: Only these marketplaces (None for all)
+        start: First date (inclusive)
+        end: Last date (inclusive)
+        columns: Columns to read (None for all); 'marketplace' and 'date'
+            are available as columns too
+
+    Returns:
+        Arrow table (`.to_pandas()` for a DataFrame)
+
+    Raises:
+        RuntimeError: If pyarrow is not installed
+    """
+    _require_pyarrow()
+    directory = os.path.join(root, kind)
+    dataset = ds.dataset(directory, format='parquet', partitioning=partitioning())
+    fragments = list(dataset.get_fragments())
+    if fragments:
+        # Unify the columns of every marketplace (the first file alone decides otherwise)
+        schema = pa.unify_schemas([fragment.physical_schema for fragment in fragments]
+                                  + [dataset.partitioning.schema])
+        # The discovered partitioning carries the marketplace dictionary
+        dataset = ds.dataset(directory, format='parquet', partitioning=dataset.partitioning, schema=schema)
+
+    # Conditions on partition keys skip whole directories
+    condition = None
+    for part in ((ds.field('marketplace').isin(list(marketplaces)) if marketplaces is not None else None),
+                 (ds.field('date') >= start if start is not None else None),
+                 (ds.field('date') <= end if end is not None else None)):
+        if part is not None:
+            condition = part if condition is None else condition & part
+    return dataset.to_table(columns=columns, filter=condition)
@@ -0,0 +1,194 @@
+"""
+Declarative extraction plans for product cards
+
+A marketplace describes the fields of its product cards as a list of Field
+specs: where to look (simple CSS selectors, tried in order as fallbacks), what
+to read (text, an attribute or a callable) and how to post-process it.
+ExtractionPlan compiles the specs once, indexing every selector by the tag
+name it ends with, and then fills all fields in a single walk of each card
+instead of one find() per field:
+
+    PLAN = ExtractionPlan([
+        Field('title', 'h3.product-title'),
+        Field('url', ['a.product-link[href]', 'a[href]'], attr='href'),
+        Field('tags', 'span.tags a', many=True, post=', '.join),
+    ])
+    record = PLAN.extract(card)
+
+Supported selectors are compounds of a tag name (or `*`), `.class` and
+`[attribute]` parts, joined by spaces for descendants: `div.star-rating
+strong.rating`. Matching follows BeautifulSoup's find(): the first match in
+document order, with a class matching any of the element's classes.
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from common.html_parser import SelectolaxElement, walk
+
+_COMPOUND = re.compile(r'^(?P<name>[\w-]+|\*)?(?P<classes>(?:\.[\w-]+)*)(?P<attrs>(?:\[[\w-]+\])*)$')
+
+
+class _Compound:
+    """One compound selector: tag name, required classes and attributes"""
+
+    __slots__ = ('name', 'classes', 'attrs')
+
+    def __init__(self, text: str):
+        match = _COMPOUND.match(text)
+        if not match or not text:
+            raise ValueError(f"Unsupported selector part {text!r}")
+        self.name = match.group('name') if match.group('name') != '*' else None
+        self.classes = tuple(part for part in match.group('classes').split('.') if part)
+        self.attrs = tuple(re.findall(r'\[([\w-]+)\]', match.group('attrs')))
+
+    def matches(self, element) -> bool:
+        if self.name is not None and element.name != self.name:
+            return False
+        if self.classes:
+            classes = element.get('class') or []
+            if not all(cls in classes for cls in self.classes):
+                return False
+        return all(element.get(attr) is not None for attr in self.attrs)
+
+
+def _same_node(a, b) -> bool:
+    return a is b or (isinstance(a, SelectolaxElement) and a == b)
+
+
+class _Selector:
+    """A descendant chain of compounds; the last one is matched against the walked element"""
+
+    __slots__ = ('target', 'ancestors')
+
+    def __init__(self, text: str):
+        parts = [_Compound(part) for part in text.split()]
+        if not parts:
+            raise ValueError("Empty selector")
+        self.target = parts[-1]
+        self.ancestors = parts[:-1]
+
+    def matches(self, element, card) -> bool:
+        if not self.target.matches(element):
+            return False
+        # Match the outer compounds right to left against ancestors inside the card
+        pending = len(self.ancestors) - 1
+        node = element.parent
+        while pending >= 0 and node is not None and not _same_node(node, card):
+            if self.ancestors[pending].matches(node):
+                pending -= 1
+            node = node.parent
+        return pending < 0
+
+
+class Field:
+    """Specification of one product field"""
+
+    def __init__(self, name: str, selectors: Union[str, Sequence[str], None] = None,
+                 attr: Optional[str] = None, get: Optional[Callable] = None,
+                 post: Optional[Callable] = None, default=None, many: bool = False):
+        """
+        Initialize the field
+
+        Args:
+            name: Key in the extracted record
+            selectors: Selector or fallback selectors, tried in order. None
+                reads the card element itself.
+            attr: Attribute to read (default: the element's stripped text)
+            get: Callable reading the value from the matched element
+                (overrides attr)
+            post: Callable applied to the value (to the list of values for
+                many=True) when the field was found
+            default: Value used when nothing matches
+            many: Collect the values of every match of the first selector
+                that matches, instead of the first match only. The matches
+                may come from several containers, and none yields default;
+                to read the children of the first container only, select
+                the container and read them with get
+        """
+        self.name = name
+        if selectors is None:
+            self.selectors = []
+        elif isinstance(selectors, str):
+            self.selectors = [_Selector(selectors)]
+        else:
+            self.selectors = [_Selector(selector) for selector in selectors]
+        self.attr = attr
+        self.get = get
+        self.post = post
+        self.default = default
+        self.many = many
+
+    def read(self, element):
+        """Read the raw value of a matched element"""
+        if self.get is not None:
+            return self.get(element)
+        if self.attr is not None:
+            return element.get(self.attr)
+        return element.get_text(strip=True)
+
+    def value(self, elements: Optional[List]) -> object:
+        """Turn the matched elements (None if no match) into the field value"""
+        if elements is None:
+            return self.default
+        value = [self.read(element) for element in elements] if self.many else self.read(elements[0])
+        return self.post(value) if self.post is not None else value
+
+
+class ExtractionPlan:
+    """Fields compiled into one walk per card"""
+
+    def __init__(self, fields: List[Field], finalize: Optional[Callable[[Dict], Dict]] = None):
+        """
+        Compile the field specs
+
+        Args:
+            fields: Field specs, in the order of the extracted record
+            finalize: Callable turning the raw record into the final one
+                (for values derived from several fields)
+        """
+        self.fields = fields
+        self.finalize = finalize
+        # Tag name (None = any tag) -> [(field index, selector priority, selector)]
+        self._index: Dict[Optional[str], List[Tuple[int, int, _Selector]]] = {}
+        for field_idx, field in enumerate(fields):
+            for priority, selector in enumerate(field.selectors):
+                self._index.setdefault(selector.target.name, []).append((field_idx, priority, selector))
+        self._any_tag = self._index.pop(None, [])
+
+    def extract(self, card) -> Dict:
+        """
+        Extract every field from a card
+
+        Args:
+            card: Product card element (from any parse_html() backend)
+
+        Returns:
+            Record with one key per field (after finalize, if set)
+        """
+        # field index -> (priority, matched elements) of the best selector seen so far
+        found: Dict[int, Tuple[int, List]] = {}
+        for element in walk(card):
+            if isinstance(element, str):
+                continue
+            candidates = self._index.get(element.name)
+            if candidates is None and not self._any_tag:
+                continue
+            for field_idx, priority, selector in (candidates or []) + self._any_tag:
+                best = found.get(field_idx)
+                if best is not None and (best[0] < priority or (best[0] == priority and not self.fields[field_idx].many)):
+                    continue
+                if selector.matches(element, card):
+                    if best is not None and best[0] == priority:
+                        best[1].append(element)
+                    else:
+                        found[field_idx] = (priority, [element])
+
+        record = {}
+        for field_idx, field in enumerate(self.fields):
+            if not field.selectors:
+                record[field.name] = field.value([card])
+            else:
+                match = found.get(field_idx)
+                record[field.name] = field.value(match[1] if match else None)
+        return self.finalize(record) if self.finalize is not None else record
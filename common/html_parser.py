@@ -0,0 +1,338 @@
+"""
+Selectable HTML parser backends
+
+Every extractor parses pages through parse_html(), so the engine is chosen in
+one place:
+
+- `html.parser`: BeautifulSoup with Python's built-in parser (always available)
+- `lxml`: BeautifulSoup with the lxml tree builder (libxml2, several times faster)
+- `selectolax`: selectolax's lexbor engine, the fastest. Its nodes are wrapped in
+  SelectolaxElement, which implements the part of the BeautifulSoup API
+  the scrapers use (find, find_all, find_previous, get, get_text, string, parent)
+  with the same matching rules, so extractors work with any backend unchanged.
+
+walk() visits a whole document once, yielding its elements and text in
+document order, for extractors that collect several things in one traversal.
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer, Tag
+from bs4.dammit import UnicodeDammit
+
+try:
+    import lxml  # noqa: F401  (only checked for availability; bs4 loads it)
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # Only needed for the selectolax backend
+    LexborHTMLParser = None
+
+PARSERS = ('html.parser', 'lxml', 'selectolax')
+DEFAULT_PARSER = 'html.parser'
+
+# Strings BeautifulSoup leaves out of get_text() (Script, Stylesheet, TemplateString)
+_NON_TEXT_PARENTS = {'script', 'style', 'template'}
+_TEXT = '-text'
+
+
+def available_parsers() -> List[str]:
+    """
+    List the backends that can be used in this environment
+
+    Returns:
+        Parser names, fastest last
+    """
+    available = ['html.parser']
+    if lxml is not None:
+        available.append('lxml')
+    if LexborHTMLParser is not None:
+        available.append('selectolax')
+    return available
+
+
+def resolve_parser(name: Optional[str] = None) -> str:
+    """
+    Validate a backend name
+
+    Args:
+        name: Backend name, or None for DEFAULT_PARSER
+
+    Returns:
+        The backend name
+
+    Raises:
+        ValueError: If the backend is unknown or its package is not installed
+    """
+    name = name or DEFAULT_PARSER
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser {name!r}; choose from {', '.join(PARSERS)}")
+    if name not in available_parsers():
+        package = 'selectolax' if name == 'selectolax' else name
+        raise ValueError(f"Parser {name!r} is not installed; run: pip install {package}")
+    return name
+
+
+def parse_html(markup: Union[str, bytes], parser: Optional[str] = None,
+               parse_only: Optional[SoupStrainer] = None):
+    """
+    Parse a document with the selected backend
+
+    Args:
+        markup: HTML as text or raw response bytes
+        parser: Backend name (see PARSERS), None for DEFAULT_PARSER
+        parse_only: SoupStrainer limiting the BeautifulSoup backends to the
+            matching subtrees. selectolax always builds the whole (cheap)
+            lexbor tree, so searches return the same elements either way.
+
+    Returns:
+        BeautifulSoup document, or SelectolaxElement for the selectolax backend
+    """
+    parser = parser or DEFAULT_PARSER
+    if parser != 'selectolax':
+        return BeautifulSoup(markup, parser, parse_only=parse_only)
+
+    if isinstance(markup, bytes):
+        # Same encoding detection BeautifulSoup applies to raw bytes
+        markup = UnicodeDammit(markup, is_html=True).unicode_markup
+    root = LexborHTMLParser(markup).root
+    # Wrap the document node, so searches see <html> itself like on a BeautifulSoup object
+    return SelectolaxElement(root.parent if root.parent is not None else root)
+
+
+def walk(root) -> Iterator[Union[Tag, 'SelectolaxElement', str]]:
+    """
+    Visit every element and text string under a node in document order
+
+    Args:
+        root: Node returned by parse_html() (or any element inside it)
+
+    Yields:
+        Elements (Tag or SelectolaxElement), and the strings get_text() would
+        join as str (script, style and template text and comments are skipped)
+    """
+    if not isinstance(root, SelectolaxElement):
+        for node in root.descendants:
+            if isinstance(node, Tag):
+                yield node
+            elif type(node) in (NavigableString, CData):
+                yield node
+        return
+
+    nodes = root.node.traverse(include_text=True)
+    next(nodes, None)  # traverse() starts with the node itself
+    for node in nodes:
+        if node.tag == _TEXT:
+            if node.parent is None or node.parent.tag not in _NON_TEXT_PARENTS:
+                yield node.text_content or ''
+        elif not node.tag.startswith('-'):
+            yield SelectolaxElement(node)
+
+
+def _matches_value(value: Optional[str], expected, split: bool = False) -> bool:
+    """Match one attribute value like BeautifulSoup's SoupStrainer"""
+    if expected is True:
+        return value is not None
+    if expected is None or expected is False:
+        return value is None
+    if value is None:
+        return False
+
+    candidates = [value]
+    if split:
+        # Multi-valued attributes (class) match on any single value or the whole string
+        candidates = value.split() + [value]
+    for candidate in candidates:
+        if isinstance(expected, re.Pattern):
+            if expected.search(candidate):
+                return True
+        elif isinstance(expected, (list, tuple, set)):
+            if candidate in expected:
+                return True
+        elif candidate == expected:
+            return True
+    return False
+
+
+class SelectolaxElement:
+    """A lexbor node exposing the subset of the BeautifulSoup Tag API the scrapers use"""
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def __repr__(self):
+        return f"<SelectolaxElement {self.node.tag}>"
+
+    def __bool__(self):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, SelectolaxElement) and self.node.mem_id == other.node.mem_id
+
+    def __hash__(self):
+        return self.node.mem_id
+
+    # ------------------------------------------------------------------
+    # Attributes
+    # ------------------------------------------------------------------
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+    @property
+    def attrs(self) -> Dict[str, Union[str, List[str]]]:
+        attrs = {}
+        for key, value in self.node.attributes.items():
+            value = value if value is not None else ''
+            attrs[key] = value.split() if key == 'class' else value
+        return attrs
+
+    def get(self, key: str, default=None):
+        attributes = self.node.attributes
+        if key not in attributes:
+            return default
+        value = attributes[key] if attributes[key] is not None else ''
+        return value.split() if key == 'class' else value
+
+    def __getitem__(self, key: str):
+        return self.attrs[key]
+
+    def has_attr(self, key: str) -> bool:
+        return key in self.node.attributes
+
+    @property
+    def parent(self) -> Optional['SelectolaxElement']:
+        parent = self.node.parent
+        return SelectolaxElement(parent) if parent is not None else None
+
+    # ------------------------------------------------------------------
+    # Text
+    # ------------------------------------------------------------------
+
+    def _strings(self) -> Iterator[str]:
+        stack = [self.node]
+        while stack:
+            node = stack.pop()
+            if node.tag == _TEXT:
+                yield node.text_content or ''
+                continue
+            if node.tag in _NON_TEXT_PARENTS or (node.tag.startswith('-') and node is not self.node):
+                continue
+            stack.extend(reversed(list(node.iter(include_text=True))))
+
+    def get_text(self, separator: str = '', strip: bool = False) -> str:
+        strings = self._strings()
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    @property
+    def string(self) -> Optional[str]:
+        children = list(self.node.iter(include_text=True))
+        if len(children) != 1:
+            return None
+        child = children[0]
+        if child.tag.startswith('-'):
+            return child.text_content
+        return SelectolaxElement(child).string
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _criteria(name, attrs, class_, kwargs) -> Dict:
+        criteria = dict(attrs or {})
+        criteria.update(kwargs)
+        if class_ is not None:
+            criteria['class'] = class_
+        return criteria
+
+    @staticmethod
+    def _selector(name, criteria: Dict) -> str:
+        """Build a CSS prefilter; the exact BeautifulSoup rules are applied afterwards"""
+        present = ''.join(f'[{key}]' for key, value in criteria.items()
+                          if value is not None and value is not False)
+        if isinstance(name, str):
+            return name + present
+        if isinstance(name, (list, tuple, set)):
+            return ', '.join(tag + present for tag in name)
+        return '*' + present
+
+    @staticmethod
+    def _match(node, name, criteria: Dict) -> bool:
+        if node.tag.startswith('-'):
+            return False
+        if isinstance(name, str) and node.tag != name:
+            return False
+        if isinstance(name, (list, tuple, set)) and node.tag not in name:
+            return False
+        attributes = node.attributes
+        for key, expected in criteria.items():
+            value = attributes.get(key)
+            if key in attributes and value is None:
+                value = ''
+            if not _matches_value(value, expected, split=(key == 'class')):
+                return False
+        return True
+
+    def find_all(self, name=None, attrs: Optional[Dict] = None, recursive: bool = True,
+                 limit: Optional[int] = None, class_=None, **kwargs) -> List['SelectolaxElement']:
+        if name is True:
+            name = None
+        criteria = self._criteria(name, attrs, class_, kwargs)
+        if recursive:
+            candidates = self.node.css(self._selector(name, criteria))
+        else:
+            candidates = self.node.iter()
+        own_id = self.node.mem_id
+        results = []
+        for node in candidates:
+            # Lexbor's css() includes the node itself; BeautifulSoup only searches descendants
+            if node.mem_id != own_id and self._match(node, name, criteria):
+                results.append(SelectolaxElement(node))
+                if limit and len(results) >= limit:
+                    break
+        return results
+
+    def find(self, name=None, attrs: Optional[Dict] = None, recursive: bool = True,
+             class_=None, **kwargs) -> Optional['SelectolaxElement']:
+        found = self.find_all(name, attrs, recursive, limit=1, class_=class_, **kwargs)
+        return found[0] if found else None
+
+    def find_previous(self, name=None, attrs: Optional[Dict] = None, class_=None,
+                      **kwargs) -> Optional['SelectolaxElement']:
+        if name is True:
+            name = None
+        criteria = self._criteria(name, attrs, class_, kwargs)
+        node = self.node
+        while node is not None:
+            # Previous node in document order: the deepest last child of the
+            # previous sibling, or the parent
+            if node.prev is not None:
+                node = node.prev
+                while node.last_child is not None:
+                    node = node.last_child
+            else:
+                node = node.parent
+            if node is not None and self._match(node, name, criteria):
+                return SelectolaxElement(node)
+        return None
+
+    def select(self, selector: str) -> List['SelectolaxElement']:
+        return [SelectolaxElement(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector: str) -> Optional['SelectolaxElement']:
+        node = self.node.css_first(selector)
+        return SelectolaxElement(node) if node is not None else None
@@ -0,0 +1,341 @@
+"""
+Persistent on-disk HTTP cache for requests sessions
+
+The cache is a transport adapter mounted under a requests.Session, so the
+scrapers keep calling session.get() as before. Each GET is handled like this:
+
+- A stored response that is younger than the TTL for its URL is served from
+  disk without touching the network.
+- A stored response that is older than its TTL is revalidated with
+  If-None-Match / If-Modified-Since. On 304 Not Modified the stored body is
+  served and only the headers cross the network.
+- Other responses are fetched normally and stored if they can be revalidated
+  later (ETag or Last-Modified) or have a positive TTL.
+- A full response to a streamed request (stream=True) is handed to the caller
+  unread and not stored, so a caller that stops reading early still stops
+  the download early.
+
+The directory is bounded by size. When it grows past max_bytes, the least
+recently used entries are deleted first.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Pattern, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers describing the wire format; the body is stored already decoded
+_HOP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+class DiskCache:
+    """Stores response bodies and metadata on disk, with LRU size-based eviction"""
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Directory holding the cache files (created if missing)
+            max_bytes: Maximum total size of stored bodies
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total_bytes = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for name in os.listdir(directory) if name.endswith('.body')
+        )
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        """Return (body_path, meta_path) for a URL"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.body', base + '.json'
+
+    def _write_atomic(self, path: str, data: bytes):
+        """Write a file via a temporary file and rename"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, url: str) -> Optional[Tuple[Dict, bytes]]:
+        """
+        Look up a URL and mark it as recently used
+
+        Args:
+            url: Request URL
+
+        Returns:
+            (metadata, body) or None if not cached
+        """
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # The metadata file's mtime is the LRU clock
+        try:
+            os.utime(meta_path, None)
+        except OSError:
+            pass
+        return meta, body
+
+    def put(self, url: str, meta: Dict, body: bytes):
+        """
+        Store a response, evicting old entries if the cache grows too large
+
+        Args:
+            url: Request URL
+            meta: JSON-serialisable metadata
+            body: Decoded response body
+        """
+        body_path, meta_path = self._paths(url)
+        with self._lock:
+            old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            self._write_atomic(body_path, body)
+            self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+            self._total_bytes += len(body) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=meta_path)
+
+    def update_meta(self, url: str, meta: Dict):
+        """
+        Rewrite the metadata of an entry (after a successful revalidation)
+
+        Args:
+            url: Request URL
+            meta: New metadata
+        """
+        _, meta_path = self._paths(url)
+        with self._lock:
+            self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def _evict(self, keep: str):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                meta_path = os.path.join(self.directory, name)
+                if meta_path != keep:
+                    try:
+                        entries.append((os.path.getmtime(meta_path), meta_path))
+                    except OSError:
+                        continue
+        entries.sort()
+
+        for _, meta_path in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            body_path = meta_path[:-len('.json')] + '.body'
+            try:
+                self._total_bytes -= os.path.getsize(body_path)
+                os.remove(body_path)
+            except OSError:
+                pass
+            try:
+                os.remove(meta_path)
+            except OSError:
+                pass
+
+
+class CachingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that serves and revalidates GET requests from a DiskCache"""
+
+    def __init__(self, cache: DiskCache, default_ttl: float = 0,
+                 url_ttls: Optional[List[Tuple[str, float]]] = None,
+                 transport: Optional[HTTPAdapter] = None, **kwargs):
+        """
+        Initialize the adapter
+
+        Args:
+            cache: Disk cache to use
+            default_ttl: Seconds a stored response is served without
+                revalidation (0 = always revalidate)
+            url_ttls: Optional [(regex, ttl_seconds)] overrides, first match wins
+            transport: Adapter that sends requests the cache cannot answer
+                (defaults to this adapter's own connection pool)
+            **kwargs: Passed on to HTTPAdapter (pool sizes, retries, ...)
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.transport = transport
+        self.default_ttl = default_ttl
+        self.url_ttls: List[Tuple[Pattern, float]] = [
+            (re.compile(pattern), ttl) for pattern, ttl in (url_ttls or [])
+        ]
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'hits': 0,            # Served from disk, no request sent
+            'revalidated': 0,     # 304 Not Modified, body served from disk
+            'misses': 0,          # Full download
+            'network_bytes': 0,   # Body bytes downloaded
+            'cached_bytes': 0,    # Body bytes served from disk
+            'streamed': 0,        # Streamed to the caller unread, not stored
+        }
+
+    def ttl_for(self, url: str) -> float:
+        """
+        Get the TTL that applies to a URL
+
+        Args:
+            url: Request URL
+
+        Returns:
+            TTL in seconds
+        """
+        for pattern, ttl in self.url_ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _count(self, key: str, body_bytes: int, bytes_key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+            self.stats[bytes_key] += body_bytes
+
+    def close(self):
+        super().close()
+        if self.transport is not None:
+            self.transport.close()
+
+    def _build_cached_response(self, request, meta: Dict, body: bytes) -> requests.Response:
+        """Create a Response object for a stored body"""
+        response = requests.Response()
+        response.status_code = meta.get('status', 200)
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+    def _send_network(self, request, **kwargs):
+        if self.transport is not None:
+            return self.transport.send(request, **kwargs)
+        return super().send(request, **kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return self._send_network(request, **kwargs)
+
+        url = request.url
+        cached = self.cache.get(url)
+
+        if cached:
+            meta, body = cached
+            age = time.time() - meta.get('stored_at', 0)
+            if age < self.ttl_for(url):
+                self._count('hits', len(body), 'cached_bytes')
+                return self._build_cached_response(request, meta, body)
+
+            # Stale: ask the server whether it changed
+            if meta.get('etag'):
+                request.headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request.headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self._send_network(request, **kwargs)
+
+        if cached and response.status_code == 304:
+            meta['stored_at'] = time.time()
+            meta['etag'] = response.headers.get('ETag', meta.get('etag'))
+            meta['last_modified'] = response.headers.get('Last-Modified', meta.get('last_modified'))
+            self.cache.update_meta(url, meta)
+            response.close()
+            self._count('revalidated', len(body), 'cached_bytes')
+            return self._build_cached_response(request, meta, body)
+
+        if response.status_code != 200:
+            return response
+
+        if kwargs.get('stream'):
+            # Reading the body here would download all of it
+            self._count('streamed', 0, 'network_bytes')
+            return response
+
+        body = response.content
+        self._count('misses', len(body), 'network_bytes')
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        no_store = 'no-store' in response.headers.get('Cache-Control', '')
+        if not no_store and (etag or last_modified or self.ttl_for(url) > 0):
+            self.cache.put(url, {
+                'url': url,
+                'status': response.status_code,
+                'headers': {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS},
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': time.time(),
+            }, body)
+
+        return response
+
+
+def install_cache(session: requests.Session, cache_dir: str,
+                  max_bytes: int = 512 * 1024 * 1024, default_ttl: float = 0,
+                  url_ttls: Optional[List[Tuple[str, float]]] = None) -> CachingHTTPAdapter:
+    """
+    Mount a caching adapter on a session for both http and https
+
+    Requests the cache cannot answer go through the adapter the session had
+    mounted before (e.g. the pooled or HTTP/2 transport from create_session).
+
+    Args:
+        session: Session to attach the cache to
+        cache_dir: Cache directory
+        max_bytes: Maximum total size of stored bodies
+        default_ttl: Seconds a stored response is served without revalidation
+        url_ttls: Optional [(regex, ttl_seconds)] overrides
+
+    Returns:
+        The mounted adapter (its `stats` dict reports hits and bytes saved)
+    """
+    adapter = CachingHTTPAdapter(DiskCache(cache_dir, max_bytes), default_ttl, url_ttls,
+                                 transport=session.get_adapter('https://'))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return adapter
+
+
+def format_cache_stats(stats: Dict) -> str:
+    """
+    Summarize cache statistics in one line
+
+    Args:
+        stats: CachingHTTPAdapter.stats
+
+    Returns:
+        Human readable summary
+    """
+    total = stats['network_bytes'] + stats['cached_bytes']
+    saved = 100.0 * stats['cached_bytes'] / total if total else 0.0
+    streamed = f"{stats['streamed']} streamed, " if stats['streamed'] else ""
+    return (f"cache: {stats['hits']} hits, {stats['revalidated']} revalidated, "
+            f"{stats['misses']} downloads, {streamed}{stats['network_bytes'] / 1024:.0f} KB downloaded, "
+            f"{saved:.0f}% of body bytes served from disk")
@@ -0,0 +1,264 @@
+"""
+Shared HTTP client factory for the scrapers
+
+Every scraper builds its session with create_session(), so connection
+handling is configured in one place:
+
+- Connection pool sized for the number of concurrent fetches. The requests
+  default of 10 connections per host becomes the bottleneck once more
+  workers than that share a session.
+- Keep-alive on by default; turning it off sends `Connection: close` and
+  opens a new connection for every request (useful for benchmarking).
+- Compressed transfers via `Accept-Encoding`, offering only the encodings
+  the transport can decode here (br needs a brotli package, zstd a zstd
+  module).
+- Separate connect and read timeouts applied to every request.
+- Optional HTTP/2 transport backed by httpx (`pip install httpx[http2]`),
+  which multiplexes concurrent requests over a few connections. It is
+  mounted as a requests transport adapter, so callers keep using
+  session.get() and the response API they already know.
+"""
+
+import importlib.util
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.response import HTTPResponse
+
+try:
+    import httpx
+except ImportError:  # Only needed for the HTTP/2 transport
+    httpx = None
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+
+class ClientSession(requests.Session):
+    """requests.Session with a default (connect, read) timeout for every request"""
+
+    def __init__(self, timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)):
+        """
+        Initialize the session
+
+        Args:
+            timeout: (connect, read) timeout in seconds used when a request
+                does not pass its own
+        """
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class _HTTPXRaw:
+    """File-like view of a streamed httpx response, as requests expects in Response.raw"""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = None
+        self._buffer = b''
+        self.closed = False
+
+    def stream(self, chunk_size: int = 65536, decode_content: bool = True):
+        yield from self._response.iter_bytes(chunk_size)
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        if self._chunks is None:
+            self._chunks = self._response.iter_bytes()
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        if not self.closed:
+            self._response.close()
+            self.closed = True
+
+
+class HTTPXAdapter(HTTPAdapter):
+    """Transport adapter sending requests through an httpx client (HTTP/2 capable)"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, http2: bool = True,
+                 keep_alive: bool = True):
+        """
+        Initialize the adapter
+
+        Args:
+            pool_size: Maximum number of open connections
+            http2: Negotiate HTTP/2 with servers that support it
+            keep_alive: Keep idle connections open for reuse
+        """
+        if httpx is None:
+            raise RuntimeError("httpx is not installed; run: pip install 'httpx[http2]'")
+        super().__init__()
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size if keep_alive else 0,
+        )
+        self.client = httpx.Client(http2=http2, limits=limits, follow_redirects=False)
+
+    @staticmethod
+    def _timeout(timeout) -> 'httpx.Timeout':
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        upstream = self.client.build_request(
+            request.method, request.url, headers=dict(request.headers),
+            content=request.body, timeout=self._timeout(timeout),
+        )
+        try:
+            upstream_response = self.client.send(upstream, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = upstream_response.status_code
+        response.reason = upstream_response.reason_phrase
+        response.headers = CaseInsensitiveDict(upstream_response.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.http_version = upstream_response.http_version
+        response.raw = _HTTPXRaw(upstream_response)
+        if not stream:
+            try:
+                response._content = upstream_response.read()
+            except httpx.HTTPError as e:
+                raise requests.ConnectionError(e, request=request)
+            finally:
+                upstream_response.close()
+            response._content_consumed = True
+        return response
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+def accept_encoding(compression: bool = True, http2: bool = False) -> str:
+    """
+    Get the Accept-Encoding value for a session
+
+    Args:
+        compression: Ask for compressed bodies
+        http2: The session uses the httpx transport, which has its own decoders
+
+    Returns:
+        Encodings the transport can decode here, or "identity"
+    """
+    if not compression:
+        return 'identity'
+    if http2:
+        encodings = ['gzip', 'deflate']
+        if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+            encodings.append('br')
+        if importlib.util.find_spec('zstandard'):
+            encodings.append('zstd')
+    else:
+        # urllib3 lists the decoders it found at import time
+        encodings = [name for name in HTTPResponse.CONTENT_DECODERS if name != 'x-gzip']
+    return ', '.join(encodings)
+
+
+def create_session(user_agent: Optional[str] = None, pool_size: Optional[int] = None,
+                   workers: int = 1, keep_alive: bool = True, compression: bool = True,
+                   connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                   read_timeout: float = DEFAULT_READ_TIMEOUT,
+                   http2: bool = False, headers: Optional[Dict[str, str]] = None) -> ClientSession:
+    """
+    Build a configured session for a scraper
+
+    Args:
+        user_agent: User-Agent header to send
+        pool_size: Connections kept per host (default: max(10, workers))
+        workers: Number of concurrent fetches the session will serve
+        keep_alive: Reuse connections between requests
+        compression: Ask for gzip/deflate (and br if available) bodies
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait between bytes of the response
+        http2: Send requests through the httpx HTTP/2 transport
+        headers: Extra default headers
+
+    Returns:
+        Session whose requests use the (connect, read) timeout by default
+    """
+    pool_size = pool_size or max(DEFAULT_POOL_SIZE, workers)
+    session = ClientSession(timeout=(connect_timeout, read_timeout))
+    session.headers['Accept-Encoding'] = accept_encoding(compression, http2)
+    if user_agent:
+        session.headers['User-Agent'] = user_agent
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    session.headers.update(headers or {})
+
+    if http2:
+        adapter = HTTPXAdapter(pool_size=pool_size, keep_alive=keep_alive)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def add_client_arguments(parser):
+    """
+    Add the client options to a scraper's argparse parser
+
+    Args:
+        parser: argparse.ArgumentParser of the scraper's main()
+    """
+    group = parser.add_argument_group('HTTP client')
+    group.add_argument('--pool-size', type=int, default=None,
+                       help=f"Connections kept per host (default: max({DEFAULT_POOL_SIZE}, workers))")
+    group.add_argument('--no-keep-alive', action='store_true',
+                       help="Open a new connection for every request")
+    group.add_argument('--no-compression', action='store_true',
+                       help="Ask for uncompressed responses")
+    group.add_argument('--connect-timeout', type=float, default=DEFAULT_CONNECT_TIMEOUT,
+                       help=f"Connect timeout in seconds (default: {DEFAULT_CONNECT_TIMEOUT:g})")
+    group.add_argument('--read-timeout', type=float, default=DEFAULT_READ_TIMEOUT,
+                       help=f"Read timeout in seconds (default: {DEFAULT_READ_TIMEOUT:g})")
+    group.add_argument('--http2', action='store_true',
+                       help="Use the HTTP/2 transport (requires httpx[http2])")
+
+
+def client_options(args) -> Dict:
+    """
+    Turn parsed client arguments into create_session() keyword arguments
+
+    Args:
+        args: Namespace returned by parse_args()
+
+    Returns:
+        Keyword arguments for create_session()
+    """
+    options = {
+        'keep_alive': not args.no_keep_alive,
+        'compression': not args.no_compression,
+        'connect_timeout': args.connect_timeout,
+        'read_timeout': args.read_timeout,
+        'http2': args.http2,
+    }
+    if args.pool_size:
+        options['pool_size'] = args.pool_size
+    return options
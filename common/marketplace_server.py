@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+Local Marketplace Stand-in Server
+
+Serves the committed HTML captures and generates synthetic category,
+pagination and listing pages in the same formats, so the Dismac, Venbo,
+Boliviamart and (HTTP mode) Multicenter scrapers can run a full crawl with
+no network access and throughput changes can be measured reproducibly.
+
+Routes (every marketplace lives under its own prefix):
+
+    /dismac/categorias.html          dismac-categorias.html capture
+    /dismac/<any>.html               dismac-dormitorio.html with a synthetic count
+    /venbo/categorias/               venbo-categories.html capture
+    /venbo/cat-producto/<path>/      synthetic navigation or listing page
+    /boliviamart/tienda/             "Boliviamart - Tienda.html" capture (page 1)
+    /boliviamart/<path>/page/N/      synthetic listing pages (categories repeat store products)
+    /multicenter/<slug>              multicenter-muebles.html with a synthetic count
+
+Links in the captures are rewritten to point at the server. Counts, page
+counts and products are derived from a hash of the URL path, so every run
+sees the same catalog. Boliviamart category pages list products of the
+store-wide /tienda/ listing, as the live site does. Each catalog revision
+(--revision, or the `revision` attribute of a running server) changes the
+count of about one Dismac category in ten, to exercise incremental runs.
+
+Usage:
+    python common/marketplace_server.py --port 8765 --latency 0.05 --pages 4
+
+    python dismac/scraper_dismac.py --base-url http://127.0.0.1:8765/dismac
+    python venbo/scraper_venbo.py --base-url http://127.0.0.1:8765/venbo
+    python boliviamart/scraper_boliviamart.py --base-url http://127.0.0.1:8765/boliviamart
+    python multicenter/scraper_multicenter.py --base-url http://127.0.0.1:8765/multicenter
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+LIVE_HOSTS = {
+    'dismac': 'https://www.dismac.com.bo',
+    'venbo': 'https://venbo.shop',
+    'boliviamart': 'https://www.boliviamart.com',
+    'multicenter': 'https://www.multicenter.com',
+}
+
+CAPTURES = {
+    'dismac_categories': os.path.join(REPO_ROOT, 'dismac', 'dismac-categorias.html'),
+    'dismac_listing': os.path.join(REPO_ROOT, 'dismac', 'dismac-dormitorio.html'),
+    'venbo_categories': os.path.join(REPO_ROOT, 'venbo', 'venbo-categories.html'),
+    'boliviamart_tienda': os.path.join(REPO_ROOT, 'boliviamart', 'Boliviamart - Tienda.html'),
+    'multicenter_category': os.path.join(REPO_ROOT, 'multicenter', 'multicenter-muebles.html'),
+}
+
+VENBO_PER_PAGE = 12
+
+BOLIVIAMART_CARD = """<li role="none" class="product-col product-outimage_aq_onimage product type-product post-{pid} status-publish {stock} product_cat-{slug} has-post-thumbnail purchasable product-type-simple">
+<div class="product-inner">
+<div class="product-image">
+<a href="{base}/producto/{slug}-{pid}/" aria-label="Go to product page">
+<div class="inner img-effect"><img width="300" height="300" src="{base}/wp-content/uploads/{pid}.jpg" class="attachment-woocommerce_thumbnail size-woocommerce_thumbnail" alt="{title}" decoding="async" /></div></a>{badges}
+<div class="links-on-image">
+<div class="add-links-wrap">
+<div class="add-links clearfix">
+<a href="/tienda/?add-to-cart={pid}" data-quantity="1" class="viewcart-style-2 button product_type_simple add_to_cart_button ajax_add_to_cart" data-product_id="{pid}" data-product_sku="SKU{pid}" rel="nofollow" role="button">Añadir al carrito</a>
+</div>
+</div>
+</div>
+</div>
+<div class="product-content">
+<span class="category-list"><a href="{base}/categoria/{slug}/" rel="tag">{category}</a></span>
+<a class="product-loop-title" href="{base}/producto/{slug}-{pid}/">
+<h3 class="woocommerce-loop-product__title">{title}</h3></a>
+<div class="rating-wrap">
+<div class="rating-content"><div class="star-rating" title="{rating}"><span style="width:0%"><strong class="rating">{rating}</strong> out of 5</span></div></div>
+</div>
+<span class="price">{price_html}</span>
+</div>
+</div>
+</li>
+"""
+
+VENBO_CARD = """<div class="product type-product post-{pid} status-publish {stock} product_cat-{slug} has-post-thumbnail purchasable product-type-simple tcol-md-3 tcol-sm-4 tcol-xs-6 tcol-ss-12 kad_product"><div class="grid_item product_item clearfix"><a href="{base}/productos/{slug}-{pid}/" class="product_item_link product_img_link">
+<img width="268" height="268" src="data:image/gif;base64,R0lGODdhAQABAPAAAMPDwwAAACwAAAAAAQABAAACAkQBADs=" data-src="{base}/wp-content/uploads/{pid}-268x268.jpg" class="attachment-shop_catalog size-268x268 wp-post-image" alt="{title}" /></a><div class="details_product_item"><div class="product_details"><a href="{base}/productos/{slug}-{pid}/" class="product_item_link"><h5>{title}</h5></a><div class="product_excerpt"><p>Producto de prueba generado localmente.</p></div></div>
+<span class="product_price headerfont">{price_html}</span>
+<a href="?add-to-cart={pid}" data-quantity="1" class="button">Comprar</a></div></div></div>
+"""
+
+
+def _path_hash(path: str) -> int:
+    """Stable hash of a URL path (same on every run and machine)"""
+    return zlib.crc32(path.encode('utf-8'))
+
+
+def _bolivianos(centavos: int, thousands: str = ',', decimal: str = '.') -> str:
+    """Format an amount like the stores do (1,234.50 / 1.234,50)"""
+    integer, cents = divmod(centavos, 100)
+    grouped = f"{integer:,}".replace(',', thousands)
+    return f"{grouped}{decimal}{cents:02d}"
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Room for bursts of new connections from concurrent clients
+
+
+class MarketplaceServer:
+    """Threaded HTTP server impersonating the Bolivian marketplaces"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 pages: int = 3, error_rate: float = 0.0, venbo_depth: int = 2,
+                 venbo_children: int = 3, seed: int = 0, compress: bool = True,
+                 bandwidth: float = 0.0, revision: int = 0):
+        """
+        Initialize the server (call start() or serve_forever() to run it)
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds added to every response
+            pages: Maximum number of listing pages per synthetic category
+            error_rate: Fraction of requests answered with 503 (0.0 - 1.0)
+            venbo_depth: Category depth at which Venbo pages become listings
+            venbo_children: Subcategories on each synthetic Venbo navigation page
+            seed: Seed for the error-injection random generator
+            compress: gzip responses for clients that accept it
+            bandwidth: Bytes per second each response is throttled to (0 = unlimited)
+            revision: Catalog revision; each one changes about a tenth of the
+                Dismac counts (can be changed while serving)
+        """
+        self.latency = latency
+        self.pages = max(1, pages)
+        self.error_rate = error_rate
+        self.venbo_depth = venbo_depth
+        self.venbo_children = venbo_children
+        self.compress = compress
+        self.bandwidth = bandwidth
+        self.revision = revision
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'not_modified': 0, 'bytes': 0, 'connections': 0}
+        self.last_modified = formatdate(time.time(), usegmt=True)
+
+        self.httpd = _HTTPServer((host, port), self._make_handler())
+        self.base_url = f"http://{host}:{self.httpd.server_port}"
+        self._thread: Optional[threading.Thread] = None
+        self._captures: Dict[str, str] = {}
+        self._gzipped: Dict[str, bytes] = {}
+        self._gzip_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Captures
+    # ------------------------------------------------------------------
+
+    def _rewrite_hosts(self, html: str) -> str:
+        """Point absolute links of the live sites at this server"""
+        for prefix, live in LIVE_HOSTS.items():
+            local = f"{self.base_url}/{prefix}"
+            html = html.replace(live, local)
+            html = html.replace(live.replace('/', '\\/'), local.replace('/', '\\/'))
+        return html
+
+    def _capture(self, name: str) -> str:
+        """Load (once) and rewrite a committed capture"""
+        if name not in self._captures:
+            with open(CAPTURES[name], 'r', encoding='utf-8') as f:
+                self._captures[name] = self._rewrite_hosts(f.read())
+        return self._captures[name]
+
+    # ------------------------------------------------------------------
+    # Synthetic pages
+    # ------------------------------------------------------------------
+
+    def _catalog(self, path: str, per_page: int) -> Tuple[int, int]:
+        """
+        Derive (total_products, total_pages) for a category path
+
+        Args:
+            path: Category path without the /page/N/ suffix
+            per_page: Products per page
+
+        Returns:
+            Tuple of total products and total pages
+        """
+        seed = _path_hash(path)
+        total_pages = 1 + seed % self.pages
+        total_products = total_pages * per_page - (seed // self.pages) % per_page
+        return total_products, total_pages
+
+    def _product(self, category_path: str, index: int) -> Dict:
+        """Deterministic product fields for the index-th product of a category"""
+        seed = _path_hash(f"{category_path}#{index}")
+        slug = category_path.strip('/').split('/')[-1] or 'tienda'
+        regular = 1000 + seed % 500000
+        on_sale = seed % 5 == 0
+        return {
+            'pid': seed,
+            'slug': slug,
+            'category': slug.replace('-', ' ').title(),
+            'title': f"{slug.replace('-', ' ').upper()} PRODUCTO {index + 1}",
+            'regular': regular,
+            'sale': regular * 9 // 10 if on_sale else regular,
+            'on_sale': on_sale,
+            'in_stock': seed % 7 != 0,
+            'rating': seed % 6,
+        }
+
+    def dismac_listing(self, path: str) -> str:
+        """Dismac category page: the dormitorio capture with a synthetic count"""
+        count = _path_hash(path) % 500
+        # Every revision adds a product to about one category in ten
+        count += sum(1 for revision in range(1, self.revision + 1)
+                     if _path_hash(f"{path}@{revision}") % 10 == 0)
+        html = self._capture('dismac_listing')
+        return html.replace('44 Productos', f'{count} Productos')
+
+    def multicenter_category(self, path: str) -> str:
+        """Multicenter category page: the Muebles capture with a synthetic count"""
+        count = _path_hash(path) % 3000
+        html = self._capture('multicenter_category')
+        return html.replace('"recordsFiltered":498', f'"recordsFiltered":{count}')
+
+    def venbo_page(self, category_path: str, page_num: int) -> Optional[str]:
+        """Venbo navigation page (shallow paths) or paginated listing page"""
+        base = f"{self.base_url}/venbo"
+        # Same catalog whether or not the request has the trailing slash
+        category_path = category_path.strip('/') + '/'
+        depth = category_path.strip('/').count('/') + 1
+        title = category_path.strip('/').split('/')[-1]
+
+        if depth < self.venbo_depth:
+            if page_num != 1:
+                return None
+            links = "\n".join(
+                f'<li class="cat-item"><a href="{base}/cat-producto/{category_path.strip("/")}/{title}-{i}/">{title} {i}</a></li>'
+                for i in range(1, self.venbo_children + 1)
+            )
+            return (f"<html><head><title>{title} - Venbo</title></head><body>"
+                    f'<h1 class="page-title">{title}</h1><ul class="product-categories">\n{links}\n</ul>'
+                    f"</body></html>")
+
+        total, total_pages = self._catalog(category_path, VENBO_PER_PAGE)
+        if page_num > total_pages:
+            return None
+        first = (page_num - 1) * VENBO_PER_PAGE
+        last = min(first + VENBO_PER_PAGE, total)
+        if total_pages == 1:
+            result_count = f"Showing all {total} results"
+        else:
+            result_count = f"Showing {first + 1}&ndash;{last} of {total} results"
+
+        cards = []
+        for index in range(first, last):
+            product = self._product(category_path, index)
+            if product['on_sale']:
+                price_html = (f'<del><span class="woocommerce-Price-amount amount"><bdi>{_bolivianos(product["regular"], ".", ",")}<span class="woocommerce-Price-currencySymbol">Bs</span></bdi></span></del> '
+                              f'<ins><span class="woocommerce-Price-amount amount"><bdi>{_bolivianos(product["sale"], ".", ",")}<span class="woocommerce-Price-currencySymbol">Bs</span></bdi></span></ins>')
+            else:
+                price_html = f'<span class="woocommerce-Price-amount amount"><bdi>{_bolivianos(product["regular"], ".", ",")}<span class="woocommerce-Price-currencySymbol">Bs</span></bdi></span>'
+            cards.append(VENBO_CARD.format(
+                base=base, price_html=price_html,
+                stock='instock' if product['in_stock'] else 'outofstock',
+                **{k: product[k] for k in ('pid', 'slug', 'title')}
+            ))
+
+        pagination = ""
+        if total_pages > 1:
+            pagination = '<nav class="woocommerce-pagination"><ul class="page-numbers">' + "".join(
+                f'<li><a class="page-numbers" href="{base}/cat-producto/{category_path.strip("/")}/page/{n}/">{n}</a></li>'
+                for n in range(1, total_pages + 1) if n != page_num
+            ) + '</ul></nav>'
+
+        return (f"<html><head><title>{title} - Venbo</title></head><body>"
+                f'<h1 class="page-title">{title}</h1>'
+                f'<p class="woocommerce-result-count">{result_count}</p>'
+                f'<div class="products kt-masonry-init rowtight shopcolumn4 shopfullwidth">{"".join(cards)}</div>'
+                f"{pagination}</body></html>")
+
+    def boliviamart_page(self, category_path: str, page_num: int, per_page: int) -> Optional[str]:
+        """Boliviamart listing page with WooCommerce pagination"""
+        base = f"{self.base_url}/boliviamart"
+        total, total_pages = self._catalog(category_path, per_page)
+        # Keep the synthetic store pages consistent with the captured first page
+        captured = [int(n) for n in re.findall(r'/tienda/page/(\d+)/', self._capture('boliviamart_tienda'))]
+        store_total = max(captured or [1]) * per_page
+        is_store = category_path.strip('/') == 'tienda'
+        if is_store:
+            total, total_pages = store_total, store_total // per_page
+        if page_num > total_pages:
+            return None
+
+        first = (page_num - 1) * per_page
+        # Like on the live site, categories list products of the store listing
+        # (its synthetic pages, after the captured first page)
+        offset = _path_hash(category_path) % max(1, store_total - per_page)
+        cards = []
+        for index in range(first, min(first + per_page, total)):
+            if is_store:
+                product = self._product('tienda/', index)
+            else:
+                product = self._product('tienda/', per_page + (offset + index) % max(1, store_total - per_page))
+            if product['on_sale']:
+                price_html = (f'<del aria-hidden="true"><span class="woocommerce-Price-amount amount"><bdi><span class="woocommerce-Price-currencySymbol">Bs.</span>{_bolivianos(product["regular"])}</bdi></span></del> '
+                              f'<ins><span class="woocommerce-Price-amount amount"><bdi><span class="woocommerce-Price-currencySymbol">Bs.</span>{_bolivianos(product["sale"])}</bdi></span></ins>')
+                badges = '\n<div class="labels"><div class="onsale product-label">-10%</div></div>'
+            else:
+                price_html = f'<span class="woocommerce-Price-amount amount"><bdi><span class="woocommerce-Price-currencySymbol">Bs.</span>{_bolivianos(product["regular"])}</bdi></span>'
+                badges = ''
+            cards.append(BOLIVIAMART_CARD.format(
+                base=base, price_html=price_html, badges=badges,
+                stock='instock' if product['in_stock'] else 'outofstock',
+                **{k: product[k] for k in ('pid', 'slug', 'title', 'category', 'rating')}
+            ))
+
+        page_links = []
+        for n in range(1, total_pages + 1):
+            if n == page_num:
+                page_links.append(f'<li><span aria-current="page" class="page-numbers current">{n}</span></li>')
+            else:
+                page_links.append(f'<li><a class="page-numbers" href="{base}/{category_path.strip("/")}/page/{n}/">{n}</a></li>')
+
+        return (f"<html><head><title>{category_path} - Boliviamart</title></head><body>"
+                f'<ul class="products products-container grid">{"".join(cards)}</ul>'
+                f'<nav class="woocommerce-pagination"><ul class="page-numbers">{"".join(page_links)}</ul></nav>'
+                f"</body></html>")
+
+    # ------------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------------
+
+    def render(self, raw_path: str) -> Optional[str]:
+        """
+        Build the page for a request path
+
+        Args:
+            raw_path: Request path including the query string
+
+        Returns:
+            HTML or None for 404
+        """
+        parsed = urlparse(raw_path)
+        path = parsed.path
+        query = parse_qs(parsed.query)
+
+        page_num = 1
+        page_match = re.search(r'/page/(\d+)/?$', path)
+        if page_match:
+            page_num = int(page_match.group(1))
+            path = path[:page_match.start()] + '/'
+
+        if path == '/dismac/categorias.html':
+            return self._capture('dismac_categories')
+        if path.startswith('/dismac/') and path.endswith('.html'):
+            return self.dismac_listing(path)
+
+        if path.rstrip('/') == '/venbo/categorias':
+            return self._capture('venbo_categories')
+        if path.startswith('/venbo/cat-producto/'):
+            return self.venbo_page(path[len('/venbo/cat-producto/'):], page_num)
+
+        if path.startswith('/boliviamart/'):
+            category_path = path[len('/boliviamart/'):]
+            if category_path.strip('/') == 'tienda' and page_num == 1:
+                return self._capture('boliviamart_tienda')
+            per_page = int(query.get('count', ['12'])[0])
+            return self.boliviamart_page(category_path, page_num, per_page)
+
+        if path.startswith('/multicenter/') and path.strip('/') != 'multicenter':
+            return self.multicenter_category(path)
+
+        return None
+
+    def _gzip(self, etag: str, body: bytes) -> bytes:
+        """gzip a body once per ETag"""
+        with self._gzip_lock:
+            compressed = self._gzipped.get(etag)
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=6, mtime=0)
+            with self._gzip_lock:
+                if len(self._gzipped) >= 256:
+                    self._gzipped.clear()
+                self._gzipped[etag] = compressed
+        return compressed
+
+    def _should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def handle(self):
+                server._count('connections')
+                try:
+                    super().handle()
+                except ConnectionError:
+                    pass  # Client hung up mid-response (e.g. a streaming count)
+
+            def end_headers(self):
+                if self.close_connection:
+                    self.send_header('Connection', 'close')
+                super().end_headers()
+
+            def do_GET(self):
+                server._count('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server._should_fail():
+                    server._count('errors')
+                    self._send(503, b"Service Unavailable", 'text/plain')
+                    return
+
+                html = server.render(self.path)
+                if html is None:
+                    self._send(404, b"Not Found", 'text/plain')
+                    return
+
+                body = html.encode('utf-8')
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    server._count('not_modified')
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                headers = {'ETag': etag, 'Last-Modified': server.last_modified, 'Vary': 'Accept-Encoding'}
+                if server.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = server._gzip(etag, body)
+                    headers['Content-Encoding'] = 'gzip'
+                self._send(200, body, 'text/html; charset=UTF-8', headers)
+
+            def _send(self, status: int, body: bytes, content_type: str,
+                      headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                    server._count('bytes', len(body))
+                    return
+                for start in range(0, len(body), 16384):
+                    chunk = body[start:start + 16384]
+                    self.wfile.write(chunk)
+                    server._count('bytes', len(chunk))
+                    time.sleep(len(chunk) / server.bandwidth)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> 'MarketplaceServer':
+        """Serve from a background thread (for tests and benchmarks)"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def serve_forever(self):
+        """Serve from the current thread until interrupted"""
+        self.httpd.serve_forever()
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Bolivian marketplaces")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Port to bind (default: 8765)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--pages', type=int, default=3, help="Maximum listing pages per category")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--venbo-depth', type=int, default=2, help="Depth at which Venbo categories are listings")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for error injection")
+    parser.add_argument('--no-gzip', action='store_true', help="Never compress responses")
+    parser.add_argument('--bandwidth', type=float, default=0.0,
+                        help="Bytes per second each response is throttled to (default: unlimited)")
+    parser.add_argument('--revision', type=int, default=0,
+                        help="Catalog revision; each changes about a tenth of the Dismac counts (default: 0)")
+    args = parser.parse_args()
+
+    server = MarketplaceServer(args.host, args.port, args.latency, args.pages,
+                               args.error_rate, args.venbo_depth, seed=args.seed,
+                               compress=not args.no_gzip, bandwidth=args.bandwidth,
+                               revision=args.revision)
+    print(f"Serving marketplaces on {server.base_url}")
+    for prefix in LIVE_HOSTS:
+        print(f"  {prefix:<12} {server.base_url}/{prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping server")
+        print(f"Requests: {server.stats['requests']}, errors: {server.stats['errors']}, "
+              f"304s: {server.stats['not_modified']}, bytes: {server.stats['bytes']:,}, "
+              f"connections: {server.stats['connections']}")
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
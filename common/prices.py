@@ -0,0 +1,155 @@
+"""
+Price normalization for Bolivian store prices
+
+The stores write amounts in both conventions: `1,234.50` and `1.234,50`
+(and `17,50Bs`, `475.00`, `Bs.1.234`). Every amount is read the same way:
+a `.` or `,` followed by one or two final digits is the decimal separator,
+every other separator groups thousands. Amounts are returned as integer
+centavos, so no floating point rounding is involved.
+
+Two interfaces share these rules:
+
+- to_centavos() / find_amounts() / format_amount(): pure Python, used by the
+  scrapers for the one price they read from each product card.
+- centavos() / price_columns(): whole columns at once with pandas vectorized
+  string operations (`pip install pandas`), for analytics over tens of
+  thousands of scraped rows without a Python loop per row.
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+try:
+    import pandas as pd
+except ImportError:  # Only needed for the column functions
+    pd = None
+
+# An amount: integer digits grouped by . or , and optional decimals (a . or ,
+# followed by one or two final digits): "1.234,50" -> ("1.234", "50")
+AMOUNT = re.compile(r'(\d(?:[\d.,]*?\d)??)(?:[.,](\d{1,2}))?(?![.,]?\d)')
+# The first two amounts of a price text (regular and sale price)
+TWO_AMOUNTS = re.compile(AMOUNT.pattern + r'(?:\D+?' + AMOUNT.pattern + r')?')
+# Percentages (discount badges) are not amounts
+PERCENT = re.compile(r'\d+(?:[.,]\d+)?\s*%')
+SEPARATORS = re.compile(r'[.,]')
+# Amounts already written by format_amount()
+PLAIN_AMOUNT = re.compile(r'\d+\.\d\d')
+
+
+def _centavos(integer: str, decimals: Optional[str]) -> int:
+    return int(SEPARATORS.sub('', integer)) * 100 + int((decimals or '00').ljust(2, '0'))
+
+
+def to_centavos(amount: str) -> Optional[int]:
+    """
+    Convert one amount to centavos
+
+    Args:
+        amount: Amount such as "1.234,50", "1,234.50", "17,50" or "475"
+
+    Returns:
+        Integer centavos, or None if the text holds no amount
+    """
+    match = AMOUNT.search(PERCENT.sub(' ', amount or ''))
+    return _centavos(*match.groups()) if match else None
+
+
+def find_amounts(text: str) -> List[int]:
+    """
+    Find every amount in a price text, ignoring percentages
+
+    Args:
+        text: Price text, e.g. "Bs.1.500,00 Bs.1.234,50" or "<del>20,00Bs</del> 15,00Bs (25%)"
+
+    Returns:
+        Amounts in centavos, in the order they appear
+    """
+    text = PERCENT.sub(' ', text or '')
+    return [_centavos(integer, decimals) for integer, decimals in AMOUNT.findall(text)]
+
+
+def format_amount(centavos: int) -> str:
+    """
+    Format centavos as a plain decimal string
+
+    Args:
+        centavos: Amount in centavos
+
+    Returns:
+        Amount like "1234.50" (no thousands separator, "." for decimals)
+    """
+    return f"{centavos // 100}.{centavos % 100:02d}"
+
+
+def _require_pandas():
+    if pd is None:
+        raise RuntimeError("pandas is not installed; run: pip install pandas")
+
+
+def _column_centavos(integer: 'pd.Series', decimals: 'pd.Series') -> 'pd.Series':
+    """Vectorized _centavos() over extracted integer and decimals columns"""
+    cents = decimals.fillna('00').str.ljust(2, '0').mask(integer.isna())
+    return integer.str.replace(SEPARATORS.pattern, '', regex=True).astype('Int64') * 100 + cents.astype('Int64')
+
+
+def _price_texts(texts) -> 'pd.Series':
+    """Load texts into a string column without percentages"""
+    column = pd.Series(texts, dtype='string')
+    return column.str.replace(PERCENT.pattern, ' ', regex=True)
+
+
+def centavos(texts: Iterable[Optional[str]]) -> 'pd.Series':
+    """
+    Convert a column of single amounts to centavos
+
+    Args:
+        texts: Price strings ("1234.50", "1.234,50", "N/A", None, ...)
+
+    Returns:
+        Series of nullable integers (<NA> where a text holds no amount)
+
+    Raises:
+        RuntimeError: If pandas is not installed
+    """
+    _require_pandas()
+    column = pd.Series(list(texts), dtype='string')
+    # Fast path for amounts the scrapers already normalized ("1234.50")
+    plain = column.str.fullmatch(PLAIN_AMOUNT.pattern).fillna(False)
+    result = column.where(plain).str.replace('.', '', regex=False).astype('Int64')
+
+    other = column.notna() & ~plain
+    if other.any():
+        parts = _price_texts(column[other]).str.extract(AMOUNT.pattern)
+        result[other] = _column_centavos(parts[0], parts[1])
+    return result
+
+
+def price_columns(texts: Iterable[Optional[str]]) -> 'pd.DataFrame':
+    """
+    Split a column of raw price texts into regular, sale and discount columns
+
+    Follows the scrapers' convention: the first amount is the regular price,
+    the second (if any) the sale price; a single amount is both.
+
+    Args:
+        texts: Raw price texts as shown on product cards
+
+    Returns:
+        DataFrame with nullable integer columns regular_centavos,
+        sale_centavos and discount_pct (rounded percentage off the regular
+        price, <NA> without a regular price)
+
+    Raises:
+        RuntimeError: If pandas is not installed
+    """
+    _require_pandas()
+    parts = _price_texts(list(texts)).str.extract(TWO_AMOUNTS.pattern)
+    regular = _column_centavos(parts[0], parts[1])
+    sale = _column_centavos(parts[2], parts[3]).fillna(regular)
+
+    off = (regular - sale).astype('Float64') * 100 / regular.astype('Float64').mask(regular == 0)
+    return pd.DataFrame({
+        'regular_centavos': regular,
+        'sale_centavos': sale,
+        'discount_pct': off.round().astype('Int64'),
+    })
@@ -0,0 +1,279 @@
+"""
+Product index: one record per product across cards, pages and categories
+
+The same product reaches a scraper several times: nested wrappers of one
+card match a broad container search, and store-wide listings repeat the
+products of every category. ProductIndex merges the records as they arrive,
+keyed by marketplace and product_id, or by a hash of the product URL for
+records without an ID:
+
+    index = ProductIndex('boliviamart', category_field='scrape_category',
+                         memberships_field='scrape_categories')
+    index.extend(products)
+    index.records  # unique products, in first-seen order
+
+Merging rules:
+
+- The first record seen for a product keeps its values; later records only
+  fill the values it is missing ('N/A', '' or None).
+- A record without an ID that has the URL of an indexed product is merged
+  into it. A record with an ID that arrives after URL-only records of the
+  same product takes over their entry, and its values win.
+- Records with neither an ID nor a URL carry nothing to identify a product
+  by (empty wrappers) and are dropped.
+- Every category a product was seen in is kept once, in first-seen order, in
+  `memberships_field` as a Memberships list, which the csv module writes as
+  "first|second".
+
+A sink that has written records to disk calls release() on them: the index
+then only keeps their ID and memberships, so memory stays small however
+many products a crawl collects. Duplicates of a released product only add
+categories, and changed_memberships() tells the sink which rows to update.
+"""
+
+import hashlib
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Values that mean "not found" in the scrapers' records
+MISSING = ('N/A', '', None)
+
+
+class Memberships(list):
+    """Categories a product was seen in; str() joins them for CSV output"""
+
+    __slots__ = ()
+    SEPARATOR = '|'
+
+    def __str__(self):
+        return self.SEPARATOR.join(self)
+
+
+def url_hash(url: str) -> str:
+    """
+    Hash a product URL into a short key
+
+    Args:
+        url: Product URL
+
+    Returns:
+        16 hex digits
+    """
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class _Released:
+    """What the index keeps of a product whose record was written out"""
+
+    __slots__ = ('product_id', 'memberships', 'written')
+
+    def __init__(self, product_id, memberships: Memberships):
+        self.product_id = product_id
+        self.memberships = memberships
+        # Memberships already in the written record
+        self.written = len(memberships)
+
+
+class ProductIndex:
+    """Merges product records by marketplace and product ID (or URL) as they arrive"""
+
+    def __init__(self, marketplace: str, category_field: str, memberships_field: str,
+                 id_field: str = 'product_id', url_field: str = 'url'):
+        """
+        Initialize an empty index
+
+        Args:
+            marketplace: Marketplace name, part of every key
+            category_field: Record field naming the category a record was scraped from
+            memberships_field: Field added to merged records with all their categories
+            id_field: Record field holding the marketplace's product ID
+            url_field: Record field holding the product URL
+        """
+        self.marketplace = marketplace
+        self.category_field = category_field
+        self.memberships_field = memberships_field
+        self.id_field = id_field
+        self.url_field = url_field
+        # Unique products in first-seen order (records, or _Released once
+        # written out), and key -> position in entries
+        self._entries: List[Union[Dict, _Released]] = []
+        self._positions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'records': 0, 'merged': 0, 'dropped': 0}
+
+    def __len__(self) -> int:
+        """Number of unique products, released or not"""
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.records)
+
+    @property
+    def records(self) -> List[Dict]:
+        """Records of the unique products not released yet, in first-seen order"""
+        return [entry for entry in self._entries if not isinstance(entry, _Released)]
+
+    def memberships(self) -> Iterator[Memberships]:
+        """Yield the categories of every unique product, released ones included"""
+        for entry in self._entries:
+            yield entry.memberships if isinstance(entry, _Released) else entry[self.memberships_field]
+
+    def keys(self, record: Dict) -> Tuple[Optional[Tuple[str, str]], Optional[Tuple[str, str]]]:
+        """
+        Get the index keys of a record
+
+        Args:
+            record: Product record
+
+        Returns:
+            Tuple of (ID key, URL key); either is None when the field is missing
+        """
+        product_id = record.get(self.id_field)
+        url = record.get(self.url_field)
+        id_key = (self.marketplace, f"id:{product_id}") if product_id not in MISSING else None
+        url_key = (self.marketplace, f"url:{url_hash(url)}") if url not in MISSING else None
+        return id_key, url_key
+
+    def add(self, record: Dict) -> Optional[Dict]:
+        """
+        Add a record, merging it into the product it duplicates
+
+        Args:
+            record: Product record (stored as is when it is a new product)
+
+        Returns:
+            The indexed record for the product, or None if the record was
+            dropped or its product was already released
+        """
+        id_key, url_key = self.keys(record)
+        with self._lock:
+            self.stats['records'] += 1
+            if id_key is None and url_key is None:
+                self.stats['dropped'] += 1
+                return None
+
+            position = self._positions.get(id_key) if id_key else None
+            takes_over = False
+            if position is None and url_key is not None:
+                position = self._positions.get(url_key)
+                # The URL entry only belongs to this product if it has no ID of its own
+                if position is not None and id_key is not None:
+                    if self._product_id(self._entries[position]) not in MISSING:
+                        position = None
+                    else:
+                        takes_over = True
+
+            # Categories of the record (including those of an already merged record)
+            categories = list(record.get(self.memberships_field) or ()) + [record.get(self.category_field)]
+            if position is None:
+                record[self.memberships_field] = Memberships()
+                self._add_memberships(record[self.memberships_field], categories)
+                self._entries.append(record)
+                position = len(self._entries) - 1
+            else:
+                self.stats['merged'] += 1
+                indexed = self._entries[position]
+                if isinstance(indexed, _Released):
+                    # Already written out: only the categories can still change
+                    self._add_memberships(indexed.memberships, categories)
+                    record = None
+                else:
+                    for field, value in record.items():
+                        if field in (self.category_field, self.memberships_field) or value in MISSING:
+                            continue
+                        if takes_over or indexed.get(field) in MISSING:
+                            indexed[field] = value
+                    self._add_memberships(indexed[self.memberships_field], categories)
+                    record = indexed
+
+            for key in (id_key, url_key):
+                if key is not None:
+                    self._positions.setdefault(key, position)
+            return record
+
+    def extend(self, records: Iterable[Dict]) -> int:
+        """
+        Add several records
+
+        Args:
+            records: Product records
+
+        Returns:
+            Number of new products among them
+        """
+        return len(self.add_new(records))
+
+    def add_new(self, records: Iterable[Dict]) -> List[Dict]:
+        """
+        Add several records and get the new products among them
+
+        Args:
+            records: Product records (e.g. the products of one page)
+
+        Returns:
+            Indexed records of the products seen for the first time, after
+            merging all the given records (so wrappers of a card that come
+            after it are already merged in)
+        """
+        with self._lock:
+            first = len(self._entries)
+        for record in records:
+            self.add(record)
+        with self._lock:
+            return [entry for entry in self._entries[first:] if not isinstance(entry, _Released)]
+
+    def release(self, records: Iterable[Dict]):
+        """
+        Forget the field values of records that were written out
+
+        Args:
+            records: Indexed records (as returned by add() or add_new())
+        """
+        with self._lock:
+            for record in records:
+                position = self._position(record)
+                if position is not None and self._entries[position] is record:
+                    self._entries[position] = _Released(record.get(self.id_field), record[self.memberships_field])
+
+    def changed_memberships(self) -> Dict[int, Memberships]:
+        """
+        Find released products that gained categories after they were written
+
+        Returns:
+            Product position (first-seen order, i.e. the row written for it)
+            -> all its categories
+        """
+        with self._lock:
+            return {position: entry.memberships for position, entry in enumerate(self._entries)
+                    if isinstance(entry, _Released) and len(entry.memberships) > entry.written}
+
+    def _position(self, record: Dict) -> Optional[int]:
+        for key in self.keys(record):
+            if key is not None and key in self._positions:
+                return self._positions[key]
+        return None
+
+    def _product_id(self, entry: Union[Dict, _Released]):
+        return entry.product_id if isinstance(entry, _Released) else entry.get(self.id_field)
+
+    @staticmethod
+    def _add_memberships(memberships: Memberships, categories: List[Optional[str]]):
+        for category in categories:
+            if category not in MISSING and category not in memberships:
+                memberships.append(sys.intern(category))
+
+
+def format_index_stats(index: ProductIndex) -> str:
+    """
+    Summarize an index in one line
+
+    Args:
+        index: ProductIndex after the crawl
+
+    Returns:
+        Human readable summary
+    """
+    stats = index.stats
+    return (f"products: {len(index)} unique from {stats['records']} records "
+            f"({stats['merged']} duplicates merged, {stats['dropped']} without ID or URL dropped)")
@@ -0,0 +1,246 @@
+"""
+Per-host token-bucket rate limiter
+
+Replaces the fixed sleeps the scrapers used to do before or after every
+request. A bucket refills continuously, so time spent waiting on the server
+counts toward the delay: a request that took longer than the interval can be
+followed by the next one immediately.
+
+The limiter is safe to share between threads and asyncio tasks. Waiting
+callers reserve their slot under a lock and then sleep outside it, so a
+limiter can be shared by every worker of a concurrent crawl.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of `burst`"""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the bucket
+        
+        Args:
+            rate: Tokens added per second (requests per second)
+            burst: Maximum number of tokens stored (requests allowed back to back)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self) -> float:
+        """
+        Take one token, going into debt if the bucket is empty
+        
+        Returns:
+            Seconds the caller must wait before sending its request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+    
+    def acquire(self) -> float:
+        """
+        Block the calling thread until a request may be sent
+        
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent
+        
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host"""
+    
+    def __init__(self, requests_per_second: Optional[float] = 1.0, burst: int = 1,
+                 host_limits: Optional[Dict[str, Tuple[float, int]]] = None):
+        """
+        Initialize the limiter
+        
+        Args:
+            requests_per_second: Default rate for hosts without their own limit
+                (None or 0 disables limiting for those hosts)
+            burst: Default burst size
+            host_limits: Optional {host: (requests_per_second, burst)} overrides
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._host_limits: Dict[str, Tuple[float, int]] = dict(host_limits or {})
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_delay(cls, delay: float, burst: int = 1) -> 'HostRateLimiter':
+        """
+        Build a limiter equivalent to the old "sleep `delay` seconds" politeness
+        
+        Args:
+            delay: Minimum average interval between requests to one host
+            burst: Burst size
+            
+        Returns:
+            HostRateLimiter (unlimited when delay <= 0)
+        """
+        return cls(requests_per_second=1.0 / delay if delay > 0 else None, burst=burst)
+    
+    @classmethod
+    def for_workers(cls, delay: float, workers: int = 1) -> 'HostRateLimiter':
+        """
+        Build the default limiter of a scraper running `workers` fetches at once
+        
+        Each worker keeps the "one request every `delay` seconds" politeness,
+        so a host sees at most workers / delay requests per second, in bursts
+        of up to `workers`. With one worker this is from_delay(delay).
+        
+        Args:
+            delay: Minimum average interval between requests of one worker
+            workers: Concurrent fetches
+            
+        Returns:
+            HostRateLimiter (unlimited when delay <= 0)
+        """
+        workers = max(1, workers)
+        return cls(requests_per_second=workers / delay if delay > 0 else None, burst=workers)
+    
+    def set_limit(self, host: str, requests_per_second: float, burst: int = 1):
+        """
+        Set the limit for one host, replacing its current bucket
+        
+        Args:
+            host: Host name (netloc) the limit applies to
+            requests_per_second: Allowed request rate
+            burst: Burst size
+        """
+        with self._lock:
+            self._host_limits[host] = (requests_per_second, burst)
+            self._buckets.pop(host, None)
+    
+    def bucket(self, host: str) -> Optional[TokenBucket]:
+        """
+        Get (creating on first use) the bucket for a host
+        
+        Args:
+            host: Host name (netloc)
+            
+        Returns:
+            TokenBucket or None if the host is not rate limited
+        """
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self._host_limits.get(host, (self.requests_per_second, self.burst))
+                if not rate:
+                    return None
+                bucket = TokenBucket(rate, burst)
+                self._buckets[host] = bucket
+            return bucket
+    
+    def wait(self, url: str) -> float:
+        """
+        Block until a request to `url` may be sent
+        
+        Args:
+            url: URL about to be requested
+            
+        Returns:
+            Seconds spent waiting
+        """
+        bucket = self.bucket(urlparse(url).netloc)
+        return bucket.acquire() if bucket else 0.0
+    
+    async def wait_async(self, url: str) -> float:
+        """
+        Asyncio version of wait()
+        
+        Args:
+            url: URL about to be requested
+            
+        Returns:
+            Seconds spent waiting
+        """
+        bucket = self.bucket(urlparse(url).netloc)
+        return await bucket.acquire_async() if bucket else 0.0
+
+
+def add_rate_limit_arguments(parser, delay: float, workers_option: str = '--workers'):
+    """
+    Add the rate limit options to a scraper's argparse parser
+    
+    Args:
+        parser: argparse.ArgumentParser of the scraper's main()
+        delay: Seconds between requests of one worker in the default limit
+        workers_option: The scraper's option for concurrent fetches
+    """
+    group = parser.add_argument_group('Rate limit')
+    group.add_argument('--rate', type=float, default=None,
+                       help=f"Requests per second to each host, across all workers (default: one "
+                            f"request every {delay:g}s per worker, i.e. {workers_option} / {delay:g}; "
+                            f"0 = no limit)")
+    group.add_argument('--burst', type=int, default=None,
+                       help=f"Requests allowed back to back (default: {workers_option})")
+
+
+def rate_limiter_from_args(args, delay: float, workers: int) -> HostRateLimiter:
+    """
+    Build the limiter named by parsed rate limit arguments
+    
+    Args:
+        args: Namespace returned by parse_args()
+        delay: Seconds between requests of one worker in the default limit
+        workers: Concurrent fetches of the run
+        
+    Returns:
+        HostRateLimiter sized from the worker count unless --rate/--burst
+        say otherwise
+    """
+    default = HostRateLimiter.for_workers(delay, workers)
+    rate = default.requests_per_second if args.rate is None else args.rate
+    burst = default.burst if args.burst is None else args.burst
+    return HostRateLimiter(requests_per_second=rate or None, burst=max(1, burst))
+
+
+def format_rate_limit(limiter: HostRateLimiter) -> str:
+    """
+    Describe a limiter's default limit in one line
+    
+    Args:
+        limiter: HostRateLimiter of the run
+        
+    Returns:
+        Human readable summary
+    """
+    if not limiter.requests_per_second:
+        return "rate limit: none"
+    return (f"rate limit: {limiter.requests_per_second:g} requests/s per host, "
+            f"bursts of {limiter.burst}")
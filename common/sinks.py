@@ -0,0 +1,265 @@
+"""
+Product sinks: write records as they are scraped
+
+A scraper hands each page's products to a sink as soon as they are
+extracted, instead of collecting the whole catalog for one write at the end:
+
+    index = ProductIndex('venbo', category_field='category_url',
+                         memberships_field='category_urls')
+    with CSVSink('venbo_products.csv', FIELDS, index=index) as sink:
+        for page in pages:
+            sink.write(extract_products(page))
+
+CSVSink writes to `<filename>.part` in batches (flushed to disk, so an
+interrupted run leaves every batch written so far there) and renames it
+over `<filename>` only when the run completes, so the output file is always
+either the previous complete export or the new one.
+
+With an index, every batch goes through it first: one row is written per
+unique product and the index forgets the records it wrote (see
+ProductIndex.release()), so memory stays small whatever the size of the
+catalog. Categories that a product gains after its row was written are
+filled in by one streaming pass over the file when the sink is closed.
+
+TeeSink writes the same products to several sinks at once, deduplicating
+them once through the shared index.
+"""
+
+import csv
+import os
+from typing import Dict, Iterable, List, Optional
+
+from common.product_index import Memberships, ProductIndex
+
+PART_SUFFIX = '.part'
+
+
+class ProductSink:
+    """
+    Destination for product records, written page by page during a crawl
+
+    Records are buffered and handed to the backend in batches. Subclasses
+    implement the backend hooks: _write_rows() stores one batch, _finish()
+    completes the output, _stop() ends it after a failure.
+    """
+
+    def __init__(self, index: Optional[ProductIndex] = None, batch_size: int = 500):
+        """
+        Initialize an empty buffer
+
+        Args:
+            index: ProductIndex used to write each product once (None
+                writes every record). Only this sink may add to it, since
+                row N is the N-th product it indexes.
+            batch_size: Rows buffered before they are written out
+        """
+        self.index = index
+        self.batch_size = max(1, batch_size)
+        self.rows_written = 0
+        self.closed = False
+        self._pending: List[Dict] = []
+        # Position in the index of the product written as the first row
+        self._first_position = len(index) if index is not None else 0
+
+    def write(self, records: Iterable[Dict]) -> int:
+        """
+        Write the records of one page
+
+        Args:
+            records: Product records
+
+        Returns:
+            Number of records accepted (new products when deduplicating)
+        """
+        if self.closed:
+            raise ValueError(f"{self!r}: sink is closed")
+        records = self.index.add_new(records) if self.index is not None else list(records)
+        self._pending.extend(records)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return len(records)
+
+    def flush(self):
+        """Write the buffered rows out"""
+        if self._pending:
+            self._write_rows(self._pending)
+            self.rows_written += len(self._pending)
+            if self.index is not None:
+                self.index.release(self._pending)
+            self._pending = []
+
+    def close(self):
+        """Write the remaining rows and finish the output; rows are final afterwards"""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self._finish(self._changed_rows())
+
+    def abort(self):
+        """Write what is buffered and stop, leaving any completed output untouched"""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self._stop()
+
+    def discard(self):
+        """Drop the output (e.g. nothing was scraped)"""
+        self._pending = []
+        self.closed = True
+
+    def _changed_rows(self) -> Dict[int, Memberships]:
+        """Row number -> categories, for the written products that gained categories"""
+        if self.index is None:
+            return {}
+        return {position - self._first_position: memberships
+                for position, memberships in self.index.changed_memberships().items()
+                if position >= self._first_position}
+
+    def _write_rows(self, rows: List[Dict]):
+        """Store one batch of rows (the first is row number self.rows_written)"""
+        raise NotImplementedError
+
+    def _finish(self, changed: Dict[int, Memberships]):
+        """Complete the output, replacing the categories of the changed rows"""
+
+    def _stop(self):
+        """End the output after a failure"""
+
+    def __enter__(self) -> 'ProductSink':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class CSVSink(ProductSink):
+    """Streams records to a CSV file, replaced atomically when the run completes"""
+
+    def __init__(self, filename: str, fieldnames: List[str], index: Optional[ProductIndex] = None,
+                 batch_size: int = 500):
+        """
+        Open the temporary output file
+
+        Args:
+            filename: Final CSV path
+            fieldnames: CSV columns (records must not have other keys)
+            index: ProductIndex used to write each product once (None
+                writes every record). Only this sink may add to it, since
+                row N is the N-th product it indexes.
+            batch_size: Rows buffered before they are written and flushed
+
+        Raises:
+            ValueError: If the index's memberships field is not a column
+        """
+        if index is not None and index.memberships_field not in fieldnames:
+            raise ValueError(f"Column {index.memberships_field!r} is missing from the CSV fields")
+        super().__init__(index, batch_size)
+        self.filename = filename
+        self.part_filename = filename + PART_SUFFIX
+        self.fieldnames = fieldnames
+
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.part_filename, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        self._writer.writeheader()
+
+    def __repr__(self):
+        return f"CSVSink({self.filename!r})"
+
+    def flush(self):
+        """Write the buffered rows and push them to the operating system"""
+        super().flush()
+        self._file.flush()
+
+    def discard(self):
+        """Drop the output, leaving the final file untouched"""
+        if not self._file.closed:
+            self._file.close()
+        super().discard()
+        if os.path.exists(self.part_filename):
+            os.remove(self.part_filename)
+
+    def _write_rows(self, rows: List[Dict]):
+        self._writer.writerows(rows)
+
+    def _finish(self, changed: Dict[int, Memberships]):
+        """fsync the .part file, update changed categories and move it into place"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if changed:
+            self._rewrite_memberships(changed)
+        os.replace(self.part_filename, self.filename)
+
+    def _stop(self):
+        """Keep the rows written so far in the .part file"""
+        self._file.close()
+
+    def _rewrite_memberships(self, changed: Dict[int, Memberships]):
+        """Copy the .part file row by row, replacing the category lists that grew"""
+        column = self.fieldnames.index(self.index.memberships_field)
+        rewritten = self.part_filename + '.tmp'
+        with open(self.part_filename, 'r', newline='', encoding='utf-8') as source, \
+                open(rewritten, 'w', newline='', encoding='utf-8') as target:
+            reader = csv.reader(source)
+            writer = csv.writer(target)
+            writer.writerow(next(reader))
+            for row_number, row in enumerate(reader):
+                if row_number in changed:
+                    row[column] = str(changed[row_number])
+                writer.writerow(row)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(rewritten, self.part_filename)
+
+
+class TeeSink(ProductSink):
+    """Writes the same products to several sinks (e.g. a CSV file and a snapshot store)"""
+
+    def __init__(self, sinks: List[ProductSink], index: Optional[ProductIndex] = None,
+                 batch_size: int = 500):
+        """
+        Combine sinks
+
+        Args:
+            sinks: Sinks created with the same index; only the tee adds to
+                it, and every sink receives the same batches of new products
+            index: ProductIndex shared with the sinks (None writes every record)
+            batch_size: Rows buffered before they are written to every sink
+        """
+        super().__init__(index, batch_size)
+        self.sinks = sinks
+
+    def __repr__(self):
+        return f"TeeSink({self.sinks!r})"
+
+    def flush(self):
+        super().flush()
+        for sink in self.sinks:
+            sink.flush()
+
+    def discard(self):
+        super().discard()
+        for sink in self.sinks:
+            sink.discard()
+
+    def _write_rows(self, rows: List[Dict]):
+        for sink in self.sinks:
+            sink._write_rows(rows)
+            sink.rows_written += len(rows)
+
+    def _finish(self, changed: Dict[int, Memberships]):
+        for sink in self.sinks:
+            sink.closed = True
+            sink._finish(changed)
+
+    def _stop(self):
+        for sink in self.sinks:
+            sink.closed = True
+            sink._stop()
@@ -0,0 +1,453 @@
+"""
+Snapshot store: every scraper run in one local SQLite database
+
+Each run of a scraper is recorded with the category counts and products it
+scraped, so trends are SQL queries instead of re-reading old CSV exports:
+
+    store = SnapshotStore('scrapes.db')
+    with store.run('venbo') as run_id:
+        with SnapshotSink(store, run_id, index=index) as sink:
+            for page in pages:
+                sink.write(extract_products(page))
+        store.add_category_counts(run_id, category_rows)
+
+    store.run_totals(last_runs=90)  # products per marketplace, last 90 runs
+
+Tables:
+
+- runs: one row per run (marketplace, start/finish time, status) with its
+  totals, filled in when the run finishes
+- categories: one row per category ever seen (name, parent, level, first and
+  last run)
+- category_counts: product count of every category in every run, indexed by
+  (marketplace, category_url, run_id)
+- products: every product of every run (ID, URL, title, prices in centavos,
+  categories and the full record as JSON), indexed by (marketplace,
+  product_id, run_id)
+
+The database is in WAL mode, so reports can query it while a scraper writes.
+Rows are written in executemany() batches, one transaction per batch.
+"""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from common.prices import to_centavos
+from common.product_index import MISSING, Memberships, ProductIndex
+from common.sinks import ProductSink
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    marketplace TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    status TEXT NOT NULL DEFAULT 'running',
+    products INTEGER,
+    categories INTEGER,
+    listed_products INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_by_marketplace ON runs (marketplace, run_id);
+
+CREATE TABLE IF NOT EXISTS categories (
+    marketplace TEXT NOT NULL,
+    category_url TEXT NOT NULL,
+    name TEXT,
+    parent TEXT,
+    level INTEGER,
+    first_run_id INTEGER NOT NULL,
+    last_run_id INTEGER NOT NULL,
+    PRIMARY KEY (marketplace, category_url)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS category_counts (
+    run_id INTEGER NOT NULL,
+    marketplace TEXT NOT NULL,
+    category_url TEXT NOT NULL,
+    product_count INTEGER,
+    scraped_at TEXT
+);
+CREATE INDEX IF NOT EXISTS category_counts_by_category
+    ON category_counts (marketplace, category_url, run_id);
+CREATE INDEX IF NOT EXISTS category_counts_by_run ON category_counts (run_id);
+
+CREATE TABLE IF NOT EXISTS products (
+    run_id INTEGER NOT NULL,
+    row_number INTEGER NOT NULL,
+    marketplace TEXT NOT NULL,
+    product_id TEXT,
+    url TEXT,
+    title TEXT,
+    regular_centavos INTEGER,
+    sale_centavos INTEGER,
+    categories TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (run_id, row_number)
+);
+CREATE INDEX IF NOT EXISTS products_by_product ON products (marketplace, product_id, run_id);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _value(record: Dict, field: str) -> Optional[str]:
+    """Field value of a record, None for the scrapers' 'N/A' placeholders"""
+    value = record.get(field)
+    return None if value in MISSING else str(value)
+
+
+class SnapshotStore:
+    """SQLite database of scraper runs, category counts and products"""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        Open (or create) the database
+
+        Args:
+            path: Database file
+            timeout: Seconds to wait for a lock held by another process
+        """
+        self.path = path
+        # One connection shared by the scraper's threads, serialized by the lock
+        self._connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._marketplaces: Dict[int, str] = {}
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            # WAL commits survive a crash of the process; NORMAL skips the fsync per commit
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        """Close the connection"""
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> 'SnapshotStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start_run(self, marketplace: str) -> int:
+        """
+        Record the start of a scraper run
+
+        Args:
+            marketplace: Marketplace name ('dismac', 'venbo', ...)
+
+        Returns:
+            ID of the new run
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                'INSERT INTO runs (marketplace, started_at) VALUES (?, ?)', (marketplace, _now())
+            )
+        self._marketplaces[cursor.lastrowid] = marketplace
+        return cursor.lastrowid
+
+    def finish_run(self, run_id: int, status: str = 'complete'):
+        """
+        Record the end of a run and its totals
+
+        Args:
+            run_id: Run from start_run()
+            status: 'complete', or e.g. 'interrupted' / 'failed'; only
+                complete runs are reported by run_totals()
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                UPDATE runs SET
+                    finished_at = ?,
+                    status = ?,
+                    products = (SELECT COUNT(*) FROM products WHERE run_id = runs.run_id),
+                    categories = (SELECT COUNT(*) FROM category_counts WHERE run_id = runs.run_id),
+                    listed_products = (SELECT SUM(product_count) FROM category_counts
+                                       WHERE run_id = runs.run_id)
+                WHERE run_id = ?
+                """,
+                (_now(), status, run_id)
+            )
+
+    @contextmanager
+    def run(self, marketplace: str) -> Iterator[int]:
+        """
+        Record a run around a block of code
+
+        The run is finished as 'complete' when the block returns,
+        'interrupted' on Ctrl+C and 'failed' on any other exception.
+
+        Args:
+            marketplace: Marketplace name
+
+        Yields:
+            ID of the run
+        """
+        run_id = self.start_run(marketplace)
+        status = 'failed'
+        try:
+            yield run_id
+            status = 'complete'
+        except KeyboardInterrupt:
+            status = 'interrupted'
+            raise
+        finally:
+            self.finish_run(run_id, status)
+
+    def add_category_counts(self, run_id: int, rows: Iterable[Dict]) -> int:
+        """
+        Store the product counts of categories
+
+        Args:
+            run_id: Run from start_run()
+            rows: Category report rows with 'url' and 'product_count', and
+                optionally 'category_name', 'parent', 'level', 'scraped_at'
+
+        Returns:
+            Number of rows stored
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        marketplace = self._marketplace(run_id)
+        scraped_at = _now()
+        counts = [(run_id, marketplace, row['url'], row.get('product_count'), row.get('scraped_at', scraped_at))
+                  for row in rows]
+        categories = [(marketplace, row['url'], row.get('category_name'), row.get('parent'), row.get('level'),
+                       run_id, run_id)
+                      for row in rows]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO category_counts (run_id, marketplace, category_url, product_count, scraped_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                counts
+            )
+            self._connection.executemany(
+                """
+                INSERT INTO categories (marketplace, category_url, name, parent, level, first_run_id, last_run_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (marketplace, category_url) DO UPDATE SET
+                    name = COALESCE(excluded.name, name),
+                    parent = COALESCE(excluded.parent, parent),
+                    level = COALESCE(excluded.level, level),
+                    last_run_id = excluded.last_run_id
+                """,
+                categories
+            )
+        return len(rows)
+
+    def add_products(self, run_id: int, records: Iterable[Dict], first_row: int = 0,
+                     memberships_field: Optional[str] = None) -> int:
+        """
+        Store product records
+
+        Args:
+            run_id: Run from start_run()
+            records: Product records (product_id, url, title, regular_price,
+                sale_price and any other fields, kept in the JSON column)
+            first_row: Row number of the first record within the run
+            memberships_field: Field listing the product's categories
+
+        Returns:
+            Number of rows stored
+        """
+        marketplace = self._marketplace(run_id)
+        rows = []
+        for row_number, record in enumerate(records, first_row):
+            memberships = record.get(memberships_field) if memberships_field else None
+            rows.append((
+                run_id, row_number, marketplace,
+                _value(record, 'product_id'), _value(record, 'url'), _value(record, 'title'),
+                to_centavos(_value(record, 'regular_price')), to_centavos(_value(record, 'sale_price')),
+                str(memberships) if memberships else None,
+                json.dumps(record, ensure_ascii=False, default=str),
+            ))
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO products (run_id, row_number, marketplace, product_id, url, title, '
+                'regular_centavos, sale_centavos, categories, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+        return len(rows)
+
+    def update_categories(self, run_id: int, changed: Dict[int, Memberships]):
+        """
+        Replace the categories of products stored earlier in a run
+
+        Args:
+            run_id: Run from start_run()
+            changed: Row number -> all the product's categories
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'UPDATE products SET categories = ? WHERE run_id = ? AND row_number = ?',
+                [(str(memberships), run_id, row_number) for row_number, memberships in changed.items()]
+            )
+
+    def run_totals(self, marketplace: Optional[str] = None, last_runs: int = 90) -> List[Dict]:
+        """
+        Get the totals of the latest complete runs of each marketplace
+
+        Args:
+            marketplace: Only this marketplace (None for all)
+            last_runs: Runs per marketplace
+
+        Returns:
+            Rows with run_id, marketplace, started_at, finished_at,
+            products (rows stored), categories and listed_products (sum of
+            the category counts), oldest run first
+        """
+        where = "status = 'complete'" + (' AND marketplace = ?' if marketplace else '')
+        params = ([marketplace] if marketplace else []) + [last_runs]
+        return self._query(
+            f"""
+            SELECT run_id, marketplace, started_at, finished_at, products, categories, listed_products
+            FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY marketplace ORDER BY run_id DESC) AS age
+                  FROM runs WHERE {where})
+            WHERE age <= ?
+            ORDER BY marketplace, run_id
+            """,
+            params
+        )
+
+    def category_history(self, marketplace: str, category_url: str, last_runs: int = 90) -> List[Dict]:
+        """
+        Get the product count of one category over its latest runs
+
+        Args:
+            marketplace: Marketplace name
+            category_url: Category URL
+            last_runs: Number of runs
+
+        Returns:
+            Rows with run_id, started_at and product_count, oldest run first
+        """
+        rows = self._query(
+            """
+            SELECT counts.run_id, runs.started_at, counts.product_count
+            FROM category_counts AS counts JOIN runs USING (run_id)
+            WHERE counts.marketplace = ? AND counts.category_url = ?
+            ORDER BY counts.run_id DESC LIMIT ?
+            """,
+            (marketplace, category_url, last_runs)
+        )
+        return rows[::-1]
+
+    def product_history(self, marketplace: str, product_id: str, last_runs: int = 90) -> List[Dict]:
+        """
+        Get the prices and categories of one product over its latest runs
+
+        Args:
+            marketplace: Marketplace name
+            product_id: The marketplace's product ID
+            last_runs: Number of runs
+
+        Returns:
+            Rows with run_id, started_at, title, regular_centavos,
+            sale_centavos and categories, oldest run first
+        """
+        rows = self._query(
+            """
+            SELECT products.run_id, runs.started_at, title, regular_centavos, sale_centavos,
+                   products.categories
+            FROM products JOIN runs USING (run_id)
+            WHERE products.marketplace = ? AND product_id = ?
+            ORDER BY products.run_id DESC LIMIT ?
+            """,
+            (marketplace, str(product_id), last_runs)
+        )
+        return rows[::-1]
+
+    def _query(self, sql: str, params: Iterable) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, list(params))]
+
+    def _marketplace(self, run_id: int) -> str:
+        if run_id not in self._marketplaces:
+            with self._lock:
+                row = self._connection.execute('SELECT marketplace FROM runs WHERE run_id = ?',
+                                               (run_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"Unknown run {run_id}")
+            self._marketplaces[run_id] = row['marketplace']
+        return self._marketplaces[run_id]
+
+
+class SnapshotSink(ProductSink):
+    """Writes a run's products to a SnapshotStore in batches while the crawl runs"""
+
+    def __init__(self, store: SnapshotStore, run_id: int, index: Optional[ProductIndex] = None,
+                 batch_size: int = 500):
+        """
+        Args:
+            store: Open snapshot store
+            run_id: Run from store.start_run()
+            index: ProductIndex used to store each product once (None stores
+                every record); its memberships field fills the categories column
+            batch_size: Rows buffered per executemany() transaction
+        """
+        super().__init__(index, batch_size)
+        self.store = store
+        self.run_id = run_id
+
+    def __repr__(self):
+        return f"SnapshotSink({self.store.path!r}, run {self.run_id})"
+
+    def _write_rows(self, rows: List[Dict]):
+        memberships_field = self.index.memberships_field if self.index is not None else None
+        self.store.add_products(self.run_id, rows, self.rows_written, memberships_field)
+
+    def _finish(self, changed: Dict[int, Memberships]):
+        if changed:
+            self.store.update_categories(self.run_id, changed)
+
+
+class CategoryCountSink(ProductSink):
+    """Writes category report rows to a SnapshotStore as categories are counted"""
+
+    def __init__(self, store: SnapshotStore, run_id: int, batch_size: int = 20):
+        """
+        Args:
+            store: Open snapshot store
+            run_id: Run from store.start_run()
+            batch_size: Rows buffered per executemany() transaction
+        """
+        super().__init__(batch_size=batch_size)
+        self.store = store
+        self.run_id = run_id
+
+    def __repr__(self):
+        return f"CategoryCountSink({self.store.path!r}, run {self.run_id})"
+
+    def _write_rows(self, rows: List[Dict]):
+        self.store.add_category_counts(self.run_id, rows)
+
+
+def main():
+    """Print the latest run totals of a snapshot database"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show product totals of the latest scraper runs")
+    parser.add_argument('db', help="Snapshot database")
+    parser.add_argument('--marketplace', help="Only this marketplace")
+    parser.add_argument('--runs', type=int, default=90, help="Runs per marketplace (default: 90)")
+    args = parser.parse_args()
+
+    with SnapshotStore(args.db) as store:
+        rows = store.run_totals(args.marketplace, args.runs)
+    print(f"{'marketplace':<14}{'run':>6}  {'started':<20}{'products':>10}{'categories':>12}{'listed':>10}")
+    for row in rows:
+        print(f"{row['marketplace']:<14}{row['run_id']:>6}  {row['started_at']:<20}"
+              f"{row['products'] or 0:>10}{row['categories'] or 0:>12}{row['listed_products'] or 0:>10}")
+
+
+if __name__ == '__main__':
+    main()
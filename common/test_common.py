@@ -0,0 +1,780 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared scraper components
+Runs offline, without touching any marketplace
+"""
+
+import argparse
+import csv
+import importlib.util
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.checkpoint import Journal
+from common.http_cache import DiskCache, install_cache
+from common.columnar import Column, ParquetSink, load_snapshots, pa
+from common.extraction import ExtractionPlan, Field
+from common.html_parser import available_parsers, parse_html, walk
+from common.prices import centavos, find_amounts, format_amount, pd, price_columns, to_centavos
+from common.product_index import ProductIndex
+from common.sinks import CSVSink, TeeSink
+from common.snapshot_store import CategoryCountSink, SnapshotSink, SnapshotStore
+from common.http_client import HTTPXAdapter, create_session, httpx
+from common.marketplace_server import MarketplaceServer
+from common.rate_limiter import (HostRateLimiter, TokenBucket, add_rate_limit_arguments, format_rate_limit,
+                                  rate_limiter_from_args)
+
+
+class _ETagHandler(BaseHTTPRequestHandler):
+    """Serves a fixed body with an ETag and answers conditional requests"""
+    
+    body = b"<html>" + b"x" * 10000 + b"</html>"
+    etag = '"v1"'
+    
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.send_header('ETag', self.etag)
+        self.end_headers()
+        self.wfile.write(self.body)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def test_rate_limiter_pacing():
+    """Test that a bucket spaces requests at the configured rate"""
+    print("\n" + "="*60)
+    print("TEST: Rate limiter pacing")
+    print("="*60)
+    
+    bucket = TokenBucket(rate=20.0, burst=1)
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    
+    # First request is free, the next four wait 1/20 s each
+    if 0.18 <= elapsed < 0.5:
+        print(f"✓ 5 requests at 20 req/s took {elapsed:.2f}s")
+        return True
+    print(f"✗ Unexpected pacing: {elapsed:.2f}s")
+    return False
+
+
+def test_rate_limiter_counts_request_time():
+    """Test that time spent on a request counts toward the delay"""
+    print("\n" + "="*60)
+    print("TEST: Request time counts toward the delay")
+    print("="*60)
+    
+    limiter = HostRateLimiter.from_delay(0.1)
+    limiter.wait("https://example.com/a")
+    time.sleep(0.1)  # Simulated slow response
+    waited = limiter.wait("https://example.com/b")
+    
+    if waited < 0.02:
+        print(f"✓ No extra sleep after a slow response (waited {waited:.3f}s)")
+        return True
+    print(f"✗ Waited {waited:.3f}s after a slow response")
+    return False
+
+
+def test_rate_limiter_threads_and_hosts():
+    """Test that buckets are per host and shared safely between threads"""
+    print("\n" + "="*60)
+    print("TEST: Rate limiter across threads and hosts")
+    print("="*60)
+    
+    limiter = HostRateLimiter(requests_per_second=20.0, burst=2)
+    
+    def worker(host):
+        for _ in range(3):
+            limiter.wait(f"https://{host}/page")
+    
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(host,))
+               for host in ("a.example", "a.example", "b.example")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    
+    # a.example: 6 requests, 2 free from the burst, then 4 at 1/20 s each
+    if 0.18 <= elapsed < 0.5:
+        print(f"✓ 9 requests over 2 hosts took {elapsed:.2f}s")
+        return True
+    print(f"✗ Unexpected pacing: {elapsed:.2f}s")
+    return False
+
+
+def test_rate_limit_options():
+    """Test that the default limit grows with the worker count and the options override it"""
+    print("\n" + "="*60)
+    print("TEST: Rate limit options")
+    print("="*60)
+    
+    parser = argparse.ArgumentParser()
+    add_rate_limit_arguments(parser, delay=0.5)
+    sized = rate_limiter_from_args(parser.parse_args([]), delay=0.5, workers=8)
+    explicit = rate_limiter_from_args(parser.parse_args(['--rate', '3', '--burst', '2']), delay=0.5, workers=8)
+    unlimited = rate_limiter_from_args(parser.parse_args(['--rate', '0']), delay=0.5, workers=8)
+    
+    # 4 workers with a 0.2s delay: the 4-request burst is free, then 20 requests/s
+    limiter = HostRateLimiter.for_workers(0.2, workers=4)
+    
+    def worker():
+        for _ in range(3):
+            limiter.wait("https://a.example/page")
+    
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    
+    checks = [
+        ("default sized from the workers", (sized.requests_per_second, sized.burst) == (16.0, 8)),
+        ("--rate and --burst", (explicit.requests_per_second, explicit.burst) == (3.0, 2)),
+        ("--rate 0 disables the limit", unlimited.bucket("a.example") is None),
+        (f"4 workers paced together ({elapsed:.2f}s for 12 requests)", 0.35 <= elapsed < 0.8),
+        ("summary line", format_rate_limit(sized) == "rate limit: 16 requests/s per host, bursts of 8"),
+    ]
+    for name, ok in checks:
+        print(f"  {'✓' if ok else '✗'} {name}")
+    return all(ok for _, ok in checks)
+
+
+def test_http_cache_revalidation():
+    """Test that a second run revalidates instead of downloading again"""
+    print("\n" + "="*60)
+    print("TEST: HTTP cache conditional revalidation")
+    print("="*60)
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/page.html"
+    
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = requests.Session()
+            first_cache = install_cache(first, cache_dir)
+            body = first.get(url, timeout=5).content
+            
+            # A new session simulates the next daily run
+            second = requests.Session()
+            second_cache = install_cache(second, cache_dir)
+            response = second.get(url, timeout=5)
+            
+            ttl_session = requests.Session()
+            ttl_cache = install_cache(ttl_session, cache_dir, default_ttl=3600)
+            ttl_session.get(url, timeout=5)
+    finally:
+        server.shutdown()
+    
+    ok = (first_cache.stats['misses'] == 1
+          and second_cache.stats['revalidated'] == 1
+          and second_cache.stats['network_bytes'] == 0
+          and response.content == body
+          and ttl_cache.stats['hits'] == 1)
+    if ok:
+        print("✓ Unchanged page revalidated with 304, fresh page served from disk")
+        return True
+    print(f"✗ Unexpected cache stats: {first_cache.stats} {second_cache.stats} {ttl_cache.stats}")
+    return False
+
+
+class _LargeETagHandler(_ETagHandler):
+    """Serves a body far larger than one streamed chunk"""
+    
+    body = b"<html>" + b"x" * (4 * 1024 * 1024) + b"</html>"
+
+
+def test_http_cache_streaming():
+    """Test that a streamed read through the cache stops early"""
+    print("\n" + "="*60)
+    print("TEST: HTTP cache passes streamed responses through")
+    print("="*60)
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _LargeETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/page.html"
+    
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            session = requests.Session()
+            cache = install_cache(session, cache_dir)
+            response = session.get(url, timeout=5, stream=True)
+            first_chunk = next(response.iter_content(chunk_size=64 * 1024))
+            bytes_read = response.raw.tell()
+            response.close()
+            stored = cache.cache.get(url)
+    finally:
+        server.shutdown()
+    
+    body_size = len(_LargeETagHandler.body)
+    ok = (first_chunk.startswith(b"<html>")
+          and bytes_read < body_size // 4
+          and cache.stats['streamed'] == 1
+          and stored is None)
+    if ok:
+        print(f"✓ Read {bytes_read:,} of {body_size:,} bytes, response not stored")
+        return True
+    print(f"✗ Read {bytes_read:,} of {body_size:,} bytes, stats {cache.stats}, stored: {stored is not None}")
+    return False
+
+
+def test_http_cache_eviction():
+    """Test that the cache directory stays under its size limit"""
+    print("\n" + "="*60)
+    print("TEST: HTTP cache LRU eviction")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = DiskCache(cache_dir, max_bytes=3500)
+        for i in range(3):
+            cache.put(f"https://example.com/{i}", {'stored_at': 0}, b"x" * 1000)
+            time.sleep(0.01)
+        cache.get("https://example.com/0")  # Mark the oldest entry as recently used
+        time.sleep(0.01)
+        cache.put("https://example.com/3", {'stored_at': 0}, b"x" * 1000)
+        
+        kept = [i for i in range(4) if cache.get(f"https://example.com/{i}")]
+    
+    if kept == [0, 2, 3]:
+        print("✓ Least recently used entry evicted")
+        return True
+    print(f"✗ Unexpected entries kept: {kept}")
+    return False
+
+
+def test_marketplace_server():
+    """Test that the stand-in server serves captures and synthetic pages"""
+    print("\n" + "="*60)
+    print("TEST: Local marketplace server")
+    print("="*60)
+    
+    server = MarketplaceServer(pages=3).start()
+    failing = MarketplaceServer(error_rate=1.0).start()
+    try:
+        categories = requests.get(f"{server.base_url}/venbo/categorias/", timeout=10).text
+        listing = requests.get(f"{server.base_url}/venbo/cat-producto/alimentacion/conservas/", timeout=10).text
+        dismac = requests.get(f"{server.base_url}/dismac/categorias/52-hogar.html", timeout=10).text
+        error = requests.get(f"{failing.base_url}/venbo/categorias/", timeout=10)
+    finally:
+        server.stop()
+        failing.stop()
+    
+    checks = [
+        ("capture links rewritten", f"{server.base_url}/venbo/cat-producto/" in categories
+         and "https://venbo.shop/cat-producto/" not in categories),
+        ("synthetic listing", "woocommerce-result-count" in listing and "kad_product" in listing),
+        ("synthetic Dismac count", 'let htmlCount = "' in dismac),
+        ("error injection", error.status_code == 503),
+    ]
+    for name, ok in checks:
+        print(f"  {'✓' if ok else '✗'} {name}")
+    return all(ok for _, ok in checks)
+
+
+def test_http_client():
+    """Test the session factory: pool size, timeouts, compression, keep-alive and the cache"""
+    print("\n" + "="*60)
+    print("TEST: HTTP client factory")
+    print("="*60)
+    
+    server = MarketplaceServer().start()
+    url = f"{server.base_url}/dismac/categorias/52-hogar.html"
+    try:
+        session = create_session(user_agent="test-agent", workers=32, connect_timeout=2, read_timeout=5)
+        compressed = session.get(url)
+        connections_before = server.stats['connections']
+        session.get(url)
+        reused = server.stats['connections'] == connections_before
+        
+        plain = create_session(compression=False).get(url)
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cached_session = create_session(workers=32)
+            install_cache(cached_session, cache_dir)
+            cached_session.get(url)
+            revalidated = cached_session.get(url)
+    finally:
+        server.stop()
+    
+    adapter = session.get_adapter(url)
+    brotli_installed = any(importlib.util.find_spec(name) for name in ('brotli', 'brotlicffi'))
+    checks = [
+        ("pool sized for workers", adapter._pool_maxsize == 32),
+        ("split timeout", session.timeout == (2, 5)),
+        ("user agent", compressed.request.headers['User-Agent'] == "test-agent"),
+        ("gzip body decoded", compressed.headers.get('Content-Encoding') == 'gzip'
+         and compressed.text == plain.text),
+        ("no compression", 'Content-Encoding' not in plain.headers),
+        ("only decodable encodings offered",
+         ('br' in compressed.request.headers['Accept-Encoding'].split(', ')) == brotli_installed),
+        ("connection reused", reused),
+        ("cache over the pooled transport", getattr(revalidated, 'from_cache', False)
+         and cached_session.get_adapter(url).transport._pool_maxsize == 32),
+    ]
+    for name, ok in checks:
+        print(f"  {'✓' if ok else '✗'} {name}")
+    return all(ok for _, ok in checks)
+
+
+def test_http2_transport():
+    """Test the httpx transport behind create_session(http2=True), when httpx[http2] is installed"""
+    print("\n" + "="*60)
+    print("TEST: HTTP/2 transport")
+    print("="*60)
+    
+    if httpx is None or importlib.util.find_spec('h2') is None:
+        print("  - httpx[http2] not installed, skipped")
+        return True
+    
+    # The stand-in server speaks HTTP/1.1 without TLS, so httpx falls back to it
+    server = MarketplaceServer().start()
+    url = f"{server.base_url}/dismac/categorias/52-hogar.html"
+    try:
+        session = create_session(http2=True, workers=4)
+        response = session.get(url)
+        expected = requests.get(url, timeout=10).content
+        streamed = session.get(url, stream=True)
+        first_chunk = next(streamed.iter_content(chunk_size=1024))
+        streamed.close()
+        missing = session.get(f"{server.base_url}/missing.html")
+    finally:
+        server.stop()
+    
+    checks = [
+        ("httpx adapter mounted", isinstance(session.get_adapter(url), HTTPXAdapter)),
+        ("same body as requests", response.status_code == 200 and response.content == expected),
+        ("streamed read", first_chunk == expected[:len(first_chunk)] and len(first_chunk) > 0),
+        ("error status passed through", missing.status_code == 404),
+    ]
+    for name, ok in checks:
+        print(f"  {'✓' if ok else '✗'} {name}")
+    return all(ok for _, ok in checks)
+
+
+def test_parser_backends():
+    """Test that every backend answers the BeautifulSoup calls the scrapers make alike"""
+    print("\n" + "="*60)
+    print("TEST: Parser backends")
+    print("="*60)
+    
+    html = (b"<html><body><header class='head'><h3>Hogar</h3></header>"
+            b"<div class='product-col first'><a href='/p/1' data-id=''>Uno <span>&amp; dos</span></a>"
+            b"<script>var x = 1;</script><!-- note --></div>"
+            b"<div class='kad_product'><a>sin enlace</a></div>"
+            b"<script type='text/template'>\"<li>plantilla</li>\"</script></body></html>")
+    
+    def extract(soup):
+        product = soup.find('div', class_='product-col')
+        return (
+            [div.get('class') for div in soup.find_all(['li', 'div'], class_=re.compile(r'product'))],
+            soup.find('div', class_='product-col first') is not None,
+            soup.find('a', href=True)['href'],
+            soup.find('a', {'data-id': True}).get('data-id'),
+            product.get_text(),
+            product.get_text(strip=True),
+            product.find_previous('header', class_='head').find('h3').get_text(strip=True),
+            soup.find('script', type='text/template').string,
+            len(soup.find_all('a')),
+            soup.find('span', class_='missing'),
+            [node if isinstance(node, str) else node.name for node in walk(product)],
+        )
+    
+    extracted = {backend: extract(parse_html(html, backend)) for backend in available_parsers()}
+    reference = extracted['html.parser']
+    ok = True
+    for backend, result in extracted.items():
+        same = result == reference
+        ok = ok and same
+        print(f"  {'✓' if same else '✗'} {backend}")
+        if not same:
+            print(f"    {result}\n    {reference}")
+    return ok
+
+
+def test_extraction_plan():
+    """Test that a compiled plan reads the same values as the find() calls it replaces"""
+    print("\n" + "="*60)
+    print("TEST: Extraction plan")
+    print("="*60)
+    
+    html = (b"<ul><li class='product-col post-9 instock'>"
+            b"<a href='/p/9'><img data-src='/lazy.jpg' src='/blank.gif'></a>"
+            b"<div class='rating'><span class='stars'><strong class='rating'>4.5</strong></span></div>"
+            b"<strong class='rating'>fuera</strong>"
+            b"<h2 class='title'>Respaldo</h2><h3 class='title main'>Principal</h3>"
+            b"<span class='tags'><a>uno</a> <a>dos</a></span>"
+            b"<a class='buy' data-sku='S9' href='/c/9'>Comprar</a></li></ul>")
+    plan = ExtractionPlan([
+        Field('title', ['h3.main', 'h2.title'], default='N/A'),
+        Field('url', ['a.missing[href]', 'a[href]'], attr='href'),
+        Field('rating', 'div.rating strong.rating', default='0'),
+        Field('tags', 'span.tags a', many=True, post=', '.join),
+        Field('sku', 'a[data-sku]', attr='data-sku'),
+        Field('image', 'img', get=lambda img: img.get('data-src') or img.get('src')),
+        Field('badge', 'div.onsale', post=lambda _: 'Yes', default='No'),
+        Field('classes', attr='class', post=' '.join),
+    ])
+    expected = {'title': 'Principal', 'url': '/p/9', 'rating': '4.5', 'tags': 'uno, dos', 'sku': 'S9',
+                'image': '/lazy.jpg', 'badge': 'No', 'classes': 'product-col post-9 instock'}
+    
+    ok = True
+    for backend in available_parsers():
+        card = parse_html(html, backend).find('li', class_='product-col')
+        record = plan.extract(card)
+        same = record == expected
+        ok = ok and same
+        print(f"  {'✓' if same else '✗'} {backend}")
+        if not same:
+            print(f"    {record}")
+    return ok
+
+
+def test_prices():
+    """Test price normalization for both store formats, per value and per column"""
+    print("\n" + "="*60)
+    print("TEST: Price normalization")
+    print("="*60)
+    
+    cases = {
+        '1.234,50': [123450],
+        '1,234.50': [123450],
+        '17,50Bs': [1750],
+        'Bs.475.00': [47500],
+        'Bs.1.234': [123400],
+        '<del>20,00Bs</del> <ins>15,00Bs</ins> (25%)': [2000, 1500],
+        'Bs.1,500.00 Bs.1,200.00': [150000, 120000],
+        '-20%': [],
+        'N/A': [],
+    }
+    ok = True
+    for text, expected in cases.items():
+        amounts = find_amounts(text)
+        if amounts != expected:
+            print(f"  ✗ {text!r}: {amounts} (expected {expected})")
+            ok = False
+    ok = ok and format_amount(123450) == '1234.50' and to_centavos('0,5') == 50
+    print(f"  {'✓' if ok else '✗'} per-value parsing")
+    
+    if pd is None:
+        print("  - column parsing skipped (pandas not installed)")
+        return ok
+    
+    texts = list(cases) + [None, '1234.50']
+    singles = [None if value is pd.NA else int(value) for value in centavos(texts)]
+    columns = price_columns(texts)
+    same = singles == [to_centavos(text) for text in texts]
+    same = same and [None if value is pd.NA else int(value) for value in columns['sale_centavos']] == \
+        [(a[1] if len(a) > 1 else a[0]) if a else None for a in map(find_amounts, texts)]
+    same = same and int(columns['discount_pct'][5]) == 25 and int(columns['discount_pct'][6]) == 20
+    print(f"  {'✓' if same else '✗'} column parsing matches per-value parsing")
+    return ok and same
+
+
+def test_product_index():
+    """Test merging nested wrappers and cross-category repeats into one record per product"""
+    print("\n" + "="*60)
+    print("TEST: Product index")
+    print("="*60)
+    
+    index = ProductIndex('shop', category_field='category', memberships_field='categories')
+    records = [
+        # Listing wrapper: the first product's URL, no ID of its own
+        {'category': 'Tienda', 'product_id': 'N/A', 'url': '/p/1', 'title': 'Uno', 'stock': 'Unknown'},
+        {'category': 'Tienda', 'product_id': '1', 'url': '/p/1', 'title': 'Uno', 'stock': 'Yes', 'sku': 'N/A'},
+        # Inner wrappers of the same card, and one with nothing to identify
+        {'category': 'Tienda', 'product_id': 'N/A', 'url': '/p/1', 'title': 'Uno', 'stock': 'Unknown'},
+        {'category': 'Tienda', 'product_id': 'N/A', 'url': 'N/A', 'title': 'N/A', 'stock': 'Unknown'},
+        {'category': 'Tienda', 'product_id': '2', 'url': '/p/2', 'title': 'Dos', 'stock': 'No', 'sku': 'S2'},
+        # The category listings repeat the store's products
+        {'category': 'Audio', 'product_id': '2', 'url': '/p/2', 'title': 'Dos', 'stock': 'No', 'sku': 'S2'},
+        {'category': 'Audio', 'product_id': '1', 'url': '/p/1', 'title': 'Uno', 'stock': 'Yes', 'sku': 'S1'},
+        {'category': 'Audio', 'product_id': '1', 'url': '/p/1', 'title': 'Uno', 'stock': 'Yes', 'sku': 'S1'},
+    ]
+    new = index.extend(records)
+    
+    first = index.records[0]
+    ok = (new == 2 and len(index) == 2
+          and [r['product_id'] for r in index] == ['1', '2']
+          and first['stock'] == 'Yes' and first['sku'] == 'S1' and first['category'] == 'Tienda'
+          and first['categories'] == ['Tienda', 'Audio'] and str(first['categories']) == 'Tienda|Audio'
+          and index.stats == {'records': 8, 'merged': 5, 'dropped': 1})
+    print(f"  {'✓' if ok else '✗'} {index.stats['records']} records -> {len(index)} products "
+          f"({index.stats['merged']} merged, {index.stats['dropped']} dropped)")
+    
+    # Re-indexing merged records (e.g. from another index) keeps their memberships
+    other = ProductIndex('shop', category_field='category', memberships_field='categories')
+    other.extend([dict(record) for record in index])
+    other.add({'category': 'Seguridad', 'product_id': '2', 'url': '/p/2'})
+    same = [list(r['categories']) for r in other] == [['Tienda', 'Audio'], ['Tienda', 'Audio', 'Seguridad']]
+    print(f"  {'✓' if same else '✗'} memberships survive re-indexing")
+    return ok and same
+
+
+def test_csv_sink():
+    """Test streaming CSV output: batches on disk, atomic replace, late categories filled in"""
+    print("\n" + "="*60)
+    print("TEST: Streaming CSV sink")
+    print("="*60)
+    
+    fields = ['product_id', 'url', 'title', 'category', 'categories']
+    page = lambda category, ids: [{'product_id': str(i), 'url': f'/p/{i}', 'title': f'P{i}', 'category': category}
+                                  for i in ids]
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'products.csv')
+        with open(filename, 'w') as f:
+            f.write('previous export\n')
+        
+        # A run that fails midway leaves the previous export and the batches written so far
+        index = ProductIndex('shop', category_field='category', memberships_field='categories')
+        try:
+            with CSVSink(filename, fields, index=index, batch_size=2) as sink:
+                sink.write(page('Tienda', [1, 2, 3]))
+                raise RuntimeError("connection lost")
+        except RuntimeError:
+            pass
+        with open(filename) as f:
+            kept = f.read() == 'previous export\n'
+        with open(filename + '.part') as f:
+            partial = len(f.read().splitlines()) == 4
+        ok = kept and partial
+        print(f"  {'✓' if ok else '✗'} interrupted run keeps the previous file and its batches in .part")
+        
+        # A complete run replaces the file; products seen again only add categories
+        index = ProductIndex('shop', category_field='category', memberships_field='categories')
+        with CSVSink(filename, fields, index=index, batch_size=2) as sink:
+            new = [sink.write(page('Tienda', [1, 2, 3])), sink.write(page('Audio', [3, 1])),
+                   sink.write(page('Audio', [4]))]
+        with open(filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        same = (new == [3, 0, 1] and [row['product_id'] for row in rows] == ['1', '2', '3', '4']
+                and [row['categories'] for row in rows] == ['Tienda|Audio', 'Tienda', 'Tienda|Audio', 'Audio']
+                and not os.path.exists(filename + '.part') and sink.rows_written == 4
+                and index.records == [])
+        print(f"  {'✓' if same else '✗'} {sink.rows_written} unique rows, categories updated at close, "
+              f"written records released from memory")
+    return ok and same
+
+
+def test_snapshot_store():
+    """Test the SQLite snapshot store: products and counts written during runs, history queries"""
+    print("\n" + "="*60)
+    print("TEST: Snapshot store")
+    print("="*60)
+    
+    fields = ['product_id', 'url', 'title', 'regular_price', 'sale_price', 'category', 'categories']
+    page = lambda category, ids: [{'product_id': str(i), 'url': f'/p/{i}', 'title': f'P{i}',
+                                   'regular_price': f'{i}0.50', 'sale_price': 'N/A', 'category': category}
+                                  for i in ids]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'scrapes.db')
+        filename = os.path.join(tmp, 'products.csv')
+        store = SnapshotStore(path)
+        
+        # Products go to the CSV and the store in the same batches; a second
+        # connection sees the committed batches while the run is going on
+        index = ProductIndex('shop', category_field='category', memberships_field='categories')
+        with store.run('shop') as run_id:
+            sinks = [CSVSink(filename, fields, index=index), SnapshotSink(store, run_id, index=index)]
+            with TeeSink(sinks, index=index, batch_size=2) as sink:
+                sink.write(page('Tienda', [1, 2, 3]))
+                with SnapshotStore(path) as reader:
+                    during = reader._query('SELECT COUNT(*) AS n FROM products', [])[0]['n']
+                sink.write(page('Audio', [3, 1, 4]))
+            store.add_category_counts(run_id, [{'url': '/tienda', 'category_name': 'Tienda', 'product_count': 3},
+                                               {'url': '/audio', 'category_name': 'Audio', 'product_count': 3}])
+        with open(filename, newline='', encoding='utf-8') as f:
+            csv_categories = [row['categories'] for row in csv.DictReader(f)]
+        stored = store._query('SELECT product_id, regular_centavos, sale_centavos, categories FROM products '
+                              'ORDER BY row_number', [])
+        same = (during == 3 and csv_categories == [row['categories'] for row in stored]
+                == ['Tienda|Audio', 'Tienda', 'Tienda|Audio', 'Audio']
+                and stored[0]['regular_centavos'] == 1050 and stored[0]['sale_centavos'] is None)
+        print(f"  {'✓' if same else '✗'} {len(stored)} products stored during the run, "
+              f"same rows and categories as the CSV")
+        
+        # A category report written as it is counted; a failed run is not reported
+        with store.run('shop') as run_id:
+            with CategoryCountSink(store, run_id, batch_size=1) as counts:
+                counts.write([{'url': '/tienda', 'category_name': 'Tienda', 'product_count': 5}])
+        try:
+            with store.run('shop') as run_id:
+                raise RuntimeError("connection lost")
+        except RuntimeError:
+            pass
+        totals = store.run_totals('shop', last_runs=90)
+        history = store.category_history('shop', '/tienda')
+        statuses = [row['status'] for row in store._query('SELECT status FROM runs ORDER BY run_id', [])]
+        reported = ([(row['products'], row['listed_products']) for row in totals] == [(4, 6), (0, 5)]
+                    and [row['product_count'] for row in history] == [3, 5]
+                    and statuses == ['complete', 'complete', 'failed']
+                    and [row['regular_centavos'] for row in store.product_history('shop', '4')] == [4050])
+        print(f"  {'✓' if reported else '✗'} run totals, category and product history "
+              f"({len(totals)} complete runs, failed run excluded)")
+        store.close()
+    return same and reported
+
+
+def test_checkpoint_journal():
+    """Test the checkpoint journal: resume, torn last line, wrong marketplace and completion"""
+    print("\n" + "="*60)
+    print("TEST: Checkpoint journal")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'shop.journal')
+        with Journal(path, 'shop') as journal:
+            journal.record('/tienda/', {'products': [{'title': 'Añadir'}], 'total_pages': 2})
+            journal.record('/tienda/page/2/', {'products': [], 'total_pages': 2})
+            # Recorded results stay on disk only
+            keys_only = (len(journal) == 2 and '/tienda/' in journal and not journal.completed)
+        # The run died halfway through writing a line
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"unit":"/audio/","res')
+        
+        with Journal(path, 'shop', resume=True) as journal:
+            resumed = (len(journal) == 2 and journal.stats['torn'] == 1
+                       and journal.get('/tienda/')['products'][0]['title'] == 'Añadir'
+                       and journal.get('/audio/') is None)
+            journal.record('/audio/', {'products': [], 'total_pages': 1})
+        with Journal(path, 'shop', resume=True) as journal:
+            appended = sorted(journal.completed) == ['/audio/', '/tienda/', '/tienda/page/2/']
+        print(f"  {'✓' if keys_only else '✗'} recorded results kept on disk, not in memory")
+        print(f"  {'✓' if resumed and appended else '✗'} resumed 2 units, torn line dropped, appended after it")
+        
+        try:
+            Journal(path, 'other', resume=True)
+            mismatch = False
+        except ValueError:
+            mismatch = True
+        with Journal(path, 'shop') as journal:
+            fresh = len(journal) == 0
+            journal.complete()
+        completed = fresh and not os.path.exists(path)
+        print(f"  {'✓' if mismatch else '✗'} another marketplace's journal is refused")
+        print(f"  {'✓' if completed else '✗'} a new run starts over; complete() deletes the journal")
+    return keys_only and resumed and appended and mismatch and completed
+
+
+def test_parquet_sink():
+    """Test typed Parquet snapshots: column types, nulls, partitions and late categories"""
+    print("\n" + "="*60)
+    print("TEST: Parquet snapshots")
+    print("="*60)
+    
+    if pa is None:
+        print("  - pyarrow not installed, skipped")
+        return True
+    
+    columns = [Column('product_id'), Column('regular_centavos', 'price', field='regular_price'),
+               Column('on_sale', 'flag'), Column('discount_pct', 'percent', field='discount'),
+               Column('stock_status', 'category'), Column('categories', 'categories')]
+    page = lambda category, ids: [{'product_id': str(i), 'regular_price': f'{i}.50' if i % 2 else 'N/A',
+                                   'on_sale': 'Yes' if i % 2 else 'No', 'discount': '-19%' if i == 1 else 'N/A',
+                                   'stock_status': 'In Stock', 'category': category}
+                                  for i in ids]
+    with tempfile.TemporaryDirectory() as tmp:
+        # Two runs of one marketplace on different days; products seen again only add categories
+        for day, ids in ((1, [1, 2, 3]), (2, [4])):
+            index = ProductIndex('shop', category_field='category', memberships_field='categories')
+            with ParquetSink(tmp, 'shop', columns, index=index, batch_size=2,
+                             started=datetime(2026, 10, day, 9, 30)) as sink:
+                sink.write(page('Tienda', ids))
+                sink.write(page('Audio', ids[::-1]))
+        
+        # An interrupted run leaves a hidden .part file that is never loaded
+        try:
+            with ParquetSink(tmp, 'other', columns[:1], started=datetime(2026, 10, 2, 10, 0)) as sink:
+                sink.write([{'product_id': '9'}])
+                raise RuntimeError("connection lost")
+        except RuntimeError:
+            pass
+        
+        table = load_snapshots(tmp)
+        types = {field.name: str(field.type) for field in table.schema}
+        typed = (types['regular_centavos'] == 'int64' and types['on_sale'] == 'bool'
+                 and types['stock_status'].startswith('dictionary')
+                 and types['categories'].startswith('list<element: dictionary')
+                 and types['marketplace'].startswith('dictionary') and types['date'] == 'date32[day]')
+        rows = table.sort_by('product_id').to_pylist()
+        values = ([row['regular_centavos'] for row in rows] == [150, None, 350, None]
+                  and [row['discount_pct'] for row in rows] == [19, None, None, None]
+                  and [row['categories'] for row in rows] == [['Tienda', 'Audio']] * 4
+                  and set(table.column('marketplace').to_pylist()) == {'shop'})
+        ok = typed and values
+        print(f"  {'✓' if ok else '✗'} {len(rows)} rows: integer prices, real nulls, dictionary columns, "
+              f"categories updated at close, unfinished run ignored")
+        
+        # Partition filters only read the matching days
+        second_day = load_snapshots(tmp, marketplaces=['shop'], start=date(2026, 10, 2),
+                                    columns=['product_id', 'date'])
+        filtered = second_day.column('product_id').to_pylist() == ['4'] and second_day.num_columns == 2
+        print(f"  {'✓' if filtered else '✗'} date and marketplace filters select one partition")
+    return ok and filtered
+
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("SHARED COMPONENTS - TESTS")
+    print("="*60)
+    
+    results = [
+        ("Rate limiter pacing", test_rate_limiter_pacing()),
+        ("Request time counts toward delay", test_rate_limiter_counts_request_time()),
+        ("Rate limiter threads and hosts", test_rate_limiter_threads_and_hosts()),
+        ("Rate limit options", test_rate_limit_options()),
+        ("HTTP cache revalidation", test_http_cache_revalidation()),
+        ("HTTP cache streaming", test_http_cache_streaming()),
+        ("HTTP cache eviction", test_http_cache_eviction()),
+        ("Local marketplace server", test_marketplace_server()),
+        ("HTTP client factory", test_http_client()),
+        ("HTTP/2 transport", test_http2_transport()),
+        ("Parser backends", test_parser_backends()),
+        ("Extraction plan", test_extraction_plan()),
+        ("Price normalization", test_prices()),
+        ("Product index", test_product_index()),
+        ("Streaming CSV sink", test_csv_sink()),
+        ("Snapshot store", test_snapshot_store()),
+        ("Parquet snapshots", test_parquet_sink()),
+        ("Checkpoint journal", test_checkpoint_journal()),
+    ]
+    
+    print("\n" + "="*60)
+    print("TEST SUMMARY")
+    print("="*60)
+    
+    passed = sum(1 for _, result in results if result)
+    for test_name, result in results:
+        status = "✓ PASSED" if result else "✗ FAILED"
+        print(f"{test_name:.<40} {status}")
+    
+    print(f"\nResults: {passed}/{len(results)} tests passed")
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all_tests())
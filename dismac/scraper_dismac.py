@@ -9,15 +9,28 @@ Usage:
     python scraper_dismac.py
 """
 
+import os
 import re
 import csv
-import time
-from typing import List, Dict, Set, Optional
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Set, Optional, Tuple
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 import requests
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.checkpoint import Journal, add_journal_arguments, format_journal_stats, open_journal
+from common.columnar import Column, ParquetSink
+from common.http_cache import format_cache_stats, install_cache
+from common.html_parser import PARSERS, parse_html, resolve_parser
+from common.http_client import add_client_arguments, client_options, create_session
+from common.rate_limiter import (HostRateLimiter, add_rate_limit_arguments, format_rate_limit,
+                                  rate_limiter_from_args)
+from common.sinks import CSVSink, ProductSink
+from common.snapshot_store import CategoryCountSink, SnapshotStore
+
 
 class DismacCategoryScraper:
     """Scrapes Dismac category hierarchy and product counts."""
@@ -25,14 +38,81 @@ class DismacCategoryScraper:
     BASE_URL = "https://www.dismac.com.bo"
     CATEGORIES_URL = f"{BASE_URL}/categorias.html"
     
-    def __init__(self):
-        """Initialize scraper with session and tracking variables."""
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36'
-        })
+    # Byte patterns used by the scan fast path and the streaming count mode
+    COUNT_MARKER = re.compile(rb'let htmlCount = "(\d+) Productos";')
+    TITLE_WRAPPER_DIV = re.compile(rb'<div\s[^>]*?class\s*=\s*["\'](?:[^"\']*\s)?page-title-wrapper[\s"\']')
+    TITLE_WRAPPER_CLASS = re.compile(rb'class\s*=\s*["\'](?:[^"\']*\s)?page-title-wrapper[\s"\']')
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    # Columns of the CSV report; the validators let the next incremental run
+    # ask the server whether a category page changed
+    REPORT_FIELDS = ['category_name', 'level', 'parent', 'url', 'product_count', 'scraped_at',
+                     'etag', 'last_modified']
+    
+    # Typed columns of the Parquet snapshot (the CSV report rows, converted)
+    PARQUET_COLUMNS = [
+        Column('category_name'),
+        Column('level', 'integer'),
+        Column('parent', 'category'),
+        Column('url'),
+        Column('product_count', 'integer'),
+        Column('scraped_at', 'timestamp'),
+    ]
+    
+    def __init__(self, delay: float = 1.0, rate_limiter: Optional[HostRateLimiter] = None,
+                 cache_dir: Optional[str] = None, cache_ttl: float = 0,
+                 base_url: Optional[str] = None, workers: int = 1, stream: bool = False,
+                 session_options: Optional[Dict] = None,
+                 parser: Optional[str] = None, previous: Optional[Dict[str, Dict]] = None,
+                 journal: Optional[Journal] = None):
+        """
+        Initialize scraper with session and tracking variables.
+        
+        Args:
+            delay: Minimum average interval between requests in seconds
+            rate_limiter: Shared per-host rate limiter (defaults to one
+                allowing a request every `delay` seconds per worker, see
+                HostRateLimiter.for_workers)
+            cache_dir: Directory for the on-disk HTTP cache (None disables it)
+            cache_ttl: Seconds a cached page is reused without revalidation
+            base_url: Override for BASE_URL (e.g. a local stand-in server)
+            workers: Number of categories processed in parallel
+            stream: Read category pages in chunks and stop as soon as the
+                count is known instead of downloading and parsing them
+            session_options: Keyword arguments for create_session() (pool
+                size, keep-alive, compression, timeouts, HTTP/2)
+            parser: HTML parser backend (html.parser, lxml or selectolax)
+            previous: Rows of the previous report by URL (see load_report());
+                enables the incremental mode, which only recounts categories
+                whose page changed
+            journal: Checkpoint journal every counted category is recorded
+                in; categories it already holds are not fetched again
+        """
+        if base_url:
+            self.BASE_URL = base_url.rstrip('/')
+            self.CATEGORIES_URL = f"{self.BASE_URL}/categorias.html"
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter or HostRateLimiter.for_workers(delay, self.workers)
+        self.parser = resolve_parser(parser)
+        self.session = create_session(user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
+                                      workers=self.workers, **(session_options or {}))
+        self.http_cache = install_cache(self.session, cache_dir, default_ttl=cache_ttl) if cache_dir else None
+        self.stream = stream
+        # Bytes pulled over the wire against the pages' full Content-Length
+        self.stream_stats = {'pages': 0, 'early_exits': 0, 'bytes_read': 0, 'bytes_total': 0,
+                             'unknown_length': 0}
+        # How each page was classified: by the byte scan or by a DOM parse
+        self.count_paths = {'scan_count': 0, 'scan_not_listing': 0, 'dom': 0}
         self.visited_urls: Set[str] = set()
         self.results: List[Dict] = []
+        self.previous = previous
+        self.journal = journal
+        # Incremental mode: what happened to each category of the previous report
+        self.incremental_stats = {'skipped': 0, 'revalidated': 0, 'refetched': 0,
+                                  'new': 0, 'changed': 0, 'removed': 0}
+        self.removed_categories: List[Dict] = []
+        self._lock = threading.Lock()
+        self._completed = 0
         
     def fetch_page(self, url: str) -> Optional[str]:
         """
@@ -45,15 +125,205 @@ class DismacCategoryScraper:
             HTML content or None if failed
         """
         try:
+            self.rate_limiter.wait(url)  # Be respectful to the server
             print(f"Fetching: {url}")
-            response = self.session.get(url, timeout=30)
+            response = self.session.get(url)
             response.raise_for_status()
-            time.sleep(1)  # Be respectful to the server
             return response.text
         except requests.RequestException as e:
             print(f"Error fetching {url}: {e}")
             return None
     
+    def fetch_content(self, url: str) -> Optional[Tuple[bytes, str, Dict[str, str]]]:
+        """
+        Fetch a page without decoding it.
+        
+        Args:
+            url: URL to fetch
+            
+        Returns:
+            (body bytes, encoding, validators) or None if failed
+        """
+        try:
+            self.rate_limiter.wait(url)  # Be respectful to the server
+            print(f"Fetching: {url}")
+            response = self.session.get(url)
+            response.raise_for_status()
+            return response.content, response.encoding or 'utf-8', self.validators(response)
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return None
+    
+    @staticmethod
+    def validators(response: requests.Response) -> Dict[str, str]:
+        """
+        Get the validators of a response for the next conditional request.
+        
+        Args:
+            response: Category page response
+            
+        Returns:
+            Dictionary with 'etag' and 'last_modified' ('' when absent)
+        """
+        return {
+            'etag': response.headers.get('ETag', ''),
+            'last_modified': response.headers.get('Last-Modified', ''),
+        }
+    
+    def stream_product_count(self, url: str) -> Tuple[bool, Optional[int], Dict[str, str]]:
+        """
+        Read a category page in chunks until its product count is known.
+        
+        Pages are classified by the same rule as count_products(): once a
+        `<div class="page-title-wrapper">` and the
+        `let htmlCount = "N Productos";` script have both arrived, the
+        download stops with the count. Any other page can only be ruled out
+        at its end, so it is read in full and handed to count_products().
+        
+        Args:
+            url: Category page URL
+            
+        Returns:
+            (fetched, count, validators) - fetched is False if the request
+            failed, count is None if the page is not a product listing
+        """
+        try:
+            self.rate_limiter.wait(url)  # Be respectful to the server
+            print(f"Fetching: {url}")
+            response = self.session.get(url, stream=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            return False, None, {}
+        
+        fetched, count = self.read_product_count(response)
+        return fetched, count, self.validators(response)
+    
+    def read_product_count(self, response: requests.Response) -> Tuple[bool, Optional[int]]:
+        """
+        Read the product count from a streamed category page response.
+        
+        Args:
+            response: Response requested with stream=True (closed here)
+            
+        Returns:
+            (fetched, count) - fetched is False if the download failed,
+            count is None if the page is not a product listing
+        """
+        buffer = bytearray()
+        has_wrapper = False
+        count = None
+        finished = False
+        try:
+            for chunk in response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                # Rescan a little of the previous chunk in case a marker straddles the boundary
+                scan_from = max(0, len(buffer) - 256)
+                buffer.extend(chunk)
+                
+                marker_from = scan_from
+                if not has_wrapper:
+                    has_wrapper = self.TITLE_WRAPPER_DIV.search(buffer, scan_from) is not None
+                    # The script may have arrived before the wrapper
+                    marker_from = 0
+                if has_wrapper:
+                    match = self.COUNT_MARKER.search(buffer, marker_from)
+                    if match:
+                        count = int(match.group(1))
+                        finished = True
+                        break
+        except requests.RequestException as e:
+            print(f"Error fetching {response.url}: {e}")
+            return False, None
+        finally:
+            bytes_read = self.wire_bytes_read(response, len(buffer))
+            # Closing an unfinished response drops the connection instead of draining it
+            response.close()
+        
+        content_length = response.headers.get('Content-Length', '')
+        with self._lock:
+            stats = self.stream_stats
+            stats['pages'] += 1
+            stats['bytes_read'] += bytes_read
+            if content_length.isdigit():
+                stats['bytes_total'] += int(content_length)
+            else:
+                # A page read to its end has no bytes left; a stopped one skipped an unknown amount
+                stats['bytes_total'] += bytes_read
+                stats['unknown_length'] += finished
+            if finished:
+                stats['early_exits'] += 1
+        
+        if finished:
+            self._count_path('scan_count')
+            return True, count
+        
+        # No count in the stream: classify the full page
+        return True, self.count_products(bytes(buffer), response.encoding or 'utf-8')
+    
+    @staticmethod
+    def wire_bytes_read(response: requests.Response, default: int) -> int:
+        """
+        Count the bytes of a streamed response pulled over the wire so far.
+        
+        Args:
+            response: Response requested with stream=True (still open)
+            default: Value used when the raw stream cannot tell
+            
+        Returns:
+            Bytes read, comparable with the Content-Length header (both are
+            counted before any Content-Encoding is decoded)
+        """
+        try:
+            return response.raw.tell()
+        except (AttributeError, OSError, ValueError):
+            return default
+    
+    def format_stream_stats(self) -> str:
+        """Summarize what streaming saved against downloading every page in full, in one line."""
+        stats = self.stream_stats
+        skipped = stats['bytes_total'] - stats['bytes_read']
+        share = skipped / stats['bytes_total'] if stats['bytes_total'] else 0
+        line = (f"stream: {stats['pages']} pages, {stats['early_exits']} stopped early, "
+                f"{stats['bytes_read'] / 1024:,.0f} of {stats['bytes_total'] / 1024:,.0f} KB read "
+                f"({skipped / 1024:,.0f} KB skipped, {share:.1%})")
+        if stats['unknown_length']:
+            line += f", {stats['unknown_length']} stopped pages without Content-Length not counted as skipped"
+        return line
+    
+    def count_products(self, content: bytes, encoding: str = 'utf-8') -> Optional[int]:
+        """
+        Classify a category page and read its count, parsing only if needed.
+        
+        Precompiled byte scans settle the common cases: a
+        `<div class="page-title-wrapper">` plus the htmlCount script gives the
+        count, and a page with no element carrying that class is not a
+        listing. Anything else (a wrapper without the script, or the class on
+        another element) goes to extract_product_count(). count_paths
+        records which path each page took.
+        
+        Args:
+            content: Raw page bytes
+            encoding: Encoding used to decode the page for the DOM fallback
+            
+        Returns:
+            Number of products or None if not a product page
+        """
+        if self.TITLE_WRAPPER_DIV.search(content):
+            match = self.COUNT_MARKER.search(content)
+            if match:
+                self._count_path('scan_count')
+                return int(match.group(1))
+        elif not self.TITLE_WRAPPER_CLASS.search(content):
+            self._count_path('scan_not_listing')
+            return None
+        
+        self._count_path('dom')
+        return self.extract_product_count(content.decode(encoding, errors='replace'))
+    
+    def _count_path(self, path: str):
+        with self._lock:
+            self.count_paths[path] += 1
+    
     def extract_product_count(self, html: str) -> Optional[int]:
         """
         Extract product count from a product listing page.
@@ -64,7 +334,7 @@ class DismacCategoryScraper:
         Returns:
             Number of products or None if not a product page
         """
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = parse_html(html, self.parser)
         
         # Check if this is a product listing page (has page-title-wrapper)
         page_title = soup.find('div', class_='page-title-wrapper')
@@ -99,7 +369,7 @@ class DismacCategoryScraper:
         Returns:
             List of dictionaries with category information
         """
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = parse_html(html, self.parser)
         categories = []
         
         # Find all category sections
@@ -171,34 +441,100 @@ class DismacCategoryScraper:
         Returns:
             Dictionary with category data and product count
         """
-        url = category['url']
-        
         # Skip if already visited
-        if url in self.visited_urls:
-            print(f"  Already visited: {url}")
+        if not self.claim_url(category['url']):
+            print(f"  Already visited: {category['url']}")
             return None
         
-        self.visited_urls.add(url)
+        return self.count_category(category)
+    
+    def claim_url(self, url: str) -> bool:
+        """
+        Mark a URL as visited unless another category already claimed it.
         
-        # Fetch the page
-        html = self.fetch_page(url)
-        if not html:
-            return None
+        Args:
+            url: Category URL
+            
+        Returns:
+            True if the caller should process the URL
+        """
+        with self._lock:
+            if url in self.visited_urls:
+                return False
+            self.visited_urls.add(url)
+            return True
+    
+    def count_category(self, category: Dict[str, str]) -> Optional[Dict]:
+        """
+        Count an already claimed category, from the journal if it holds it.
         
-        # Extract product count
-        product_count = self.extract_product_count(html)
+        Args:
+            category: Dictionary with category information
+            
+        Returns:
+            Dictionary with category data and product count
+        """
+        if self.journal is not None:
+            journaled = self.journal.get(category['url'])
+            if journaled is not None:
+                indent = "  " * category['level']
+                print(f"{indent}↺ {category['name']}: {journaled['product_count']} productos (journal)")
+                return journaled
+        
+        result = self.fetch_category_count(category)
+        if result is not None and self.journal is not None:
+            self.journal.record(category['url'], result)
+        return result
+    
+    def fetch_category_count(self, category: Dict[str, str]) -> Optional[Dict]:
+        """
+        Fetch a category page and read its product count.
         
-        result = {
-            'category_name': category['name'],
-            'level': category['level'],
-            'parent': category.get('parent', ''),
-            'url': url,
-            'product_count': product_count if product_count is not None else 0,
-            'scraped_at': datetime.now().isoformat()
-        }
+        Args:
+            category: Dictionary with category information
+            
+        Returns:
+            Dictionary with category data and product count, or None if
+            the page could not be fetched
+        """
+        url = category['url']
+        indent = "  " * category['level']
+        
+        previous = self.previous.get(url) if self.previous is not None else None
+        if previous is not None:
+            outcome, result = self.revalidate_category(category, previous)
+            if result is not None:
+                with self._lock:
+                    if outcome == 'changed':
+                        # The revalidation read the new count: no second fetch
+                        self.incremental_stats['refetched'] += 1
+                    self.incremental_stats[outcome] += 1
+                mark = '✓' if outcome == 'changed' else '='
+                print(f"{indent}{mark} {category['name']}: {result['product_count']} productos ({outcome})")
+                return result
+        
+        if self.stream:
+            fetched, product_count, validators = self.stream_product_count(url)
+            if not fetched:
+                return None
+        else:
+            # Fetch the page
+            fetched = self.fetch_content(url)
+            if not fetched:
+                return None
+            
+            # Extract product count
+            content, encoding, validators = fetched
+            product_count = self.count_products(content, encoding)
+        
+        if self.previous is not None:
+            with self._lock:
+                self.incremental_stats['refetched'] += 1
+                self.incremental_stats['changed' if previous is not None else 'new'] += 1
+        
+        result = self.category_result(category, product_count, validators)
         
         # Log result
-        indent = "  " * category['level']
         if product_count is not None:
             print(f"{indent}✓ {category['name']}: {product_count} productos")
         else:
@@ -206,10 +542,85 @@ class DismacCategoryScraper:
         
         return result
     
-    def scrape(self) -> List[Dict]:
+    def category_result(self, category: Dict[str, str], product_count: Optional[int],
+                        validators: Dict[str, str]) -> Dict:
+        """
+        Build the report row of a counted category.
+        
+        Args:
+            category: Dictionary with category information
+            product_count: Count read from the page (None for non-listings)
+            validators: ETag and Last-Modified of the page
+            
+        Returns:
+            Dictionary with category data and product count
+        """
+        return {
+            'category_name': category['name'],
+            'level': category['level'],
+            'parent': category.get('parent', ''),
+            'url': category['url'],
+            'product_count': product_count if product_count is not None else 0,
+            'scraped_at': datetime.now().isoformat(),
+            'etag': validators.get('etag', ''),
+            'last_modified': validators.get('last_modified', ''),
+        }
+    
+    def revalidate_category(self, category: Dict[str, str], previous: Dict) -> Tuple[str, Optional[Dict]]:
+        """
+        Check whether a category of the previous report still has its count.
+        
+        The page is requested with the validators saved in the report: a
+        304 Not Modified keeps the previous count without a body, and a
+        full response is streamed only until its count is known.
+        
+        Args:
+            category: Dictionary with category information
+            previous: Row of the previous report for the same URL
+            
+        Returns:
+            ('skipped', result) on 304, ('revalidated', result) if the count
+            is unchanged, ('changed', result) with the new count if it
+            changed, or ('changed', None) if the page could not be read and
+            must be refetched
+        """
+        url = category['url']
+        headers = {}
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+        
+        try:
+            self.rate_limiter.wait(url)  # Be respectful to the server
+            print(f"Revalidating: {url}")
+            response = self.session.get(url, headers=headers, stream=True)
+            if response.status_code == 304:
+                response.close()
+                validators = {'etag': response.headers.get('ETag') or previous.get('etag', ''),
+                              'last_modified': previous.get('last_modified', '')}
+                return 'skipped', self.category_result(category, previous['product_count'], validators)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Error revalidating {url}: {e}")
+            return 'changed', None
+        
+        fetched, product_count = self.read_product_count(response)
+        if not fetched:
+            return 'changed', None
+        result = self.category_result(category, product_count, self.validators(response))
+        if (product_count or 0) == previous['product_count']:
+            return 'revalidated', result
+        return 'changed', result
+    
+    def scrape(self, sink: Optional[ProductSink] = None) -> List[Dict]:
         """
         Main scraping method.
         
+        Args:
+            sink: Sink every result row is written to as soon as its category
+                is counted (e.g. a CategoryCountSink of a snapshot store)
+        
         Returns:
             List of dictionaries with category and product count data
         """
@@ -231,21 +642,90 @@ class DismacCategoryScraper:
         print("Extracting category structure...")
         categories = self.extract_category_links(html)
         print(f"Found {len(categories)} categories to process")
+        if self.previous is not None:
+            # Categories gone from the categories page are reported, not fetched
+            current = {category['url'] for category in categories}
+            self.removed_categories = [row for url, row in self.previous.items() if url not in current]
+            self.incremental_stats['removed'] = len(self.removed_categories)
+            print(f"Incremental run against {len(self.previous)} previous categories "
+                  f"({len(self.removed_categories)} removed)")
         print()
         
         # Process each category
         print("Processing categories:")
         print("-"*80)
         
+        if self.workers > 1:
+            self._process_parallel(categories, sink)
+            return self.results
+        
         for i, category in enumerate(categories, 1):
             print(f"[{i}/{len(categories)}] Processing: {category['name']}")
             result = self.process_category(category)
             if result:
                 self.results.append(result)
+                if sink is not None:
+                    sink.write([result])
             print()
         
         return self.results
     
+    def _process_parallel(self, categories: List[Dict[str, str]],
+                          sink: Optional[ProductSink] = None):
+        """
+        Process categories with a pool of worker threads.
+        
+        URLs are claimed in category order before any work is submitted, so
+        the same duplicate is skipped as in a serial run, and results are
+        appended to self.results in category order regardless of which fetch
+        finishes first. Each result is kept as soon as the categories before
+        it are done, so an interrupted run still saves what was counted.
+        
+        Args:
+            categories: Categories from extract_category_links
+            sink: Sink the results are written to, in category order, as
+                they come in
+        """
+        total = len(categories)
+        self._completed = 0
+        
+        def work(category: Dict[str, str]) -> Optional[Dict]:
+            result = self.count_category(category)
+            with self._lock:
+                self._completed += 1
+                print(f"[{self._completed}/{total}] Done: {category['name']}")
+            return result
+        
+        def keep(result: Optional[Dict]):
+            if result:
+                self.results.append(result)
+                if sink is not None:
+                    sink.write([result])
+        
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        futures = []
+        kept = 0
+        try:
+            for category in categories:
+                if self.claim_url(category['url']):
+                    futures.append(executor.submit(work, category))
+                else:
+                    with self._lock:
+                        self._completed += 1
+                        print(f"[{self._completed}/{total}] Already visited: {category['url']}")
+            
+            for future in futures:
+                keep(future.result())
+                kept += 1
+        except KeyboardInterrupt:
+            # Drop the categories not started yet and keep those already counted
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in futures[kept:]:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    keep(future.result())
+            raise
+        executor.shutdown()
+    
     def save_to_csv(self, filename: str = "dismac_categories_report.csv"):
         """
         Save results to CSV file.
@@ -260,16 +740,62 @@ class DismacCategoryScraper:
         print("="*80)
         print(f"Saving results to {filename}...")
         
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['category_name', 'level', 'parent', 'url', 'product_count', 'scraped_at']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            for result in self.results:
-                writer.writerow(result)
+        # Written to a .part file and moved into place, so the next
+        # incremental run never reads a half-written report
+        with CSVSink(filename, self.REPORT_FIELDS) as sink:
+            sink.write(self.results)
         
         print(f"✓ Saved {len(self.results)} categories to {filename}")
     
+    def save_to_parquet(self, root: str = "snapshots"):
+        """
+        Save results as a typed Parquet snapshot (needs pyarrow).
+        
+        Args:
+            root: Snapshot directory, partitioned by marketplace and date
+        """
+        if not self.results:
+            print("No results to save")
+            return
+        
+        try:
+            with ParquetSink(root, 'dismac', self.PARQUET_COLUMNS, kind='categories') as sink:
+                sink.write(self.results)
+        except RuntimeError as e:
+            print(f"✗ Parquet snapshot not saved: {e}")
+            return
+        
+        print(f"✓ Saved {len(self.results)} categories to {sink.path}")
+    
+    @staticmethod
+    def load_report(filename: str) -> Optional[Dict[str, Dict]]:
+        """
+        Load a previous report as the baseline of an incremental run.
+        
+        Args:
+            filename: CSV written by save_to_csv()
+            
+        Returns:
+            Report rows by URL with integer counts, or None if the file
+            does not exist
+        """
+        if not os.path.exists(filename):
+            return None
+        
+        with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+            rows = {}
+            for row in csv.DictReader(csvfile):
+                row['product_count'] = int(row['product_count'] or 0)
+                rows[row['url']] = row
+        return rows
+    
+    def format_incremental_stats(self) -> str:
+        """Summarize what an incremental run did with each category in one line."""
+        stats = self.incremental_stats
+        return (f"incremental: {stats['skipped']} skipped (304), {stats['revalidated']} revalidated, "
+                f"{stats['refetched']} refetched ({stats['new']} new, {stats['changed']} changed), "
+                f"{stats['removed']} removed")
+    
     def print_summary(self):
         """Print summary statistics."""
         if not self.results:
@@ -305,27 +831,101 @@ class DismacCategoryScraper:
 
 def main():
     """Main entry point."""
-    scraper = DismacCategoryScraper()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Count Dismac products per category")
+    parser.add_argument('--cache-dir', help="Directory for the on-disk HTTP cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="Seconds a cached page is reused without revalidation (default: 0)")
+    parser.add_argument('--base-url', help=f"Site to crawl (default: {DismacCategoryScraper.BASE_URL})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of categories processed in parallel (default: 1); "
+                             "the default rate limit grows with it, see --rate")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stop reading each category page once its count is found")
+    parser.add_argument('--parser', choices=PARSERS, default=None,
+                        help="HTML parser backend (default: html.parser)")
+    parser.add_argument('--db', help="SQLite snapshot store the run is also recorded in")
+    parser.add_argument('--parquet', metavar='DIR',
+                        help="Also write a typed Parquet snapshot under DIR (needs pyarrow)")
+    parser.add_argument('--incremental', nargs='?', const='dismac_categories_report.csv', metavar='REPORT',
+                        help="Only recount categories whose page changed since REPORT "
+                             "(default: dismac_categories_report.csv)")
+    add_client_arguments(parser)
+    add_rate_limit_arguments(parser, delay=1.0)
+    add_journal_arguments(parser, 'dismac_categories_report.journal')
+    args = parser.parse_args()
+    rate_limiter = rate_limiter_from_args(args, delay=1.0, workers=args.workers)
+    print(format_rate_limit(rate_limiter))
+    
+    # Every counted category is journaled; --resume only counts the others
+    journal = open_journal(args, 'dismac')
+    if args.resume:
+        print(f"Resuming from {args.journal}: {len(journal)} categories journaled")
+    
+    previous = None
+    if args.incremental:
+        previous = DismacCategoryScraper.load_report(args.incremental)
+        if previous is None:
+            print(f"{args.incremental} not found, running a full scrape")
+    
+    scraper = DismacCategoryScraper(cache_dir=args.cache_dir, cache_ttl=args.cache_ttl,
+                                    base_url=args.base_url, workers=args.workers, rate_limiter=rate_limiter,
+                                    stream=args.stream, session_options=client_options(args),
+                                    parser=args.parser, previous=previous, journal=journal)
+    
+    # Category counts are written to the snapshot store as they come in
+    store = SnapshotStore(args.db) if args.db else None
+    sink = CategoryCountSink(store, store.start_run('dismac')) if store else None
+    status = 'failed'
     
     try:
         # Run the scraper
-        results = scraper.scrape()
+        results = scraper.scrape(sink)
+        if results:
+            status = 'complete'
         
         # Save results
         scraper.save_to_csv()
+        if args.parquet:
+            scraper.save_to_parquet(args.parquet)
+        if status == 'complete':
+            # The outputs are complete: the next run starts over
+            journal.complete()
         
         # Print summary
         scraper.print_summary()
         
+        if scraper.http_cache:
+            print(format_cache_stats(scraper.http_cache.stats))
+        print(format_journal_stats(journal))
+        if scraper.previous is not None:
+            print(scraper.format_incremental_stats())
+        paths = scraper.count_paths
+        print(f"count paths: {paths['scan_count']} scanned counts, "
+              f"{paths['scan_not_listing']} scanned non-listings, {paths['dom']} DOM parses")
+        if scraper.stream:
+            print(scraper.format_stream_stats())
+        
     except KeyboardInterrupt:
         print("\n\nScraping interrupted by user")
+        status = 'interrupted'
         if scraper.results:
             print("Saving partial results...")
             scraper.save_to_csv("dismac_categories_report_partial.csv")
+        print(f"Run again with --resume to continue from {args.journal}")
     except Exception as e:
         print(f"\nUnexpected error: {e}")
         import traceback
         traceback.print_exc()
+        print(f"Run again with --resume to continue from {args.journal}")
+    finally:
+        journal.close()
+        if store:
+            sink.close()
+            store.finish_run(sink.run_id, status)
+            store.close()
+            print(f"Run {sink.run_id} recorded in {args.db} ({status}, {sink.rows_written} categories)")
 
 
 if __name__ == "__main__":
@@ -3,9 +3,18 @@
 Test script for Dismac scraper
 """
 
+import contextlib
+import io
 import os
 import sys
+import tempfile
+import requests
 from scraper_dismac import DismacCategoryScraper
+from common.checkpoint import Journal
+from common.html_parser import available_parsers
+from common.marketplace_server import MarketplaceServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 
 def test_scraper():
@@ -67,6 +76,228 @@ def test_scraper():
     return True
 
 
+def test_parser_backends():
+    """Test that every parser backend extracts the same data from the captures."""
+    print("\nTesting parser backends on the committed captures...")
+    
+    with open(os.path.join(HERE, 'dismac-categorias.html'), 'r', encoding='utf-8') as f:
+        categories_html = f.read()
+    with open(os.path.join(HERE, 'dismac-dormitorio.html'), 'r', encoding='utf-8') as f:
+        listing_html = f.read()
+    
+    extracted = {}
+    for backend in available_parsers():
+        scraper = DismacCategoryScraper(parser=backend)
+        extracted[backend] = (scraper.extract_category_links(categories_html),
+                              scraper.extract_product_count(listing_html))
+        print(f"  {backend:<12} {len(extracted[backend][0])} categories, {extracted[backend][1]} productos")
+    
+    reference = extracted['html.parser']
+    if all(result == reference for result in extracted.values()):
+        print(f"✓ {len(extracted)} backends extracted identical records")
+        return True
+    print("✗ Backends disagree")
+    return False
+
+
+def test_count_fast_path():
+    """Test that the byte scan agrees with the DOM parse and records its path."""
+    print("\nTesting the byte-scan count fast path...")
+    
+    with open(os.path.join(HERE, 'dismac-dormitorio.html'), 'rb') as f:
+        listing = f.read()
+    with open(os.path.join(HERE, 'dismac-categorias.html'), 'rb') as f:
+        categories = f.read()
+    
+    pages = {
+        'listing': listing,
+        'not a listing': listing.replace(b'<div class="page-title-wrapper">', b'<div class="page-title">'),
+        'wrapper without script': listing.replace(b'let htmlCount', b'let otherCount'),
+        'categories': categories,
+    }
+    scraper = DismacCategoryScraper()
+    for label, page in pages.items():
+        scanned = scraper.count_products(page)
+        parsed = scraper.extract_product_count(page.decode('utf-8'))
+        if scanned != parsed:
+            print(f"✗ {label}: scan gave {scanned}, DOM parse gave {parsed}")
+            return False
+        print(f"  {label:<24} {scanned}")
+    
+    print(f"✓ Scan and DOM parse agree; paths taken: {scraper.count_paths}")
+    return scraper.count_paths['scan_count'] == 1 and scraper.count_paths['scan_not_listing'] == 1
+
+
+def test_stream_count_agrees():
+    """Test that the streamed count classifies every page like the non-stream path."""
+    print("\nTesting the streamed count against the non-stream path...")
+    
+    with open(os.path.join(HERE, 'dismac-dormitorio.html'), 'rb') as f:
+        listing = f.read()
+    with open(os.path.join(HERE, 'dismac-categorias.html'), 'rb') as f:
+        categories = f.read()
+    
+    pages = {
+        'listing': listing,
+        'categories': categories,
+        'not a listing': listing.replace(b'<div class="page-title-wrapper">', b'<div class="page-title">'),
+        'wrapper without script': listing.replace(b'let htmlCount', b'let otherCount'),
+    }
+    ok = True
+    for label, page in pages.items():
+        response = requests.Response()
+        response.status_code = 200
+        response.url = f"file://{label}"
+        response.encoding = 'utf-8'
+        response.headers['Content-Length'] = str(len(page))
+        response.raw = io.BytesIO(page)
+        
+        scraper = DismacCategoryScraper()
+        fetched, streamed = scraper.read_product_count(response)
+        expected = DismacCategoryScraper().count_products(page)
+        bytes_read = scraper.stream_stats['bytes_read']
+        agrees = fetched and streamed == expected
+        # Only a counted listing may stop before the end of the page
+        stopped_early = bytes_read < len(page)
+        agrees = agrees and stopped_early == (label == 'listing')
+        # Savings are measured against the whole page
+        agrees = agrees and scraper.stream_stats['bytes_total'] == len(page)
+        ok = ok and agrees
+        print(f"  {'✓' if agrees else '✗'} {label:<24} stream {streamed}, non-stream {expected}, "
+              f"{bytes_read:,} of {len(page):,} bytes read")
+        if label == 'listing':
+            print(f"    {scraper.format_stream_stats()}")
+    return ok
+
+
+def test_interrupted_parallel_run():
+    """Test that a parallel run interrupted midway keeps the categories already counted."""
+    print("\nTesting an interrupted parallel run...")
+    
+    class InterruptedScraper(DismacCategoryScraper):
+        def count_category(self, category):
+            if category['name'] == 'c5':
+                raise KeyboardInterrupt
+            return {'url': category['url'], 'product_count': 1}
+    
+    categories = [{'name': f"c{i}", 'url': f"https://dismac.com.bo/c{i}.html", 'level': 0}
+                  for i in range(20)]
+    scraper = InterruptedScraper(delay=0, workers=4)
+    interrupted = False
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper._process_parallel(categories)
+    except KeyboardInterrupt:
+        interrupted = True
+    
+    kept = [row['url'] for row in scraper.results]
+    in_order = kept == sorted(kept, key=lambda url: int(url.rsplit('/c', 1)[1].split('.')[0]))
+    ok = interrupted and in_order and kept[:5] == [c['url'] for c in categories[:5]]
+    print(f"  {'✓' if ok else '✗'} {len(kept)} counted categories kept for the partial save, in category order")
+    return ok
+
+
+def test_incremental_run():
+    """Test that an incremental run matches a full run with one request per category."""
+    print("\nTesting incremental runs against the local stand-in server...")
+    
+    def run(base: str, previous=None) -> DismacCategoryScraper:
+        scraper = DismacCategoryScraper(delay=0, base_url=base, workers=4, previous=previous)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scraper.scrape()
+        return scraper
+    
+    server = MarketplaceServer().start()
+    try:
+        base = f"{server.base_url}/dismac"
+        with tempfile.TemporaryDirectory() as directory:
+            report = os.path.join(directory, 'report.csv')
+            baseline = run(base)
+            with contextlib.redirect_stdout(io.StringIO()):
+                baseline.save_to_csv(report)
+            previous = DismacCategoryScraper.load_report(report)
+        
+        # One category disappears from the report, one that is no longer listed is added
+        dropped = baseline.results[0]['url']
+        del previous[dropped]
+        previous[f"{base}/gone.html"] = dict(baseline.results[1], url=f"{base}/gone.html")
+        
+        server.revision = 1
+        full = run(base)
+        requests_before = server.stats['requests']
+        incremental = run(base, previous)
+        requests_made = server.stats['requests'] - requests_before
+    finally:
+        server.stop()
+    
+    counts = {row['url']: row['product_count'] for row in full.results}
+    changed = sum(1 for row in baseline.results
+                  if row['url'] != dropped and counts[row['url']] != row['product_count'])
+    stats = incremental.incremental_stats
+    print(f"  {incremental.format_incremental_stats()} ({requests_made} requests)")
+    checks = [
+        ("same counts as a full run", {row['url']: row['product_count'] for row in incremental.results} == counts),
+        ("changed categories counted", changed > 0 and stats['changed'] == changed == stats['refetched'] - 1),
+        ("new and removed categories", stats['new'] == 1 and stats['removed'] == 1),
+        ("unchanged categories answered 304", stats['skipped'] == len(counts) - changed - 1),
+        ("one request per category", requests_made == 1 + len(counts)),
+    ]
+    for name, ok in checks:
+        print(f"  {'✓' if ok else '✗'} {name}")
+    return all(ok for _, ok in checks)
+
+
+def test_resume_from_journal():
+    """Test that a run resumed from its journal only counts the remaining categories."""
+    print("\nTesting resume from the checkpoint journal against the local stand-in server...")
+    
+    class Crash(Exception):
+        pass
+    
+    class CrashingSink:
+        """Fails on the 50th category, like a run killed mid-crawl"""
+        written = 0
+        
+        def write(self, rows):
+            self.written += len(rows)
+            if self.written == 50:
+                raise Crash()
+    
+    server = MarketplaceServer().start()
+    base = f"{server.base_url}/dismac"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            complete = DismacCategoryScraper(delay=0, base_url=base)
+            complete.scrape()
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'dismac.journal')
+                with Journal(path, 'dismac') as journal:
+                    try:
+                        DismacCategoryScraper(delay=0, base_url=base, journal=journal).scrape(CrashingSink())
+                    except Crash:
+                        pass
+                requests_before = server.stats['requests']
+                with Journal(path, 'dismac', resume=True) as journal:
+                    resumed = DismacCategoryScraper(delay=0, base_url=base, journal=journal)
+                    resumed.scrape()
+                requests_made = server.stats['requests'] - requests_before
+    finally:
+        server.stop()
+    
+    counts = lambda scraper: [(row['url'], row['product_count']) for row in scraper.results]
+    same = counts(resumed) == counts(complete)
+    journaled = journal.stats['loaded']
+    # The categories page, then only the categories missing from the journal
+    ok = same and journaled == 50 and requests_made == 1 + len(complete.results) - journaled
+    print(f"  {'✓' if ok else '✗'} {journaled} categories replayed, {requests_made} requests, "
+          f"same results as an uninterrupted run: {same}")
+    return ok
+
+
 if __name__ == "__main__":
+    if not (test_parser_backends() and test_count_fast_path() and test_stream_count_agrees()
+            and test_interrupted_parallel_run() and test_incremental_run()
+            and test_resume_from_journal()):
+        sys.exit(1)
     success = test_scraper()
     sys.exit(0 if success else 1)
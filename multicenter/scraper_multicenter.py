@@ -8,21 +8,118 @@ the product count for each main category.
 The scraper focuses only on main categories (Navidad through Bebés), 
 ignoring promotional sections like Black Friday, Solo X hoy, Ofertas del Mes, and Combos.
 
+Category pages are server-rendered by VTEX and embed the search state as JSON
+(`__STATE__ = {...}`), so the count is read from a plain HTTP fetch. Selenium
+is only started as a fallback when that state is missing.
+
 Usage:
     python scraper_multicenter.py
+    python scraper_multicenter.py --browser   # Always use Selenium
 """
 
+import os
 import re
 import csv
-import time
-from typing import List, Dict, Optional
+import json
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Dict, Optional
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+import requests
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import (InvalidSessionIdException, NoSuchElementException,
+                                            NoSuchWindowException, TimeoutException,
+                                            WebDriverException)
+except ImportError:  # Selenium is only needed for the browser fallback
+    webdriver = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.checkpoint import Journal, add_journal_arguments, format_journal_stats, open_journal
+from common.columnar import Column, ParquetSink
+from common.http_client import add_client_arguments, client_options, create_session
+from common.rate_limiter import (HostRateLimiter, add_rate_limit_arguments, format_rate_limit,
+                                  rate_limiter_from_args)
+from common.sinks import ProductSink
+from common.snapshot_store import CategoryCountSink, SnapshotStore
+
+
+class DriverPool:
+    """Pool of WebDriver instances that are created on demand and reused."""
+    
+    def __init__(self, size: int, factory: Callable):
+        """
+        Initialize the pool.
+        
+        Args:
+            size: Maximum number of drivers alive at once
+            factory: Callable returning a new WebDriver
+        """
+        self.size = size
+        self.factory = factory
+        self._idle: queue.Queue = queue.Queue()
+        self._all: List = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+    
+    @contextmanager
+    def driver(self) -> Iterator:
+        """
+        Borrow a driver, creating one if none is idle.
+        
+        Yields:
+            WebDriver instance, returned to the pool afterwards unless the
+            block raised (a driver that failed is quit, not reused)
+            
+        Raises:
+            Whatever the factory raises when a new driver cannot be started
+        """
+        self._slots.acquire()
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self.factory()
+                with self._lock:
+                    self._all.append(driver)
+            try:
+                yield driver
+            except Exception:
+                self.discard(driver)
+                raise
+            self._idle.put(driver)
+        finally:
+            self._slots.release()
+    
+    def discard(self, driver):
+        """Quit a broken driver and forget it, so the next borrower starts a new one."""
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    def close(self):
+        """Quit every driver the pool created."""
+        with self._lock:
+            drivers, self._all = self._all, []
+        self._idle = queue.Queue()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
 
 class MulticenterCategoryScraper:
@@ -53,19 +150,76 @@ class MulticenterCategoryScraper:
         "Bebés"
     ]
     
-    def __init__(self, headless: bool = True):
+    STATE_MARKER = '__STATE__ = '
+    
+    # Typed columns of the Parquet snapshot (the CSV report rows, converted)
+    PARQUET_COLUMNS = [
+        Column('category_name'),
+        Column('product_count', 'integer'),
+        Column('url'),
+        Column('scraped_at', 'timestamp'),
+    ]
+    
+    # Element VTEX renders the "N productos" total into
+    COUNT_SELECTOR = "[class*='totalProducts']"
+    
+    # Resources a count lookup never needs, blocked through the DevTools Protocol
+    BLOCKED_URLS = [
+        '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+        '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf',
+        '*.mp4', '*.webm', '*.mp3',
+    ]
+    
+    def __init__(self, headless: bool = True, delay: float = 2.0,
+                 rate_limiter: Optional[HostRateLimiter] = None,
+                 use_browser: bool = False, base_url: Optional[str] = None,
+                 workers: int = 1, wait_timeout: float = 15.0,
+                 session_options: Optional[Dict] = None, journal: Optional[Journal] = None):
         """
-        Initialize scraper with Selenium WebDriver.
+        Initialize scraper.
         
         Args:
             headless: Run browser in headless mode
+            delay: Minimum average interval between page loads in seconds
+            rate_limiter: Shared per-host rate limiter (defaults to one
+                allowing a page load every `delay` seconds per worker, see
+                HostRateLimiter.for_workers)
+            use_browser: Always count with Selenium instead of plain HTTP
+            base_url: Override for BASE_URL (e.g. a local stand-in server)
+            workers: Categories processed in parallel (and browsers in the pool)
+            wait_timeout: Maximum seconds to wait for the count to render
+            session_options: Keyword arguments for create_session() (pool
+                size, keep-alive, compression, timeouts, HTTP/2)
+            journal: Checkpoint journal every counted category is recorded
+                in; categories it already holds are not counted again
         """
+        if base_url:
+            self.BASE_URL = base_url.rstrip('/')
+        self.journal = journal
         self.headless = headless
+        self.use_browser = use_browser
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter or HostRateLimiter.for_workers(delay, self.workers)
+        self.session = create_session(user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                                      workers=self.workers, **(session_options or {}))
+        self.wait_timeout = wait_timeout
         self.driver = None
+        self.driver_pool = DriverPool(self.workers, self.create_driver)
         self.results: List[Dict] = []
         
     def setup_driver(self):
         """Set up Chrome WebDriver with appropriate options."""
+        self.driver = self.create_driver()
+        
+    def create_driver(self):
+        """
+        Start a Chrome WebDriver that skips images, media, fonts and stylesheets.
+        
+        Returns:
+            WebDriver instance
+        """
+        if webdriver is None:
+            raise RuntimeError("Selenium is not installed; run: pip install selenium")
         chrome_options = Options()
         if self.headless:
             chrome_options.add_argument('--headless')
@@ -74,14 +228,26 @@ class MulticenterCategoryScraper:
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
         
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.implicitly_wait(10)
+        driver = webdriver.Chrome(options=chrome_options)
+        # Explicit waits only; an implicit wait would slow every missing-element lookup
+        driver.implicitly_wait(0)
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URLS})
+        except Exception as e:
+            print(f"  ⚠ Could not block resources through CDP: {e}")
+        return driver
         
     def close_driver(self):
-        """Close the WebDriver."""
+        """Close the WebDriver and every pooled browser."""
         if self.driver:
             self.driver.quit()
+            self.driver = None
+        self.driver_pool.close()
             
     def get_category_links(self) -> List[Dict[str, str]]:
         """
@@ -125,25 +291,161 @@ class MulticenterCategoryScraper:
             
         return categories
         
-    def extract_product_count(self, url: str, category_name: str) -> Optional[int]:
+    def extract_count_from_state(self, html: str) -> Optional[int]:
+        """
+        Read the total product count from the embedded VTEX render state.
+        
+        The server-rendered page carries the Apollo cache as
+        `__STATE__ = {...}`; the category search is stored under a
+        `$ROOT_QUERY.productSearch(...)` key whose `recordsFiltered` is the
+        number of products in the category.
+        
+        Args:
+            html: Category page HTML
+            
+        Returns:
+            Number of products or None if the state is missing
+        """
+        start = html.find(self.STATE_MARKER)
+        if start == -1:
+            return None
+        
+        try:
+            state, _ = json.JSONDecoder().raw_decode(html, start + len(self.STATE_MARKER))
+        except ValueError:
+            return None
+        
+        for key, value in state.items():
+            if key.startswith('$ROOT_QUERY.productSearch(') and isinstance(value, dict):
+                count = value.get('recordsFiltered')
+                if isinstance(count, int):
+                    return count
+        return None
+    
+    def fetch_product_count(self, url: str) -> Optional[int]:
+        """
+        Get a category's product count with a plain HTTP request.
+        
+        Args:
+            url: Category page URL
+            
+        Returns:
+            Number of products or None if it could not be read
+        """
+        print(f"URL: {url}")
+        try:
+            self.rate_limiter.wait(url)
+            response = self.session.get(url)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"  ✗ Error fetching {url}: {e}")
+            return None
+        
+        count = self.extract_count_from_state(response.text)
+        if count is not None:
+            print(f"  ✓ Found {count} products (embedded state)")
+        return count
+    
+    def get_product_count(self, url: str, category_name: str) -> Optional[int]:
+        """
+        Get a category's product count, falling back to Selenium if needed.
+        
+        Args:
+            url: Category page URL
+            category_name: Name of the category
+            
+        Returns:
+            Number of products or None if not found (or the browser failed)
+        """
+        if not self.use_browser:
+            count = self.fetch_product_count(url)
+            if count is not None:
+                return count
+            print("  ⚠ No embedded search state, falling back to the browser")
+        
+        try:
+            with self.driver_pool.driver() as driver:
+                return self.extract_product_count(url, category_name, driver)
+        except Exception as e:
+            # Chrome failed to start or its session was lost (the pool has
+            # already quit that driver): skip this category only
+            print(f"  ✗ Browser error for {category_name}: {e}")
+            return None
+    
+    @staticmethod
+    def driver_lost(error: Exception) -> bool:
+        """
+        Check whether a WebDriver error means the browser session is gone.
+        
+        Args:
+            error: Exception raised while using a driver
+            
+        Returns:
+            True for a crashed, closed or unreachable browser; False for
+            page-level errors (timeouts, missing elements) the driver survives
+        """
+        if webdriver is None:
+            return False
+        # Disconnects surface as a bare WebDriverException; its subclasses are page-level
+        return (type(error) is WebDriverException
+                or isinstance(error, (InvalidSessionIdException, NoSuchWindowException)))
+    
+    def wait_for_count(self, driver) -> bool:
+        """
+        Wait until the product total has been rendered.
+        
+        Args:
+            driver: WebDriver that has loaded a category page
+            
+        Returns:
+            True if the count element appeared before the timeout
+        """
+        def count_rendered(d) -> bool:
+            return any(
+                re.search(r'\d', element.text)
+                for element in d.find_elements(By.CSS_SELECTOR, self.COUNT_SELECTOR)
+            )
+        
+        try:
+            WebDriverWait(driver, self.wait_timeout, poll_frequency=0.2).until(count_rendered)
+            return True
+        except TimeoutException:
+            return False
+    
+    def extract_product_count(self, url: str, category_name: str, driver=None) -> Optional[int]:
         """
         Extract product count from a category page.
         
         Args:
             url: Category page URL
             category_name: Name of the category
+            driver: WebDriver to use (defaults to the one from setup_driver)
             
         Returns:
             Number of products or None if not found
+            
+        Raises:
+            WebDriverException: If the browser session was lost (see
+                driver_lost), so a pooled driver is discarded, not reused
         """
+        driver = driver or self.driver
         print(f"\nProcessing: {category_name}")
         print(f"URL: {url}")
         
         try:
-            self.driver.get(url)
+            self.rate_limiter.wait(url)
+            driver.get(url)
+            
+            # Wait for the product count to render instead of sleeping a fixed time
+            if not self.wait_for_count(driver):
+                print(f"  ⚠ Count not rendered after {self.wait_timeout:.0f}s")
             
-            # Wait for the page to load and product count to appear
-            time.sleep(4)  # Increased delay for slower pages
+            # The embedded state is the most reliable source when present
+            page_source = driver.page_source
+            count = self.extract_count_from_state(page_source)
+            if count is not None:
+                print(f"  ✓ Found {count} products (embedded state)")
+                return count
             
             # Try multiple patterns to find product count
             patterns = [
@@ -154,8 +456,6 @@ class MulticenterCategoryScraper:
                 r'(\d{1,5})\s+items',
             ]
             
-            page_source = self.driver.page_source
-            
             for pattern in patterns:
                 match = re.search(pattern, page_source)
                 if match:
@@ -177,7 +477,7 @@ class MulticenterCategoryScraper:
                 
                 for selector in selectors:
                     try:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                        elements = driver.find_elements(By.CSS_SELECTOR, selector)
                         for element in elements:
                             text = element.text.strip()
                             if text:
@@ -193,66 +493,99 @@ class MulticenterCategoryScraper:
                         continue
                         
             except Exception as e:
-                pass
+                if self.driver_lost(e):
+                    raise
             
             # Last resort: count actual product items on the page
             # This gives us at least some indication even if total is not shown
             try:
-                product_items = self.driver.find_elements(By.CSS_SELECTOR, "[class*='productSummary']")
+                product_items = driver.find_elements(By.CSS_SELECTOR, "[class*='productSummary']")
                 if not product_items:
-                    product_items = self.driver.find_elements(By.CSS_SELECTOR, "[class*='product-item']")
+                    product_items = driver.find_elements(By.CSS_SELECTOR, "[class*='product-item']")
                 
                 if len(product_items) > 0:
                     print(f"  ⚠ Found {len(product_items)} products on page (actual count may be higher)")
                     return len(product_items)
             except Exception as e:
-                pass
+                if self.driver_lost(e):
+                    raise
                 
             print("  ✗ Could not find product count")
             return None
             
         except Exception as e:
+            if self.driver_lost(e):
+                raise
             print(f"  ✗ Error processing {category_name}: {e}")
             return None
             
-    def scrape(self):
-        """Main scraping method."""
+    def process_category(self, category: Dict[str, str]) -> Dict:
+        """
+        Count the products of one category.
+        
+        Counted categories are journaled; a category the journal already
+        holds is not counted again. Failed counts are not journaled, so a
+        resumed run retries them.
+        
+        Args:
+            category: Dictionary with category name and URL
+            
+        Returns:
+            Result row for the report
+        """
+        if self.journal is not None:
+            journaled = self.journal.get(category['url'])
+            if journaled is not None:
+                print(f"  ↺ {category['name']}: {journaled['product_count']:,} products (journal)")
+                return journaled
+        
+        product_count = self.get_product_count(category['url'], category['name'])
+        result = {
+            'category_name': category['name'],
+            'url': category['url'],
+            'product_count': product_count if product_count is not None else 0,
+            'scraped_at': datetime.now().isoformat()
+        }
+        if product_count is not None and self.journal is not None:
+            self.journal.record(category['url'], result)
+        return result
+        
+    def scrape(self, sink: Optional[ProductSink] = None):
+        """
+        Main scraping method.
+        
+        Browsers started for the fallback stay in the pool so later runs
+        reuse them; call close_driver() when done.
+        
+        Args:
+            sink: Sink every result row is written to as soon as its category
+                is counted (e.g. a CategoryCountSink of a snapshot store)
+        """
         print("=" * 60)
         print("Multicenter Category Scraper")
         print("=" * 60)
         
-        try:
-            self.setup_driver()
-            
-            # Get all main category links
-            categories = self.get_category_links()
-            
-            print(f"\nFound {len(categories)} categories to scrape")
-            print("-" * 60)
-            
-            # Process each category
+        # Get all main category links
+        categories = self.get_category_links()
+        
+        print(f"\nFound {len(categories)} categories to scrape")
+        print("-" * 60)
+        
+        if self.workers == 1:
             for i, category in enumerate(categories, 1):
                 print(f"\n[{i}/{len(categories)}] Processing: {category['name']}")
-                
-                product_count = self.extract_product_count(
-                    category['url'],
-                    category['name']
-                )
-                
-                result = {
-                    'category_name': category['name'],
-                    'url': category['url'],
-                    'product_count': product_count if product_count is not None else 0,
-                    'scraped_at': datetime.now().isoformat()
-                }
-                
+                self.results.append(self.process_category(category))
+                if sink is not None:
+                    sink.write(self.results[-1:])
+            return
+        
+        # Process categories in parallel, keeping the report in category order
+        print(f"\nProcessing with {self.workers} workers")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for result in executor.map(self.process_category, categories):
                 self.results.append(result)
-                
-                # Be respectful with delays
-                time.sleep(2)
-                
-        finally:
-            self.close_driver()
+                if sink is not None:
+                    sink.write([result])
             
     def save_to_csv(self, filename: str = 'multicenter_categories_report.csv'):
         """
@@ -277,6 +610,26 @@ class MulticenterCategoryScraper:
                 
         print(f"\n✓ Results saved to: {filepath}")
         
+    def save_to_parquet(self, root: str = 'snapshots'):
+        """
+        Save results as a typed Parquet snapshot (needs pyarrow).
+        
+        Args:
+            root: Snapshot directory, partitioned by marketplace and date
+        """
+        if not self.results:
+            print("\nNo results to save")
+            return
+        
+        try:
+            with ParquetSink(root, 'multicenter', self.PARQUET_COLUMNS, kind='categories') as sink:
+                sink.write(self.results)
+        except RuntimeError as e:
+            print(f"\n✗ Parquet snapshot not saved: {e}")
+            return
+            
+        print(f"\n✓ Snapshot saved to: {sink.path}")
+        
     def print_summary(self):
         """Print a summary of the scraping results."""
         if not self.results:
@@ -305,22 +658,72 @@ class MulticenterCategoryScraper:
 
 def main():
     """Main entry point."""
-    scraper = MulticenterCategoryScraper(headless=True)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Count Multicenter products per main category")
+    parser.add_argument('--browser', action='store_true',
+                        help="Always count with Selenium instead of the embedded page state")
+    parser.add_argument('--base-url', help=f"Site to crawl (default: {MulticenterCategoryScraper.BASE_URL})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Categories processed in parallel, each browser fallback with its own Chrome "
+                             "(default: 1); the default rate limit grows with it, see --rate")
+    parser.add_argument('--db', help="SQLite snapshot store the run is also recorded in")
+    parser.add_argument('--parquet', metavar='DIR',
+                        help="Also write a typed Parquet snapshot under DIR (needs pyarrow)")
+    add_client_arguments(parser)
+    add_rate_limit_arguments(parser, delay=2.0)
+    add_journal_arguments(parser, 'multicenter_categories_report.journal')
+    args = parser.parse_args()
+    rate_limiter = rate_limiter_from_args(args, delay=2.0, workers=args.workers)
+    print(format_rate_limit(rate_limiter))
+    
+    # Every counted category is journaled; --resume only counts the others
+    journal = open_journal(args, 'multicenter')
+    if args.resume:
+        print(f"Resuming from {args.journal}: {len(journal)} categories journaled")
+    
+    scraper = MulticenterCategoryScraper(headless=True, use_browser=args.browser,
+                                         base_url=args.base_url, workers=args.workers,
+                                         rate_limiter=rate_limiter,
+                                         session_options=client_options(args), journal=journal)
+    
+    # Category counts are written to the snapshot store as they come in
+    store = SnapshotStore(args.db) if args.db else None
+    sink = CategoryCountSink(store, store.start_run('multicenter')) if store else None
+    status = 'failed'
     
     try:
-        scraper.scrape()
+        scraper.scrape(sink)
+        if scraper.results:
+            status = 'complete'
         scraper.print_summary()
         scraper.save_to_csv()
+        if args.parquet:
+            scraper.save_to_parquet(args.parquet)
+        print(format_journal_stats(journal))
+        if status == 'complete':
+            # The outputs are complete: the next run starts over
+            journal.complete()
         
     except KeyboardInterrupt:
         print("\n\nScraping interrupted by user")
-        scraper.close_driver()
+        print(f"Run again with --resume to continue from {args.journal}")
+        status = 'interrupted'
         
     except Exception as e:
         print(f"\n\nFatal error: {e}")
         import traceback
         traceback.print_exc()
+        print(f"Run again with --resume to continue from {args.journal}")
+        
+    finally:
+        journal.close()
         scraper.close_driver()
+        if store:
+            sink.close()
+            store.finish_run(sink.run_id, status)
+            store.close()
+            print(f"Run {sink.run_id} recorded in {args.db} ({status}, {sink.rows_written} categories)")
         
 
 if __name__ == '__main__':
@@ -4,7 +4,88 @@ Test script for Multicenter scraper
 Tests basic functionality with a single category
 """
 
-from scraper_multicenter import MulticenterCategoryScraper
+import os
+
+from selenium.common.exceptions import InvalidSessionIdException
+
+from scraper_multicenter import DriverPool, MulticenterCategoryScraper
+
+
+def test_embedded_state():
+    """Test reading the count from the saved Muebles page (no browser)."""
+    print("Testing embedded VTEX state with multicenter-muebles.html...")
+    print("-" * 60)
+    
+    capture = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'multicenter-muebles.html')
+    with open(capture, 'r', encoding='utf-8') as f:
+        html = f.read()
+    
+    count = MulticenterCategoryScraper().extract_count_from_state(html)
+    
+    if count == 498:
+        print(f"\n✓ Read product count from embedded state: {count}")
+        return True
+    print(f"\n✗ Expected 498 products, got {count}")
+    return False
+
+
+def test_browser_failures():
+    """Test that a browser that fails to start or breaks only loses its category."""
+    print("Testing browser failures (no browser started)...")
+    print("-" * 60)
+    
+    class BrokenDriver:
+        quit_calls = 0
+        
+        def get(self, url):
+            raise RuntimeError("tab crashed")
+        
+        def quit(self):
+            BrokenDriver.quit_calls += 1
+    
+    def no_chrome():
+        raise RuntimeError("chromedriver not found")
+    
+    scraper = MulticenterCategoryScraper(delay=0, use_browser=True, workers=2)
+    scraper.driver_pool = DriverPool(2, no_chrome)
+    start_failure = scraper.get_product_count("https://www.multicenter.com/muebles", "Muebles")
+    
+    pool = DriverPool(1, BrokenDriver)
+    try:
+        with pool.driver() as driver:
+            driver.get("https://www.multicenter.com/muebles")
+    except RuntimeError:
+        pass
+    dropped = pool._idle.empty() and not pool._all and BrokenDriver.quit_calls == 1
+    
+    # A Chrome that lost its session, as extract_product_count sees it
+    class CrashedChrome:
+        started = []
+        
+        def __init__(self):
+            self.quit_called = False
+            CrashedChrome.started.append(self)
+        
+        def get(self, url):
+            raise InvalidSessionIdException("invalid session id")
+        
+        def quit(self):
+            self.quit_called = True
+    
+    scraper.driver_pool = DriverPool(1, CrashedChrome)
+    lost_counts = [scraper.get_product_count(f"https://www.multicenter.com/{name}", name)
+                   for name in ("muebles", "hogar")]
+    crashed = CrashedChrome.started
+    not_reused = (lost_counts == [None, None] and len(crashed) == 2
+                  and all(driver.quit_called for driver in crashed)
+                  and scraper.driver_pool._idle.empty())
+    
+    if start_failure is None and dropped and not_reused:
+        print("\n✓ Start-up error skipped the category, broken and crashed drivers quit instead of reused")
+        return True
+    print(f"\n✗ Count {start_failure}, idle drivers {pool._idle.qsize()}, quit {BrokenDriver.quit_calls}, "
+          f"crashed drivers started {len(crashed)} for {lost_counts}")
+    return False
 
 
 def test_single_category():
@@ -37,4 +118,5 @@ def test_single_category():
 
 
 if __name__ == '__main__':
-    test_single_category()
+    if test_embedded_state() and test_browser_failures():
+        test_single_category()
@@ -12,13 +12,31 @@ Usage:
 
 import requests
 from bs4 import BeautifulSoup
-import csv
-import time
+import os
 import re
-from urllib.parse import urljoin, urlparse
+import sys
+import threading
+from urllib.parse import urljoin, urlparse, urlunparse
 import logging
-from typing import List, Dict, Optional, Set
-from collections import defaultdict
+from typing import List, Dict, Optional, Set, Tuple
+import heapq
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.checkpoint import Journal, add_journal_arguments, format_journal_stats, open_journal
+from common.columnar import Column, ParquetSink
+from common.extraction import ExtractionPlan, Field
+from common.http_cache import format_cache_stats, install_cache
+from common.html_parser import PARSERS, parse_html, resolve_parser, walk
+from common.http_client import add_client_arguments, client_options, create_session
+from common.prices import format_amount, to_centavos
+from common.product_index import ProductIndex, format_index_stats
+from common.sinks import CSVSink, ProductSink, TeeSink
+from common.snapshot_store import SnapshotSink, SnapshotStore
+from common.rate_limiter import (HostRateLimiter, add_rate_limit_arguments, format_rate_limit,
+                                  rate_limiter_from_args)
 
 # Configure logging
 logging.basicConfig(
@@ -31,24 +49,103 @@ logger = logging.getLogger(__name__)
 class VenboScraper:
     """Web scraper for Venbo.shop product pages"""
     
-    def __init__(self, base_url: str = "https://venbo.shop", delay: float = 1.5):
+    # Page classification patterns
+    SHOWING_ALL = re.compile(r'Showing all (\d+) results', re.IGNORECASE)
+    RESULT_COUNT = re.compile(r'(\d+)\s+results?')
+    RESULT_RANGE = re.compile(r'(\d+)\s*[–-]\s*(\d+)\s+(?:of|de)\s+(\d+)')
+    PAGE_NUMBER = re.compile(r'/page/(\d+)/?$')
+    DISCOUNT = re.compile(r'\(([^)]+%)\)')
+    PRICE_BS = re.compile(r'([\d,\.]+)\s*Bs')
+    
+    # Columns of the products CSV
+    CSV_FIELDS = [
+        'product_id',
+        'title',
+        'url',
+        'regular_price',
+        'sale_price',
+        'on_sale',
+        'discount',
+        'in_stock',
+        'image_url',
+        'category_url',
+        'category_urls'
+    ]
+    
+    # Typed columns of the Parquet snapshot (the CSV records, converted)
+    PARQUET_COLUMNS = [
+        Column('product_id'),
+        Column('title'),
+        Column('url'),
+        Column('regular_centavos', 'price', field='regular_price'),
+        Column('sale_centavos', 'price', field='sale_price'),
+        Column('on_sale', 'flag'),
+        Column('discount_pct', 'percent', field='discount'),
+        Column('in_stock', 'flag'),
+        Column('image_url'),
+        Column('category_url', 'category'),
+        Column('category_urls', 'categories'),
+    ]
+    
+    # Fields of a product card, read in one walk of the card
+    PRODUCT_FIELDS = [
+        Field('title', ['h5', 'h2.woocommerce-loop-product__title'], default='N/A'),
+        Field('url', ['a.product_item_link[href]', 'a[href]'], attr='href', default='N/A'),
+        # (price text, marked up as a sale with <del>/<ins>)
+        Field('price', ['span.product_price', 'span.price'],
+              get=lambda elem: (elem.get_text(strip=True), bool(elem.find('del') or elem.find('ins')))),
+        Field('classes', attr='class', post=' '.join),
+        Field('image_url', 'img', get=lambda img: img.get('data-src') or img.get('src') or 'N/A', default='N/A'),
+    ]
+    
+    def __init__(self, base_url: str = "https://venbo.shop", delay: float = 1.5,
+                 rate_limiter: Optional[HostRateLimiter] = None,
+                 cache_dir: Optional[str] = None, cache_ttl: float = 0,
+                 max_workers: int = 1, session_options: Optional[Dict] = None,
+                 parser: Optional[str] = None, journal: Optional[Journal] = None):
         """
         Initialize the scraper
         
         Args:
             base_url: The base URL of the store
-            delay: Delay between requests in seconds
+            delay: Minimum average interval between requests in seconds
+            rate_limiter: Shared per-host rate limiter (defaults to one
+                allowing a request every `delay` seconds per worker, see
+                HostRateLimiter.for_workers)
+            cache_dir: Directory for the on-disk HTTP cache (None disables it)
+            cache_ttl: Seconds a cached page is reused without revalidation
+            max_workers: Number of category pages fetched in parallel
+            session_options: Keyword arguments for create_session() (pool
+                size, keep-alive, compression, timeouts, HTTP/2)
+            parser: HTML parser backend (html.parser, lxml or selectolax)
+            journal: Checkpoint journal every processed page is recorded in;
+                pages it already holds are replayed instead of fetched
         """
         self.base_url = base_url
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = rate_limiter or HostRateLimiter.for_workers(delay, self.max_workers)
+        self.parser = resolve_parser(parser)
+        self.session = create_session(user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                                      workers=self.max_workers, **(session_options or {}))
+        self.http_cache = install_cache(self.session, cache_dir, default_ttl=cache_ttl) if cache_dir else None
+        self.product_plan = ExtractionPlan(self.PRODUCT_FIELDS, finalize=self.finalize_product)
+        self.journal = journal
         self.visited_urls: Set[str] = set()
+        # Network fetches per URL (each page should be fetched exactly once)
+        self.fetch_counts: Counter = Counter()
+        self._fetch_lock = threading.Lock()
         self.categories_found: Dict[str, Dict] = {}
-        self.products: List[Dict] = []
-        
+        # Nested wrappers of one card and listings sharing products yield the
+        # same product several times; the index keeps one record per product
+        self.product_index = ProductIndex('venbo', category_field='category_url',
+                                          memberships_field='category_urls')
+        
+    @property
+    def products(self) -> List[Dict]:
+        """Unique products scraped so far, in crawl order (not those already written to a sink)"""
+        return self.product_index.records
+    
     def get_page(self, url: str) -> Optional[BeautifulSoup]:
         """
         Fetch and parse a page
@@ -57,73 +154,166 @@ class VenboScraper:
             url: URL to fetch
             
         Returns:
-            BeautifulSoup object or None if error
+            BeautifulSoup object or None if error (or already visited)
         """
-        if url in self.visited_urls:
-            logger.debug(f"Already visited: {url}")
-            return None
+        # Check and claim in one step: workers may be handed the same URL
+        with self._fetch_lock:
+            if url in self.visited_urls:
+                logger.debug(f"Already visited: {url}")
+                return None
+            self.visited_urls.add(url)
+            self.fetch_counts[url] += 1
             
         try:
+            self.rate_limiter.wait(url)
             logger.info(f"Fetching: {url}")
-            time.sleep(self.delay)
-            response = self.session.get(url, timeout=30)
+            response = self.session.get(url)
             response.raise_for_status()
-            self.visited_urls.add(url)
-            return BeautifulSoup(response.content, 'html.parser')
+            return parse_html(response.content, self.parser)
         except requests.RequestException as e:
             logger.error(f"Error fetching {url}: {e}")
+            with self._fetch_lock:
+                # A failed page may be fetched again
+                self.visited_urls.discard(url)
             return None
     
-    def is_product_listing_page(self, soup: BeautifulSoup) -> bool:
+    def canonical_url(self, url: str) -> str:
         """
-        Check if the page is a product listing page
+        Get the canonical form of a category or listing page URL
         
         Args:
-            soup: BeautifulSoup object of the page
+            url: Absolute URL
             
         Returns:
-            True if this is a product listing page (contains "Showing all X results")
+            URL without query, fragment, trailing slash or a /page/1 suffix,
+            so every page has exactly one spelling
         """
-        # Check for "Showing all X results" text
-        page_text = soup.get_text()
-        if re.search(r'Showing all \d+ results', page_text, re.IGNORECASE):
-            return True
+        parts = urlparse(url)
+        path = parts.path.rstrip('/')
+        page_match = self.PAGE_NUMBER.search(path)
+        if page_match and page_match.group(1) == '1':
+            path = path[:page_match.start()]
+        return urlunparse((parts.scheme, parts.netloc.lower(), path, '', '', ''))
+    
+    def page_urls(self, category_url: str, total_pages: int) -> List[str]:
+        """
+        Build the URLs of pages 2..total_pages of a listing
         
-        # Also check for woocommerce result count element
-        result_count = soup.find('p', class_='woocommerce-result-count')
-        if result_count:
-            return True
+        Args:
+            category_url: Canonical URL of the listing's first page
+            total_pages: Number of pages in the listing
             
-        return False
+        Returns:
+            Canonical page URLs
+        """
+        return [f"{category_url}/page/{page_num}" for page_num in range(2, total_pages + 1)]
     
-    def extract_category_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+    def summarize_page(self, soup: BeautifulSoup, base_url: str) -> Dict:
         """
-        Extract all category links from a page
+        Classify a page and collect its links in a single traversal
         
         Args:
             soup: BeautifulSoup object of the page
             base_url: Base URL for resolving relative links
             
         Returns:
-            List of category URLs
+            Dictionary with:
+                is_listing: True for product listing pages (a woocommerce
+                    result count element or "Showing all X results" text)
+                product_count: Number of results reported on the page (0 if none)
+                total_pages: Pages in the listing, from the "Showing 1–24 of
+                    53 results" range and the pagination links (1 if none)
+                pagination_links: Other pages of this listing
+                category_links: Category links, in page order (whether
+                    they were visited is decided by crawl(), not here, so
+                    the result only depends on the page)
         """
+        result_count = None
+        strings = []
+        pagination_links = []
         category_links = []
         
-        # Find all links that match the category URL pattern
-        for link in soup.find_all('a', href=True):
-            href = link['href']
+        for node in walk(soup):
+            if isinstance(node, str):
+                strings.append(node)
+                continue
             
-            # Check if it's a category link (/cat-producto/)
-            if '/cat-producto/' in href:
-                full_url = urljoin(base_url, href)
+            name = node.name
+            if name == 'p' and result_count is None and 'woocommerce-result-count' in node.get('class', []):
+                result_count = node
+            elif name == 'a':
+                href = node.get('href')
+                # Check if it's a category link (/cat-producto/)
+                if href is None or '/cat-producto/' not in href:
+                    continue
                 
                 # Normalize URL (remove trailing slash, fragments, etc.)
-                full_url = full_url.rstrip('/')
-                
-                if full_url not in self.visited_urls:
+                full_url = self.canonical_url(urljoin(base_url, href))
+                if 'page-numbers' in node.get('class', []) or self.PAGE_NUMBER.search(href):
+                    pagination_links.append(full_url)
+                else:
                     category_links.append(full_url)
         
-        return list(set(category_links))  # Remove duplicates
+        product_count = 0
+        total_pages = 1
+        if result_count:
+            result_text = result_count.get_text()
+            count_match = self.RESULT_COUNT.search(result_text)
+            if count_match:
+                product_count = int(count_match.group(1))
+            # "Showing 1–24 of 53 results": 24 per page
+            range_match = self.RESULT_RANGE.search(result_text)
+            if range_match:
+                first, last, total = (int(group) for group in range_match.groups())
+                per_page = last - first + 1
+                if per_page > 0:
+                    total_pages = -(-total // per_page)
+            is_listing = True
+        else:
+            # Try the "Showing all X results" text
+            count_match = self.SHOWING_ALL.search(''.join(strings))
+            if count_match:
+                product_count = int(count_match.group(1))
+            is_listing = count_match is not None
+        
+        # The pagination links cover listings without a result range
+        for link in pagination_links:
+            page_match = self.PAGE_NUMBER.search(link)
+            if page_match:
+                total_pages = max(total_pages, int(page_match.group(1)))
+        
+        return {
+            'is_listing': is_listing,
+            'product_count': product_count,
+            'total_pages': total_pages,
+            'pagination_links': list(dict.fromkeys(pagination_links)),  # Remove duplicates, keep page order
+            'category_links': list(dict.fromkeys(category_links)),
+        }
+    
+    def is_product_listing_page(self, soup: BeautifulSoup) -> bool:
+        """
+        Check if the page is a product listing page
+        
+        Args:
+            soup: BeautifulSoup object of the page
+            
+        Returns:
+            True if this is a product listing page (contains "Showing all X results")
+        """
+        return self.summarize_page(soup, self.base_url)['is_listing']
+    
+    def extract_category_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+        """
+        Extract all category links from a page
+        
+        Args:
+            soup: BeautifulSoup object of the page
+            base_url: Base URL for resolving relative links
+            
+        Returns:
+            List of category URLs (pagination links excluded)
+        """
+        return self.summarize_page(soup, base_url)['category_links']
     
     def extract_price(self, price_text: str) -> Dict[str, Optional[str]]:
         """
@@ -133,7 +323,7 @@ class VenboScraper:
             price_text: Text containing price
             
         Returns:
-            Dictionary with regular_price and sale_price
+            Dictionary with regular_price and sale_price ("1234.50" format)
         """
         prices = {
             'regular_price': None,
@@ -143,21 +333,19 @@ class VenboScraper:
         # Remove HTML tags if any
         clean_text = re.sub(r'<[^>]+>', '', price_text)
         
-        # Find all prices (numbers before 'Bs')
-        price_matches = re.findall(r'([\d,\.]+)\s*Bs', clean_text)
+        # Find all prices (numbers before 'Bs'), e.g. 17,50Bs or 1.234,50Bs
+        price_matches = self.PRICE_BS.findall(clean_text)
+        amounts = [a for a in (to_centavos(p) for p in price_matches) if a is not None]
         
-        if price_matches:
-            # Clean up prices (remove commas and extra whitespace)
-            clean_prices = [p.replace(',', '').strip() for p in price_matches]
-            
-            if len(clean_prices) >= 2:
+        if amounts:
+            if len(amounts) >= 2:
                 # First is regular, second is sale
-                prices['regular_price'] = clean_prices[0]
-                prices['sale_price'] = clean_prices[1]
+                prices['regular_price'] = format_amount(amounts[0])
+                prices['sale_price'] = format_amount(amounts[1])
             else:
                 # Only one price
-                prices['regular_price'] = clean_prices[0]
-                prices['sale_price'] = clean_prices[0]
+                prices['regular_price'] = format_amount(amounts[0])
+                prices['sale_price'] = format_amount(amounts[0])
         
         return prices
     
@@ -173,104 +361,83 @@ class VenboScraper:
             Dictionary with product information
         """
         try:
-            product_data = {}
-            
             # Category URL
-            product_data['category_url'] = category_url
-            
-            # Product title
-            title_elem = product_element.find('h5')
-            if not title_elem:
-                title_elem = product_element.find('h2', class_='woocommerce-loop-product__title')
-            if not title_elem:
-                title_elem = product_element.find(class_='product_details')
-                if title_elem:
-                    title_elem = title_elem.find('h5')
-            product_data['title'] = title_elem.get_text(strip=True) if title_elem else 'N/A'
-            
-            # Product URL
-            link_elem = product_element.find('a', class_='product_item_link')
-            if not link_elem:
-                link_elem = product_element.find('a', href=True)
+            product_data = {'category_url': category_url}
+            product_data.update(self.product_plan.extract(product_element))
+            return product_data
             
-            if link_elem and 'href' in link_elem.attrs:
-                product_data['url'] = link_elem['href']
-            else:
-                product_data['url'] = 'N/A'
+        except Exception as e:
+            logger.error(f"Error extracting product info: {e}")
+            return None
+    
+    def finalize_product(self, fields: Dict) -> Dict:
+        """
+        Derive the price, sale, ID and stock columns from the fields read off a card
+        
+        Args:
+            fields: Record extracted with PRODUCT_FIELDS
             
-            # Price
-            price_elem = product_element.find('span', class_='product_price')
-            if not price_elem:
-                price_elem = product_element.find('span', class_='price')
+        Returns:
+            Product dictionary
+        """
+        product_data = {
+            'title': fields['title'],
+            'url': fields['url'],
+        }
+        
+        # Price
+        if fields['price'] is not None:
+            price_text, marked_sale = fields['price']
+            prices = self.extract_price(price_text)
+            product_data['regular_price'] = prices['regular_price'] or 'N/A'
+            product_data['sale_price'] = prices['sale_price'] or 'N/A'
             
-            if price_elem:
-                price_text = price_elem.get_text(strip=True)
-                prices = self.extract_price(price_text)
-                product_data['regular_price'] = prices['regular_price'] or 'N/A'
-                product_data['sale_price'] = prices['sale_price'] or 'N/A'
-                
-                # Check if on sale (has del tag or ins tag)
-                if price_elem.find('del') or price_elem.find('ins'):
-                    product_data['on_sale'] = 'Yes'
-                    # Extract discount percentage if available
-                    discount_match = re.search(r'\(([^)]+%)\)', price_text)
-                    if discount_match:
-                        product_data['discount'] = discount_match.group(1)
-                    else:
-                        product_data['discount'] = 'N/A'
-                else:
-                    product_data['on_sale'] = 'No'
-                    product_data['discount'] = 'N/A'
+            # Check if on sale (has del tag or ins tag)
+            if marked_sale:
+                product_data['on_sale'] = 'Yes'
+                # Extract discount percentage if available
+                discount_match = self.DISCOUNT.search(price_text)
+                product_data['discount'] = discount_match.group(1) if discount_match else 'N/A'
             else:
-                product_data['regular_price'] = 'N/A'
-                product_data['sale_price'] = 'N/A'
                 product_data['on_sale'] = 'No'
                 product_data['discount'] = 'N/A'
-            
-            # Product ID (from class or data attributes)
-            classes = product_element.get('class', [])
-            product_id = 'N/A'
-            for cls in classes:
-                if cls.startswith('post-'):
-                    product_id = cls.replace('post-', '')
-                    break
-            product_data['product_id'] = product_id
-            
-            # In stock status
-            if 'instock' in ' '.join(classes):
-                product_data['in_stock'] = 'Yes'
-            elif 'outofstock' in ' '.join(classes):
-                product_data['in_stock'] = 'No'
-            else:
-                product_data['in_stock'] = 'Unknown'
-            
-            # Image URL
-            img_elem = product_element.find('img')
-            if img_elem:
-                # Try data-src first (lazy loading), then src
-                img_url = img_elem.get('data-src') or img_elem.get('src')
-                product_data['image_url'] = img_url if img_url else 'N/A'
-            else:
-                product_data['image_url'] = 'N/A'
-            
-            return product_data
-            
-        except Exception as e:
-            logger.error(f"Error extracting product info: {e}")
-            return None
+        else:
+            product_data['regular_price'] = 'N/A'
+            product_data['sale_price'] = 'N/A'
+            product_data['on_sale'] = 'No'
+            product_data['discount'] = 'N/A'
+        
+        # Product ID and stock status from the card's classes (post-123, instock)
+        classes = fields['classes'] or ''
+        id_match = re.search(r'(?:^|\s)post-(\S+)', classes)
+        product_data['product_id'] = id_match.group(1) if id_match else 'N/A'
+        if 'instock' in classes:
+            product_data['in_stock'] = 'Yes'
+        elif 'outofstock' in classes:
+            product_data['in_stock'] = 'No'
+        else:
+            product_data['in_stock'] = 'Unknown'
+        
+        product_data['image_url'] = fields['image_url']
+        return product_data
     
-    def scrape_product_listing(self, url: str) -> List[Dict]:
+    def scrape_product_listing(self, url: str, soup: Optional[BeautifulSoup] = None,
+                               category_url: Optional[str] = None) -> List[Dict]:
         """
         Scrape all products from a product listing page
         
         Args:
             url: URL of the product listing page
+            soup: The page as already parsed by the crawl (fetched if omitted)
+            category_url: Category the page belongs to (default: url; pages
+                2..K of a listing pass their first page's URL)
             
         Returns:
             List of product dictionaries
         """
         products = []
-        soup = self.get_page(url)
+        if soup is None:
+            soup = self.get_page(url)
         
         if not soup:
             return products
@@ -282,74 +449,221 @@ class VenboScraper:
         logger.info(f"Found {len(product_containers)} products on {url}")
         
         for product_elem in product_containers:
-            product_info = self.extract_product_info(product_elem, url)
+            product_info = self.extract_product_info(product_elem, category_url or url)
             if product_info:
                 products.append(product_info)
         
         return products
     
-    def explore_category(self, category_url: str, level: int = 0) -> None:
+    def process_category_page(self, category_url: str, soup: BeautifulSoup, level: int) -> Tuple[Optional[Dict], List[Dict], List[str]]:
         """
-        Recursively explore a category and its subcategories
+        Extract everything the crawl needs from one fetched category page
         
         Args:
-            category_url: URL of the category to explore
-            level: Current depth level in the category tree
+            category_url: URL of the category page
+            soup: Parsed page
+            level: Depth level in the category tree
+            
+        Returns:
+            Tuple of (category info or None, products, subcategory links).
+            Category info includes `total_pages` for listings.
         """
         indent = "  " * level
-        logger.info(f"{indent}Exploring: {category_url}")
-        
-        soup = self.get_page(category_url)
-        if not soup:
-            return
+        category_info = None
+        products = []
+        summary = self.summarize_page(soup, category_url)
         
         # Check if this is a product listing page
-        if self.is_product_listing_page(soup):
-            logger.info(f"{indent}→ This is a PRODUCT LISTING page")
-            
-            # Extract product count
-            result_count = soup.find('p', class_='woocommerce-result-count')
-            product_count = 0
-            if result_count:
-                count_match = re.search(r'(\d+)\s+results?', result_count.get_text())
-                if count_match:
-                    product_count = int(count_match.group(1))
-            else:
-                # Try alternative pattern in page text
-                page_text = soup.get_text()
-                count_match = re.search(r'Showing all (\d+) results', page_text, re.IGNORECASE)
-                if count_match:
-                    product_count = int(count_match.group(1))
+        if summary['is_listing']:
+            logger.info(f"{indent}→ {category_url} is a PRODUCT LISTING page")
             
-            # Store category info
-            self.categories_found[category_url] = {
+            product_count = summary['product_count']
+            category_info = {
                 'url': category_url,
                 'product_count': product_count,
-                'level': level
+                'level': level,
+                'total_pages': summary['total_pages'],
             }
             
-            logger.info(f"{indent}→ Found {product_count} products in this category")
+            logger.info(f"{indent}→ Found {product_count} products in this category "
+                        f"({summary['total_pages']} pages)")
             
-            # Scrape products from this page
-            products = self.scrape_product_listing(category_url)
-            self.products.extend(products)
+            # Scrape products from the page we already hold
+            products = self.scrape_product_listing(category_url, soup)
             
         else:
-            logger.info(f"{indent}→ This is a CATEGORY NAVIGATION page")
+            logger.info(f"{indent}→ {category_url} is a CATEGORY NAVIGATION page")
         
-        # Extract and explore subcategories
-        subcategory_links = self.extract_category_links(soup, category_url)
+        # Extract subcategories (pagination is followed from total_pages instead)
+        subcategory_links = summary['category_links']
         
         if subcategory_links:
             logger.info(f"{indent}→ Found {len(subcategory_links)} subcategory links")
-            for subcat_url in subcategory_links:
-                self.explore_category(subcat_url, level + 1)
         else:
             logger.info(f"{indent}→ No more subcategories")
+        
+        return category_info, products, subcategory_links
+    
+    def crawl(self, start_urls: List[str], level: int = 0, sink: Optional[ProductSink] = None) -> None:
+        """
+        Explore categories and their subcategories from an explicit frontier
+        
+        The frontier is a heap of (position, url, level, listing) items,
+        where `position` is the item's place in the tree: a child sorts
+        after its parent, a listing's pages (`listing` is the first page's
+        URL) before its subcategories. Workers never wait for each other:
+        as soon as a page is processed, the links it reports and pages
+        2..K of a listing are submitted to the pool, so a slow page only
+        holds up its own subtree.
+        
+        Results are consumed in position order. The item at the top of the
+        heap is consumed once its page is done: its products are stored (or
+        written to the sink), and its links are claimed against `queued` and
+        pushed with their positions. Claiming in this single-threaded merge,
+        in position order, gives every run the same tree and the same output
+        whichever fetch finishes first. Pages done ahead of the top of the
+        heap are held until their turn. URLs are fetched in canonical form,
+        once each.
+        
+        Args:
+            start_urls: Category URLs to start from
+            level: Depth level of the start URLs
+            sink: Sink the products are written to (None keeps them in
+                self.products)
+        """
+        start_urls = list(dict.fromkeys(self.canonical_url(url) for url in start_urls))
+        frontier = [((idx,), url, level, None) for idx, url in enumerate(start_urls)]
+        queued: Set[str] = set(start_urls)
+        # One future per URL ever submitted (None once consumed)
+        futures: Dict[str, Optional[Future]] = {}
+        futures_lock = threading.Lock()
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def submit(url: str, url_level: int, listing: Optional[str]) -> None:
+                with futures_lock:
+                    if url in futures:
+                        return
+                    try:
+                        future = executor.submit(self.process_frontier_item, (url, url_level, listing))
+                    except RuntimeError:  # The pool is shutting down after an error
+                        return
+                    futures[url] = future
+                future.add_done_callback(lambda done: submit_links(done, url, url_level))
+            
+            def submit_links(done: Future, url: str, url_level: int) -> None:
+                # Runs when a page is processed: start fetching what it links to
+                if done.cancelled() or done.exception() is not None or done.result() is None:
+                    return
+                category_info, _, subcategory_links = done.result()
+                if category_info:
+                    for page_url in self.page_urls(url, category_info['total_pages']):
+                        submit(page_url, url_level, url)
+                for subcat_url in subcategory_links:
+                    submit(subcat_url, url_level + 1, None)
+            
+            for _, url, url_level, listing in frontier:
+                submit(url, url_level, listing)
+            
+            try:
+                while frontier:
+                    position, url, url_level, listing = heapq.heappop(frontier)
+                    submit(url, url_level, listing)
+                    result = futures[url].result()
+                    futures[url] = None
+                    if result is None:
+                        continue
+                    category_info, products, subcategory_links = result
+                    
+                    if category_info:
+                        # The level is where the merge placed the page, not where it was first seen
+                        category_info = dict(category_info, level=url_level)
+                        self.categories_found[url] = category_info
+                        for page_url in self.page_urls(url, category_info['total_pages']):
+                            if page_url not in queued:
+                                queued.add(page_url)
+                                page_num = int(self.PAGE_NUMBER.search(page_url).group(1))
+                                heapq.heappush(frontier, (position + (-1, page_num), page_url, url_level, url))
+                    
+                    self.store_products(products, sink)
+                    
+                    for child_idx, subcat_url in enumerate(subcategory_links):
+                        if subcat_url not in queued:
+                            queued.add(subcat_url)
+                            heapq.heappush(frontier, (position + (child_idx,), subcat_url, url_level + 1, None))
+            except BaseException:
+                # Only the pages already being fetched finish; the rest of the crawl is dropped
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
     
-    def scrape(self) -> None:
+    def process_frontier_item(self, item: Tuple[str, int, Optional[str]]
+                              ) -> Optional[Tuple[Optional[Dict], List[Dict], List[str]]]:
+        """
+        Fetch and process one frontier item (runs in the worker pool)
+        
+        With a journal, a page it holds is replayed without a fetch, and a
+        processed page is recorded before its products reach the index.
+        
+        Args:
+            item: (url, level, listing) of a frontier item
+            
+        Returns:
+            Tuple of (category info or None, products, subcategory links),
+            or None if the page could not be fetched
+        """
+        url, url_level, listing = item
+        if self.journal is not None:
+            journaled = self.journal.get(url)
+            if journaled is not None:
+                return tuple(journaled)
+        
+        soup = self.get_page(url)
+        if not soup:
+            return None
+        
+        if listing is not None:
+            # Page 2..K of a listing: only its products are needed
+            result = None, self.scrape_product_listing(url, soup, listing), []
+        else:
+            result = self.process_category_page(url, soup, url_level)
+        if self.journal is not None:
+            self.journal.record(url, result)
+        return result
+    
+    def store_products(self, products: List[Dict], sink: Optional[ProductSink] = None) -> None:
+        """
+        Merge one page's products into the product index, writing new ones to the sink
+        
+        Args:
+            products: Product records of the page
+            sink: Sink (built on self.product_index) the products are written
+                to, or None to keep them in self.products
+        """
+        if sink is not None:
+            sink.write(products)
+        else:
+            self.product_index.extend(products)
+    
+    def explore_category(self, category_url: str, level: int = 0,
+                         sink: Optional[ProductSink] = None) -> None:
+        """
+        Explore a category and its subcategories
+        
+        Args:
+            category_url: URL of the category to explore
+            level: Depth level of the category in the tree
+            sink: Sink the products are written to (None keeps them in
+                self.products)
+        """
+        logger.info(f"{'  ' * level}Exploring: {category_url}")
+        self.crawl([category_url], level, sink)
+    
+    def scrape(self, sink: Optional[ProductSink] = None) -> None:
         """
         Main scraping method - starts from the categories page
+        
+        Args:
+            sink: Sink the products are written to as they are scraped
+                (None keeps them in self.products)
         """
         categories_page = f"{self.base_url}/categorias/"
         
@@ -369,22 +683,18 @@ class VenboScraper:
         
         logger.info(f"Found {len(main_category_links)} main category links")
         
-        # Explore each main category recursively
-        for idx, category_url in enumerate(main_category_links, 1):
-            logger.info(f"\n{'='*80}")
-            logger.info(f"Main Category {idx}/{len(main_category_links)}")
-            logger.info(f"{'='*80}")
-            self.explore_category(category_url)
+        # Explore all main categories and their subcategories
+        self.crawl(main_category_links, sink=sink)
         
         logger.info("\n" + "=" * 80)
         logger.info("Scraping completed")
         logger.info(f"Total categories with products found: {len(self.categories_found)}")
-        logger.info(f"Total products scraped: {len(self.products)}")
+        logger.info(f"Total products scraped: {len(self.product_index)}")
         logger.info("=" * 80)
     
     def save_to_csv(self, filename: str = 'venbo_products.csv') -> None:
         """
-        Save scraped products to CSV file
+        Save the products kept in memory (scrape() without a sink) to a CSV file
         
         Args:
             filename: Output CSV filename
@@ -393,30 +703,33 @@ class VenboScraper:
             logger.warning("No products to save")
             return
         
-        # Define CSV columns
-        fieldnames = [
-            'product_id',
-            'title',
-            'url',
-            'regular_price',
-            'sale_price',
-            'on_sale',
-            'discount',
-            'in_stock',
-            'image_url',
-            'category_url'
-        ]
-        
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(self.products)
+            with CSVSink(filename, self.CSV_FIELDS) as sink:
+                sink.write(self.products)
             
             logger.info(f"Products saved to {filename}")
         except Exception as e:
             logger.error(f"Error saving to CSV: {e}")
     
+    def save_to_parquet(self, root: str = 'snapshots') -> None:
+        """
+        Save the products kept in memory as a typed Parquet snapshot (needs pyarrow)
+        
+        Args:
+            root: Snapshot directory, partitioned by marketplace and date
+        """
+        if not self.products:
+            logger.warning("No products to save")
+            return
+        
+        try:
+            with ParquetSink(root, 'venbo', self.PARQUET_COLUMNS) as sink:
+                sink.write(self.products)
+            
+            logger.info(f"Products saved to {sink.path}")
+        except Exception as e:
+            logger.error(f"Error saving to Parquet: {e}")
+    
     def save_category_report(self, filename: str = 'venbo_categories_report.txt') -> None:
         """
         Save a report of categories and their product counts
@@ -433,7 +746,7 @@ class VenboScraper:
                 f.write("VENBO CATEGORIES REPORT\n")
                 f.write("=" * 80 + "\n\n")
                 f.write(f"Total categories with products: {len(self.categories_found)}\n")
-                f.write(f"Total products found: {len(self.products)}\n\n")
+                f.write(f"Total products found: {len(self.product_index)}\n\n")
                 f.write("=" * 80 + "\n\n")
                 
                 # Sort by level, then by product count
@@ -453,22 +766,88 @@ class VenboScraper:
 
 def main():
     """Main function"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scrape Venbo products and category counts")
+    parser.add_argument('--cache-dir', help="Directory for the on-disk HTTP cache (disabled if omitted)")
+    parser.add_argument('--cache-ttl', type=float, default=0,
+                        help="Seconds a cached page is reused without revalidation (default: 0)")
+    parser.add_argument('--base-url', default="https://venbo.shop",
+                        help="Site to crawl (default: https://venbo.shop)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of category pages fetched in parallel (default: 1); "
+                             "the default rate limit grows with it, see --rate")
+    parser.add_argument('--parser', choices=PARSERS, default=None,
+                        help="HTML parser backend (default: html.parser)")
+    parser.add_argument('--db', help="SQLite snapshot store the products and category counts are also written to")
+    parser.add_argument('--parquet', metavar='DIR',
+                        help="Also write a typed Parquet snapshot under DIR (needs pyarrow)")
+    add_client_arguments(parser)
+    add_rate_limit_arguments(parser, delay=1.5)
+    add_journal_arguments(parser, 'venbo_products.journal')
+    args = parser.parse_args()
+    rate_limiter = rate_limiter_from_args(args, delay=1.5, workers=args.workers)
+    logger.info(format_rate_limit(rate_limiter))
+    
+    # Every processed page is journaled; --resume replays the journaled pages
+    journal = open_journal(args, 'venbo')
+    if args.resume:
+        logger.info(f"Resuming from {args.journal}: {len(journal)} pages journaled")
+    
     # Initialize scraper
-    scraper = VenboScraper(base_url="https://venbo.shop", delay=1.5)
+    scraper = VenboScraper(base_url=args.base_url.rstrip('/'), delay=1.5, rate_limiter=rate_limiter,
+                           cache_dir=args.cache_dir, cache_ttl=args.cache_ttl,
+                           max_workers=args.workers, session_options=client_options(args),
+                           parser=args.parser, journal=journal)
     
-    # Start scraping
-    scraper.scrape()
+    # Scrape, writing each page's new products to the CSV (and the snapshot
+    # store and Parquet snapshot) as it is processed
+    index = scraper.product_index
+    with ExitStack() as outputs:
+        sinks = [CSVSink('venbo_products.csv', VenboScraper.CSV_FIELDS, index=index)]
+        if args.db:
+            store = outputs.enter_context(SnapshotStore(args.db))
+            run_id = outputs.enter_context(store.run('venbo'))
+            sinks.append(SnapshotSink(store, run_id, index=index))
+        if args.parquet:
+            sinks.append(ParquetSink(args.parquet, 'venbo', VenboScraper.PARQUET_COLUMNS, index=index))
+        with TeeSink(sinks, index=index) as sink:
+            scraper.scrape(sink)
+            if not len(index):
+                # Nothing scraped (e.g. the categories page failed): keep the previous export
+                sink.discard()
+        if args.db:
+            store.add_category_counts(run_id, scraper.categories_found.values())
+            logger.info(f"Run {run_id} recorded in {args.db}")
+        if args.parquet and len(index):
+            logger.info(f"Parquet snapshot saved to {sinks[-1].path}")
+    if len(index):
+        logger.info(f"{sink.rows_written} products saved to venbo_products.csv")
+    else:
+        logger.error("No products were scraped; venbo_products.csv was left as it was")
     
     # Save results
-    scraper.save_to_csv('venbo_products.csv')
     scraper.save_category_report('venbo_categories_report.txt')
     
+    if len(scraper.product_index):
+        # The outputs are complete: the next run starts over
+        journal.complete()
+    else:
+        journal.close()
+    
     print("\n" + "=" * 80)
     print("SCRAPING SUMMARY")
     print("=" * 80)
     print(f"Categories with products: {len(scraper.categories_found)}")
-    print(f"Total products scraped: {len(scraper.products)}")
+    print(f"Total products scraped: {len(scraper.product_index)}")
     print(f"URLs visited: {len(scraper.visited_urls)}")
+    print(format_index_stats(scraper.product_index))
+    if scraper.fetch_counts:
+        print(f"Fetches per URL: max {max(scraper.fetch_counts.values())} "
+              f"({sum(scraper.fetch_counts.values())} fetches, {len(scraper.fetch_counts)} unique URLs)")
+    if scraper.http_cache:
+        print(format_cache_stats(scraper.http_cache.stats))
+    print(format_journal_stats(journal))
     print("\nOutput files:")
     print("  - venbo_products.csv (product data)")
     print("  - venbo_categories_report.txt (category report)")
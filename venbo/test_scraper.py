@@ -3,9 +3,22 @@ Test script for Venbo scraper
 Tests basic functionality without running a full scrape
 """
 
+import filecmp
+import os
+import sys
+import tempfile
+import threading
 import requests
+from collections import Counter
 from bs4 import BeautifulSoup
 import re
+from scraper_venbo import VenboScraper, main as scraper_main
+from common.checkpoint import Journal
+from common.html_parser import available_parsers, parse_html
+from common.marketplace_server import MarketplaceServer
+from common.sinks import CSVSink
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 def test_category_page():
     """Test fetching the main categories page"""
@@ -169,6 +182,332 @@ def test_recursive_detection():
         return False
 
 
+def test_parser_backends():
+    """Test that every parser backend extracts the same data from the capture"""
+    print("=" * 80)
+    print("TEST 4: Parser backends on venbo-categories.html")
+    print("=" * 80)
+    
+    with open(os.path.join(HERE, 'venbo-categories.html'), 'rb') as f:
+        html = f.read()
+    
+    extracted = {}
+    for backend in available_parsers():
+        scraper = VenboScraper(parser=backend)
+        soup = parse_html(html, backend)
+        extracted[backend] = (scraper.extract_category_links(soup, scraper.base_url),
+                              scraper.is_product_listing_page(soup))
+        print(f"  {backend:<12} {len(extracted[backend][0])} category links")
+    
+    reference = extracted['html.parser']
+    if reference[0] and all(result == reference for result in extracted.values()):
+        print(f"✓ {len(extracted)} backends extracted identical records")
+        return True
+    print("✗ Backends disagree")
+    return False
+
+
+def test_page_summary():
+    """Test that the single-pass summary classifies pages and splits their links"""
+    print("=" * 80)
+    print("TEST 5: Page summary")
+    print("=" * 80)
+    
+    listing = (b'<html><body><ul class="product-categories">'
+               b'<li><a href="/cat-producto/libros/novelas/">Novelas</a></li></ul>'
+               b'<p class="woocommerce-result-count">Showing 1&ndash;24 of 53 results</p>'
+               b'<div class="products"><a href="/producto/uno/">Uno</a></div>'
+               b'<nav class="woocommerce-pagination"><ul class="page-numbers">'
+               b'<li><a class="page-numbers" href="/cat-producto/libros/page/2/">2</a></li>'
+               b'<li><a class="page-numbers" href="/cat-producto/libros/page/3/">3</a></li>'
+               b'</ul></nav></body></html>')
+    with open(os.path.join(HERE, 'venbo-categories.html'), 'rb') as f:
+        navigation = f.read()
+    
+    expected_listing = {
+        'is_listing': True,
+        'product_count': 53,
+        'total_pages': 3,
+        'pagination_links': ['https://venbo.shop/cat-producto/libros/page/2',
+                             'https://venbo.shop/cat-producto/libros/page/3'],
+        'category_links': ['https://venbo.shop/cat-producto/libros/novelas'],
+    }
+    
+    ok = True
+    for backend in available_parsers():
+        scraper = VenboScraper(parser=backend)
+        listing_summary = scraper.summarize_page(parse_html(listing, backend), scraper.base_url)
+        navigation_soup = parse_html(navigation, backend)
+        navigation_summary = scraper.summarize_page(navigation_soup, scraper.base_url)
+        same = (listing_summary == expected_listing
+                and not navigation_summary['is_listing']
+                and navigation_summary['category_links'] == scraper.extract_category_links(navigation_soup, scraper.base_url)
+                and len(navigation_summary['category_links']) > 0)
+        ok = ok and same
+        print(f"  {'✓' if same else '✗'} {backend:<12} listing: {listing_summary['product_count']} results, "
+              f"{len(listing_summary['pagination_links'])} pages; "
+              f"navigation: {len(navigation_summary['category_links'])} category links")
+    return ok
+
+
+def test_single_fetch_per_listing():
+    """Test that every page of every listing is fetched and parsed exactly once"""
+    print("=" * 80)
+    print("TEST 6: Complete paginated listings, one fetch per page (local stand-in server)")
+    print("=" * 80)
+    
+    server = MarketplaceServer(venbo_depth=2, venbo_children=2).start()
+    try:
+        scraper = VenboScraper(base_url=f"{server.base_url}/venbo", delay=0, max_workers=4)
+        scraper.scrape()
+    finally:
+        server.stop()
+    
+    max_fetches = max(scraper.fetch_counts.values()) if scraper.fetch_counts else 0
+    print(f"  {len(scraper.fetch_counts)} URLs, {sum(scraper.fetch_counts.values())} fetches, "
+          f"{len(scraper.categories_found)} listings, {len(scraper.products)} products")
+    
+    # Every page of every listing was read: products per category match its result count
+    cards = Counter(url for p in scraper.products for url in p['category_urls'])
+    incomplete = [url for url, info in scraper.categories_found.items() if cards[url] != info['product_count']]
+    paginated = sum(1 for info in scraper.categories_found.values() if info['total_pages'] > 1)
+    
+    if max_fetches == 1 and scraper.categories_found and not incomplete:
+        print(f"✓ Every URL fetched once; all {len(scraper.categories_found)} listings complete "
+              f"({paginated} span several pages)")
+        return True
+    print(f"✗ Max fetches per URL: {max_fetches}, incomplete listings: {incomplete[:3]}")
+    return False
+
+
+def test_streaming_csv():
+    """Test that writing products while crawling gives the same CSV as saving them at the end"""
+    print("=" * 80)
+    print("TEST 7: Streaming CSV output (local stand-in server)")
+    print("=" * 80)
+    
+    server = MarketplaceServer(venbo_depth=2, venbo_children=2).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            in_memory = VenboScraper(base_url=f"{server.base_url}/venbo", delay=0, max_workers=4)
+            in_memory.scrape()
+            in_memory.save_to_csv(os.path.join(tmp, 'memory.csv'))
+            
+            streamed = VenboScraper(base_url=f"{server.base_url}/venbo", delay=0, max_workers=4)
+            with CSVSink(os.path.join(tmp, 'streamed.csv'), VenboScraper.CSV_FIELDS,
+                         index=streamed.product_index, batch_size=50) as sink:
+                streamed.scrape(sink)
+            
+            same = filecmp.cmp(os.path.join(tmp, 'memory.csv'), os.path.join(tmp, 'streamed.csv'), shallow=False)
+            leftovers = [name for name in os.listdir(tmp) if name.endswith('.part')]
+    finally:
+        server.stop()
+    
+    if same and not leftovers and not streamed.products and sink.rows_written == len(in_memory.products):
+        print(f"✓ {sink.rows_written} products streamed; file identical to the in-memory export, "
+              f"no records left in memory")
+        return True
+    print(f"✗ identical: {same}, leftover files: {leftovers}, records kept: {len(streamed.products)}")
+    return False
+
+
+class CrashingSink(CSVSink):
+    """CSV sink that fails after a number of pages, like a run killed mid-crawl"""
+    
+    def __init__(self, *args, pages: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pages = pages
+    
+    def write(self, records):
+        if self.pages == 0:
+            raise ConnectionError("connection lost")
+        self.pages -= 1
+        return super().write(records)
+
+
+def test_resume_from_journal():
+    """Test that a crashed crawl resumed from its journal fetches only the rest and writes the same CSV"""
+    print("=" * 80)
+    print("TEST 8: Resume from the checkpoint journal (local stand-in server)")
+    print("=" * 80)
+    
+    server = MarketplaceServer(venbo_depth=2, venbo_children=2).start()
+    base = f"{server.base_url}/venbo"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            journal_path = os.path.join(tmp, 'venbo.journal')
+            complete = VenboScraper(base_url=base, delay=0, max_workers=4)
+            with CSVSink(os.path.join(tmp, 'complete.csv'), VenboScraper.CSV_FIELDS,
+                         index=complete.product_index) as sink:
+                complete.scrape(sink)
+            
+            # The first run dies after writing 10 pages
+            with Journal(journal_path, 'venbo') as journal:
+                crashed = VenboScraper(base_url=base, delay=0, max_workers=4, journal=journal)
+                try:
+                    with CrashingSink(os.path.join(tmp, 'resumed.csv'), VenboScraper.CSV_FIELDS,
+                                      index=crashed.product_index, pages=10) as sink:
+                        crashed.scrape(sink)
+                except ConnectionError:
+                    pass
+            
+            with Journal(journal_path, 'venbo', resume=True) as journal:
+                resumed = VenboScraper(base_url=base, delay=0, max_workers=4, journal=journal)
+                with CSVSink(os.path.join(tmp, 'resumed.csv'), VenboScraper.CSV_FIELDS,
+                             index=resumed.product_index) as sink:
+                    resumed.scrape(sink)
+                journaled = journal.stats['loaded']
+            
+            same = filecmp.cmp(os.path.join(tmp, 'complete.csv'), os.path.join(tmp, 'resumed.csv'), shallow=False)
+    finally:
+        server.stop()
+    
+    total_fetches = sum(complete.fetch_counts.values())
+    resumed_fetches = sum(resumed.fetch_counts.values())
+    # Only the categories page and the pages missing from the journal are fetched again
+    if same and journaled >= 10 and resumed_fetches == total_fetches - journaled:
+        print(f"✓ {journaled} pages replayed from the journal, {resumed_fetches} of {total_fetches} "
+              f"fetched again; CSV identical to an uninterrupted run")
+        return True
+    print(f"✗ identical: {same}, journaled: {journaled}, fetches: {resumed_fetches} of {total_fetches}")
+    return False
+
+
+def test_failed_run_keeps_export():
+    """Test that a run whose categories page fails leaves the previous CSV export in place"""
+    print("=" * 80)
+    print("TEST 9: Failed run keeps the previous export (local stand-in server)")
+    print("=" * 80)
+    
+    server = MarketplaceServer(error_rate=1.0).start()
+    cwd, argv = os.getcwd(), sys.argv
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            previous = "product_id,title\n1,Previous export\n"
+            with open('venbo_products.csv', 'w', encoding='utf-8') as f:
+                f.write(previous)
+            sys.argv = ['scraper_venbo.py', '--base-url', f"{server.base_url}/venbo"]
+            scraper_main()
+            with open('venbo_products.csv', encoding='utf-8') as f:
+                kept = f.read() == previous
+            leftovers = [name for name in os.listdir(tmp) if name.endswith('.part')]
+            journal_kept = os.path.exists('venbo_products.journal')
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+        server.stop()
+    
+    if kept and not leftovers and journal_kept:
+        print("✓ Categories page failed; venbo_products.csv left untouched, no .part file, journal kept")
+        return True
+    print(f"✗ previous export kept: {kept}, leftover files: {leftovers}, journal kept: {journal_kept}")
+    return False
+
+
+def test_deterministic_links():
+    """Test that the journaled subcategory links do not depend on the worker count or thread timing"""
+    print("=" * 80)
+    print("TEST 10: Deterministic subcategory links (local stand-in server)")
+    print("=" * 80)
+    
+    server = MarketplaceServer(venbo_depth=2, venbo_children=3).start()
+    base = f"{server.base_url}/venbo"
+    links = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for run, workers in enumerate([1, 8, 8]):
+                path = os.path.join(tmp, f"run{run}.journal")
+                with Journal(path, 'venbo') as journal:
+                    scraper = VenboScraper(base_url=base, delay=0, max_workers=workers, journal=journal)
+                    scraper.scrape()
+                # Read back what the run wrote to disk
+                with Journal(path, 'venbo', resume=True) as journal:
+                    links.append({unit: result[2] for unit, result in journal.completed.items()})
+    finally:
+        server.stop()
+    
+    # The real pages link to every category from their sidebar: what was
+    # already fetched must not change a page's links
+    with open(os.path.join(HERE, 'venbo-categories.html'), 'rb') as f:
+        soup = parse_html(f.read())
+    scraper = VenboScraper()
+    before = scraper.summarize_page(soup, scraper.base_url)['category_links']
+    scraper.visited_urls.update(before[::2])
+    after = scraper.summarize_page(soup, scraper.base_url)['category_links']
+    
+    if links[0] and links[0] == links[1] == links[2] and before == after:
+        print(f"✓ {len(links[0])} pages journaled the same subcategory links with 1 and 8 workers; "
+              f"page links independent of the visited pages")
+        return True
+    if before != after:
+        print(f"✗ {len(before) - len(after)} links dropped because their pages were visited")
+        return False
+    differing = [unit for unit in links[0] if not links[0][unit] == links[1].get(unit) == links[2].get(unit)]
+    print(f"✗ Subcategory links differ between runs on {len(differing)} pages, e.g. {differing[:3]}")
+    return False
+
+
+def test_slow_page_does_not_stall():
+    """Test that one slow page does not hold up the other workers, and the output stays the same"""
+    print("=" * 80)
+    print("TEST 11: Slow page, drained frontier (local stand-in server)")
+    print("=" * 80)
+    
+    class SlowPageScraper(VenboScraper):
+        """Holds one page back until every other page has been fetched"""
+        
+        def __init__(self, slow_url, others, **kwargs):
+            super().__init__(**kwargs)
+            self.slow_url = slow_url
+            self.others = others
+            self.others_fetched = 0
+            self.everything_else = threading.Event()
+            self.released = None
+            self._count_lock = threading.Lock()
+        
+        def get_page(self, url):
+            if url == self.slow_url:
+                self.released = self.everything_else.wait(timeout=10)
+            soup = super().get_page(url)
+            if url != self.slow_url:
+                with self._count_lock:
+                    self.others_fetched += 1
+                    if self.others_fetched == self.others:
+                        self.everything_else.set()
+            return soup
+    
+    server = MarketplaceServer(venbo_depth=2, venbo_children=2).start()
+    base = f"{server.base_url}/venbo"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            normal = VenboScraper(base_url=base, delay=0, max_workers=4)
+            with CSVSink(os.path.join(tmp, 'normal.csv'), VenboScraper.CSV_FIELDS,
+                         index=normal.product_index) as sink:
+                normal.scrape(sink)
+            
+            # A level-1 listing page: a wave-by-wave crawl could not start level 2 without it
+            slow_url = min(url for url in normal.fetch_counts if '/page/2' in url)
+            slow = SlowPageScraper(slow_url, len(normal.fetch_counts) - 1, base_url=base, delay=0, max_workers=8)
+            with CSVSink(os.path.join(tmp, 'slow.csv'), VenboScraper.CSV_FIELDS,
+                         index=slow.product_index) as sink:
+                slow.scrape(sink)
+            
+            same = filecmp.cmp(os.path.join(tmp, 'normal.csv'), os.path.join(tmp, 'slow.csv'), shallow=False)
+            same_levels = ({url: info['level'] for url, info in normal.categories_found.items()}
+                           == {url: info['level'] for url, info in slow.categories_found.items()})
+    finally:
+        server.stop()
+    
+    if slow.released and same and same_levels:
+        print(f"✓ {slow.others} other pages fetched while {slow_url.split('/venbo')[1]} was held; "
+              f"same CSV and category levels as an unhindered run")
+        return True
+    print(f"✗ released: {slow.released} ({slow.others_fetched} of {slow.others} fetched), "
+          f"identical CSV: {same}, same levels: {same_levels}")
+    return False
+
+
 def main():
     """Run all tests"""
     print("\n" + "=" * 80)
@@ -203,6 +542,30 @@ def main():
     success = test_recursive_detection()
     results.append(("Multi-level categories", success))
     
+    # Test 4: Parser backends (offline)
+    results.append(("Parser backends", test_parser_backends()))
+    
+    # Test 5: Page summary (offline)
+    results.append(("Page summary", test_page_summary()))
+    
+    # Test 6: One fetch per listing page (offline)
+    results.append(("Complete listings, one fetch per page", test_single_fetch_per_listing()))
+    
+    # Test 7: Streaming CSV output (offline)
+    results.append(("Streaming CSV output", test_streaming_csv()))
+    
+    # Test 8: Resume from the checkpoint journal (offline)
+    results.append(("Resume from the journal", test_resume_from_journal()))
+    
+    # Test 9: Failed run keeps the previous export (offline)
+    results.append(("Failed run keeps the export", test_failed_run_keeps_export()))
+    
+    # Test 10: Same links journaled whatever the worker count (offline)
+    results.append(("Deterministic subcategory links", test_deterministic_links()))
+    
+    # Test 11: A slow page does not stall the crawl (offline)
+    results.append(("Slow page, drained frontier", test_slow_page_does_not_stall()))
+    
     # Summary
     print("\n" + "=" * 80)
     print("TEST SUMMARY")